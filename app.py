@@ -3,11 +3,201 @@
 ©️ 2025
 """
 
+import hashlib
+import json
+import os
+import secrets
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
+import streamlit.components.v1 as components
 from datetime import datetime
 from stroke_risk_calculator import StrokeRiskCalculator, RiskLevel
+from patient_record import PatientRecord
+from questionnaire import Questionnaire
+from response_store import ResponseStore, data_directory
+from result_cache import RiskResultCache
+from session_store import SessionStore, open_session_store
+
+# Cookie с токеном сессии (выдает приложение) и срок жизни ответов
+SESSION_COOKIE = os.environ.get('RISKOMETR_SESSION_COOKIE', 'riskometr_sid')
+SESSION_TTL = float(os.environ.get('RISKOMETR_SESSION_TTL', 2 * 3600))
+
+
+def data_path(name: str) -> str:
+    """
+    Путь к файлу данных приложения: каталог RISKOMETR_DATA_DIR, по
+    умолчанию $XDG_STATE_HOME/riskometr (~/.local/state/riskometr), а не
+    текущий каталог процесса
+    """
+    return os.path.join(data_directory(), name)
+
+
+@st.cache_resource
+def get_risk_cache() -> RiskResultCache:
+    """Общий для всех сессий кэш результатов расчета"""
+    metrics_port = os.environ.get('RISKOMETR_METRICS_PORT')
+    if not metrics_port:
+        return RiskResultCache(StrokeRiskCalculator(), max_size=4096)
+
+    # Метрики этапов расчета на http://127.0.0.1:<порт>/metrics
+    from instrumentation import InstrumentedCalculator, RiskMetrics, start_metrics_server
+    metrics = RiskMetrics()
+    start_metrics_server(metrics, int(metrics_port))
+    return RiskResultCache(InstrumentedCalculator(metrics), max_size=4096)
+
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """
+    Хранилище сессий: файл SQLite из RISKOMETR_SESSION_STORE (общий для
+    реплик на хосте и сохраняется при перезапуске) или 'memory'; по
+    умолчанию - sessions.sqlite3 в каталоге данных (data_path)
+    """
+    spec = os.environ.get('RISKOMETR_SESSION_STORE') or data_path('sessions.sqlite3')
+    return open_session_store(spec, ttl=SESSION_TTL)
+
+
+@st.cache_resource
+def get_questionnaire() -> Questionnaire:
+    """Анкета с общим для сессий хранилищем ответов (каталог responses)"""
+    return Questionnaire(ResponseStore(data_path('responses')))
+
+
+def session_token() -> str:
+    """
+    Токен сессии из cookie SESSION_COOKIE; при первом визите приложение
+    выдает случайный токен, а issue_session_cookie() сохраняет его в
+    cookie браузера. Cookie приходит при каждом подключении к любой
+    реплике и после перезапуска, но не попадает в ссылку.
+    """
+    # Ссылки старого вида ?sid= больше не используются
+    if 'sid' in st.query_params:
+        del st.query_params['sid']
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = (st.context.cookies.get(SESSION_COOKIE)
+                                          or secrets.token_urlsafe(32))
+    return st.session_state.session_token
+
+
+def session_id() -> str:
+    """Ключ сессии в хранилище - хэш токена: сам токен на сервере не хранится"""
+    return hashlib.sha256(session_token().encode('utf-8')).hexdigest()
+
+
+def issue_session_cookie():
+    """
+    Записать токен сессии в cookie браузера (после set_page_config): раз
+    за подключение и при смене токена; запись продлевает срок cookie
+    """
+    token = session_token()
+    if st.session_state.get('session_cookie_token') == token:
+        return
+    st.session_state.session_cookie_token = token
+    # Компонент - iframe того же происхождения: cookie ставится для страницы приложения
+    cookie = json.dumps(f'{SESSION_COOKIE}={token}; Max-Age={int(SESSION_TTL)}; '
+                        'Path=/; SameSite=Strict')
+    components.html(
+        f"<script>document.cookie = {cookie} + "
+        f"(location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=0,
+    )
+
+
+def load_session():
+    """Ответы анкеты и флаг расчета из хранилища сессий"""
+    state = get_session_store().get(session_id()) or {}
+    st.session_state.user_data = state.get('user_data', {})
+    st.session_state.calculated = state.get('calculated', False)
+
+
+def save_session(user_data: dict):
+    """Сохранить ответы анкеты в хранилище сессий и в st.session_state"""
+    get_session_store().put(session_id(), {'user_data': user_data, 'calculated': True})
+    st.session_state.user_data = user_data
+    st.session_state.calculated = True
+
+
+def forget_session():
+    """Удалить ответы анкеты из хранилища сессий и из st.session_state"""
+    get_session_store().delete(session_id())
+    # Новый токен: прежний больше ничего не открывает
+    st.session_state.session_token = secrets.token_urlsafe(32)
+    st.session_state.user_data = {}
+    st.session_state.calculated = False
+
+
+def risk_gauge(six_month_risk: float):
+    """Шкала риска; Plotly загружается только при первой отрисовке"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=six_month_risk,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': f"Риск инсульта за 6 месяцев (%)"},
+        gauge={
+            'axis': {'range': [None, 15]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 1], 'color': "lightgreen"},
+                {'range': [1, 3], 'color': "yellow"},
+                {'range': [3, 10], 'color': "orange"},
+                {'range': [10, 15], 'color': "red"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': six_month_risk
+            }
+        }
+    ))
+
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+    return fig
+
+
+# Подписи модифицируемых факторов для осей тепловой карты
+FACTOR_LABELS = {
+    'systolic_bp': "Систолическое давление, мм рт.ст.",
+    'smoking': "Курение",
+    'weight_kg': "Вес, кг",
+    'ldl_cholesterol': "Холестерин ЛПНП, ммоль/л",
+    'activity_level': "Образ жизни",
+    'on_blood_pressure_meds': "Препараты от давления",
+}
+
+
+def sensitivity_heatmap(user_data: dict, x_field: str, y_field: str):
+    """Тепловая карта риска на 6 месяцев по двум модифицируемым факторам"""
+    import plotly.graph_objects as go
+    from sensitivity import default_ranges, sensitivity_grid
+
+    ranges = default_ranges(user_data)
+    grid = sensitivity_grid(user_data, {y_field: ranges[y_field], x_field: ranges[x_field]})
+
+    def ticks(field):
+        if field == 'on_blood_pressure_meds':
+            return ["да" if value else "нет" for value in grid.axes[field]]
+        return [str(value) for value in grid.axes[field]]
+
+    risk = grid['six_month_risk']
+    fig = go.Figure(go.Heatmap(
+        z=risk,
+        x=ticks(x_field),
+        y=ticks(y_field),
+        text=[[f"{value}%" for value in row] for row in risk],
+        texttemplate="%{text}",
+        colorscale=[[0, "lightgreen"], [0.2, "yellow"], [0.5, "orange"], [1, "red"]],
+        zmin=0,
+        zmax=15,
+        colorbar={'title': "Риск, %"},
+    ))
+    fig.update_layout(
+        height=420,
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis={'title': FACTOR_LABELS[x_field], 'type': 'category'},
+        yaxis={'title': FACTOR_LABELS[y_field], 'type': 'category'},
+    )
+    return fig
 
 
 def main():
@@ -18,6 +208,7 @@ def main():
         layout="wide",
         initial_sidebar_state="expanded"
     )
+    issue_session_cookie()
     
     # Кастомные стили
     st.markdown("""
@@ -93,7 +284,8 @@ def main():
         """)
     
     # Инициализация калькулятора
-    calculator = StrokeRiskCalculator()
+    risk_cache = get_risk_cache()
+    calculator = risk_cache.calculator
     
     # Создаем вкладки
     tab1, tab2, tab3 = st.tabs(["📋 Анкета", "📊 Результаты", "📚 Обучение"])
@@ -257,17 +449,17 @@ def main():
             submitted = st.form_submit_button("📈 Рассчитать риск", type="primary")
             
             if submitted:
-                # Подготовка данных
-                user_data = {
+                # Ответы анкеты как есть; да/нет/есть и синонимы приводит PatientRecord
+                answers = {
                     'age': age,
                     'gender': gender,
                     'height_cm': height_cm,
                     'weight_kg': weight_kg,
-                    'on_blood_pressure_meds': on_blood_pressure_meds == "да",
-                    'has_atrial_fibrillation': has_atrial_fibrillation == "да",
-                    'previous_stroke_tia': previous_stroke_tia == "да",
-                    'has_diabetes': has_diabetes == "есть",
-                    'family_stroke_history': family_stroke_history == "да",
+                    'on_blood_pressure_meds': on_blood_pressure_meds,
+                    'has_atrial_fibrillation': has_atrial_fibrillation,
+                    'previous_stroke_tia': previous_stroke_tia,
+                    'has_diabetes': has_diabetes,
+                    'family_stroke_history': family_stroke_history,
                     'systolic_bp': systolic_bp,
                     'diastolic_bp': diastolic_bp,
                     'ldl_cholesterol': ldl_cholesterol,
@@ -280,19 +472,20 @@ def main():
                 
                 # Добавляем данные для ABCD² если были
                 if previous_stroke_tia == "да":
-                    user_data['limb_weakness'] = 'limb_weakness' in locals() and limb_weakness
-                    user_data['speech_disturbance'] = 'speech_disturbance' in locals() and speech_disturbance
+                    answers['limb_weakness'] = 'limb_weakness' in locals() and limb_weakness
+                    answers['speech_disturbance'] = 'speech_disturbance' in locals() and speech_disturbance
                     if 'tia_symptom_duration' in locals():
                         duration_map = {
                             "менее 10 минут": 5,
                             "10-59 минут": 30,
                             "60 минут и более": 60
                         }
-                        user_data['tia_symptom_duration'] = duration_map.get(tia_symptom_duration, 0)
+                        answers['tia_symptom_duration'] = duration_map.get(tia_symptom_duration, 0)
                 
-                # Сохраняем данные в сессии
-                st.session_state.user_data = user_data
-                st.session_state.calculated = True
+                # Сохраняем нормализованную запись в хранилище сессий и архив анкет
+                record = PatientRecord.from_dict(answers).to_dict()
+                save_session(record)
+                get_questionnaire().save_responses(record)
                 st.rerun()
     
     with tab2:
@@ -301,11 +494,11 @@ def main():
         if not st.session_state.get('calculated', False):
             st.info("Заполните анкету во вкладке 'Анкета' для получения результатов")
         else:
-            user_data = st.session_state.user_data
-            
             try:
+                user_data = PatientRecord.from_dict(st.session_state.user_data)
+
                 # Расчет риска
-                result = calculator.calculate_overall_risk(user_data)
+                result = risk_cache.calculate_overall_risk(user_data)
                 
                 # Отображение результатов
                 col1, col2 = st.columns([2, 1])
@@ -315,30 +508,7 @@ def main():
                     st.subheader("📊 Прогноз на 6 месяцев")
                     
                     # Визуализация риска
-                    fig = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=result.six_month_risk,
-                        domain={'x': [0, 1], 'y': [0, 1]},
-                        title={'text': f"Риск инсульта за 6 месяцев (%)"},
-                        gauge={
-                            'axis': {'range': [None, 15]},
-                            'bar': {'color': "darkblue"},
-                            'steps': [
-                                {'range': [0, 1], 'color': "lightgreen"},
-                                {'range': [1, 3], 'color': "yellow"},
-                                {'range': [3, 10], 'color': "orange"},
-                                {'range': [10, 15], 'color': "red"}
-                            ],
-                            'threshold': {
-                                'line': {'color': "red", 'width': 4},
-                                'thickness': 0.75,
-                                'value': result.six_month_risk
-                            }
-                        }
-                    ))
-                    
-                    fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(risk_gauge(result.six_month_risk), use_container_width=True)
                     
                     # Уровень риска с цветовым кодированием
                     risk_class = f"risk-{result.risk_level.value.lower()}"
@@ -407,10 +577,43 @@ def main():
                     st.write("3. **Шкала CHA₂DS₂-VASc** - для оценки риска при мерцательной аритмии")
                     
                     st.write("\n**Ваши основные факторы риска:**")
-                    framingham_score, _, risk_factors = calculator.calculate_framingham_6month_risk(user_data)
-                    for factor in risk_factors[:5]:  # Показываем топ-5 факторов
-                        st.write(f"• {factor}")
-                
+                    top_factors = sorted(result.risk_factors, key=lambda item: -item[1])
+                    for factor, points in top_factors[:5]:  # Показываем топ-5 факторов
+                        st.write(f"• {factor} (+{points})")
+                    
+                    if result.abcd2_score is not None:
+                        st.write("\n**Шкала ABCD²:**")
+                        st.write(f"• Риск инсульта в течение 2 дней: {result.abcd2_two_day_risk}%")
+                        st.write(f"• Риск инсульта в течение 7 дней: {result.abcd2_seven_day_risk}%")
+                    
+                    if result.chads2_vasc_score is not None:
+                        st.write("\n**Шкала CHA₂DS₂-VASc:**")
+                        st.write(f"• Годовой риск инсульта: {result.chads2_vasc_annual_risk}%")
+                        for criterion in result.chads2_vasc_criteria:
+                            st.write(f"• {criterion}")
+
+                # Что если: риск при изменении двух модифицируемых факторов
+                st.divider()
+                st.subheader("🔬 Что если...")
+                fields = list(FACTOR_LABELS)
+                col1, col2 = st.columns(2)
+                with col1:
+                    x_field = st.selectbox("По горизонтали", fields, index=0,
+                                           format_func=FACTOR_LABELS.get)
+                with col2:
+                    y_field = st.selectbox("По вертикали",
+                                           [field for field in fields if field != x_field],
+                                           index=0, format_func=FACTOR_LABELS.get)
+                st.plotly_chart(sensitivity_heatmap(user_data, x_field, y_field),
+                                use_container_width=True)
+                st.caption("Остальные показатели - как в вашей анкете")
+
+                st.divider()
+                if st.button("🗑️ Удалить мои ответы"):
+                    forget_session()
+                    st.rerun()
+                st.caption(f"Ответы хранятся {SESSION_TTL / 3600:g} ч после последнего расчета")
+
             except ValueError as e:
                 st.error(str(e))
             except Exception as e:
@@ -546,9 +749,5 @@ def main():
 
 
 if __name__ == "__main__":
-    if 'calculated' not in st.session_state:
-        st.session_state.calculated = False
-    if 'user_data' not in st.session_state:
-        st.session_state.user_data = {}
-    
+    load_session()
     main()
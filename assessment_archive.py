@@ -0,0 +1,260 @@
+"""
+Мой Риск: колоночный архив анкет и результатов расчета
+©️ 2025
+
+Архив - каталог с разделами по дате оценки:
+
+    <root>/date=2025-03-14/part-00000/age.npy
+                                     /risk_level.npy
+                                     /...
+                                     /_meta.json
+
+В каждой части лежат закодированные ответы анкеты (как encode_columns),
+колонки результата (как score_encoded) и время оценки 'assessed_at'
+по одному файлу .npy на колонку. В _meta.json записаны число строк и
+минимум/максимум каждой колонки. Запрос сначала отбрасывает разделы по
+дате и части по минимуму/максимуму, затем отображает в память только
+нужные колонки оставшихся частей.
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_scoring import (
+    CATEGORICAL_FIELDS, RISK_LEVELS, columns_from_records, encode_columns, score_encoded
+)
+from scoring_rules import ScoringRules, DEFAULT_RULES
+from stroke_risk_calculator import RiskLevel
+
+
+META_FILE = '_meta.json'
+PARTITION_PREFIX = 'date='
+PART_PREFIX = 'part-'
+
+
+def _partition_name(day: date) -> str:
+    return f'{PARTITION_PREFIX}{day.isoformat()}'
+
+
+def _code(column: str, value):
+    """Значение условия в коде колонки: текст категории, уровень риска, время"""
+    if column == 'assessed_at' and value is not None:
+        return np.datetime64(value, 's')
+    if column == 'risk_level':
+        if isinstance(value, str):
+            value = RiskLevel[value] if value in RiskLevel.__members__ else RiskLevel(value)
+        return RISK_LEVELS.index(value) if isinstance(value, RiskLevel) else value
+    if column in CATEGORICAL_FIELDS and isinstance(value, str):
+        choices = CATEGORICAL_FIELDS[column]
+        return choices.index(value) if value in choices else 0
+    return value
+
+
+class ArchiveWriter:
+    """
+    Запись оценок в архив
+
+    write() пишет когорту одной частью; add() копит отдельные анкеты в
+    памяти и сбрасывает их частями по flush_rows строк (и при close()).
+    Результаты считаются векторизованно при записи части.
+    """
+
+    def __init__(self, root: str, flush_rows: int = 50_000, min_age: int = 15,
+                 rules: ScoringRules = DEFAULT_RULES):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.min_age = min_age
+        self.rules = rules
+        self._pending: Dict[date, List[Tuple[Dict, datetime]]] = {}
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, user_data: Dict, assessed_at: Optional[datetime] = None):
+        """Добавить одну анкету (запись на диск - при накоплении flush_rows)"""
+        assessed_at = assessed_at or datetime.now()
+        with self._lock:
+            self._pending.setdefault(assessed_at.date(), []).append((user_data, assessed_at))
+            self._pending_rows += 1
+            if self._pending_rows < self.flush_rows:
+                return
+            pending, self._pending, self._pending_rows = self._pending, {}, 0
+        self._write_pending(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, {}, 0
+        self._write_pending(pending)
+
+    def close(self):
+        self.flush()
+
+    def _write_pending(self, pending: Dict[date, List[Tuple[Dict, datetime]]]):
+        for day, rows in pending.items():
+            records = [user_data for user_data, _ in rows]
+            times = np.array([assessed_at for _, assessed_at in rows], dtype='datetime64[s]')
+            self.write(columns_from_records(records), day, times)
+
+    def write(self, data: Mapping, day: date,
+              assessed_at: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        Записать когорту (DataFrame или словарь колонок) частью раздела day
+
+        assessed_at - время оценки каждой строки (по умолчанию - начало дня).
+        Возвращает путь части или None для пустой когорты.
+        """
+        encoded = encode_columns(data)
+        rows = len(encoded['age'])
+        if rows == 0:
+            return None
+        columns = dict(encoded)
+        columns.update(score_encoded(encoded, self.min_age, self.rules))
+        if assessed_at is None:
+            assessed_at = np.full(rows, np.datetime64(day, 's'))
+        columns['assessed_at'] = np.asarray(assessed_at, dtype='datetime64[s]')
+
+        partition = os.path.join(self.root, _partition_name(day))
+        os.makedirs(partition, exist_ok=True)
+        temporary = os.path.join(partition, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+        os.makedirs(temporary)
+        meta = {'rows': rows, 'columns': {}}
+        for name, values in columns.items():
+            np.save(os.path.join(temporary, f'{name}.npy'), values)
+            low, high = values.min(), values.max()
+            if values.dtype.kind == 'M':
+                low, high = low.astype('int64'), high.astype('int64')
+            meta['columns'][name] = {'dtype': values.dtype.str,
+                                     'min': low.item(), 'max': high.item()}
+        with open(os.path.join(temporary, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        # Часть появляется в архиве целиком: переименование каталога атомарно
+        number = len([name for name in os.listdir(partition) if name.startswith(PART_PREFIX)])
+        while True:
+            path = os.path.join(partition, f'{PART_PREFIX}{number:05d}')
+            try:
+                os.rename(temporary, path)
+                return path
+            except OSError:
+                if not os.path.exists(path):
+                    raise
+                number += 1
+
+
+class ArchiveReader:
+    """Запросы к архиву с отсечением разделов, частей и колонок"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def partitions(self, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+        """Даты разделов в диапазоне [start, end]"""
+        days = []
+        for name in os.listdir(self.root):
+            if not name.startswith(PARTITION_PREFIX):
+                continue
+            day = date.fromisoformat(name[len(PARTITION_PREFIX):])
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def _parts(self, day: date) -> Iterator[Tuple[str, Dict]]:
+        partition = os.path.join(self.root, _partition_name(day))
+        for name in sorted(os.listdir(partition)):
+            if name.startswith(PART_PREFIX):
+                path = os.path.join(partition, name)
+                with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+                    yield path, json.load(f)
+
+    def query(self, columns: Sequence[str],
+              start: Optional[date] = None, end: Optional[date] = None,
+              ranges: Optional[Mapping[str, Tuple]] = None,
+              isin: Optional[Mapping[str, Iterable]] = None,
+              include_invalid: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Колонки строк, удовлетворяющих условиям
+
+        ranges - {колонка: (минимум, максимум)} включительно (None - без границы),
+        isin - {колонка: допустимые значения}; для категориальных полей и
+        risk_level можно передавать текст или RiskLevel. Строки с valid=False
+        (возраст младше min_age) возвращаются только при include_invalid=True
+        или явном условии на 'valid'.
+        """
+        ranges = {name: (_code(name, low), _code(name, high))
+                  for name, (low, high) in (ranges or {}).items()}
+        isin = {name: np.array([_code(name, value) for value in values])
+                for name, values in (isin or {}).items()}
+        if not include_invalid and 'valid' not in ranges and 'valid' not in isin:
+            isin['valid'] = np.array([True])
+        needed = list(dict.fromkeys(list(columns) + list(ranges) + list(isin)))
+
+        pieces: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+        for day in self.partitions(start, end):
+            for path, meta in self._parts(day):
+                if not self._may_match(meta, ranges, isin):
+                    continue
+                loaded = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                          for name in needed}
+                mask = np.ones(meta['rows'], dtype=bool)
+                for name, (low, high) in ranges.items():
+                    if low is not None:
+                        mask &= loaded[name] >= low
+                    if high is not None:
+                        mask &= loaded[name] <= high
+                for name, values in isin.items():
+                    mask &= np.isin(loaded[name], values)
+                if mask.any():
+                    for name in columns:
+                        pieces[name].append(loaded[name][mask])
+
+        result = {}
+        for name in columns:
+            if pieces[name]:
+                result[name] = np.concatenate(pieces[name])
+            else:
+                result[name] = np.empty(0, dtype=self._dtype(name))
+        return result
+
+    @staticmethod
+    def _may_match(meta: Dict, ranges: Mapping[str, Tuple], isin: Mapping[str, np.ndarray]) -> bool:
+        """Отсечение части по минимуму/максимуму колонок"""
+        def bounds(name):
+            stats = meta['columns'][name]
+            if np.dtype(stats['dtype']).kind == 'M':
+                return np.datetime64(stats['min'], 's'), np.datetime64(stats['max'], 's')
+            return stats['min'], stats['max']
+
+        for name, (low, high) in ranges.items():
+            column_min, column_max = bounds(name)
+            if low is not None and column_max < low:
+                return False
+            if high is not None and column_min > high:
+                return False
+        for name, values in isin.items():
+            column_min, column_max = bounds(name)
+            if not ((values >= column_min) & (values <= column_max)).any():
+                return False
+        return True
+
+    def _dtype(self, name: str) -> np.dtype:
+        for day in self.partitions():
+            for _, meta in self._parts(day):
+                return np.dtype(meta['columns'][name]['dtype'])
+        return np.dtype(np.float64)
+
+    def risk_distribution(self, **conditions) -> Dict[RiskLevel, int]:
+        """Число оценок по уровням риска для условий query() (без valid=False)"""
+        levels = self.query(['risk_level'], **conditions)['risk_level']
+        counts = np.bincount(levels, minlength=len(RISK_LEVELS))
+        return {level: int(count) for level, count in zip(RISK_LEVELS, counts)}
@@ -0,0 +1,553 @@
+"""
+Мой Риск: векторизованный расчет риска инсульта для когорт
+©️ 2025
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from scoring_rules import ScoringRules, DEFAULT_RULES, Bands, BandRule, FlagRule, ChoiceRule
+from stroke_risk_calculator import (
+    StrokeRiskCalculator, RiskLevel, RiskResult, BMI_CATEGORIES, WARNING_FLAGS, RECOMMENDATIONS,
+    RECOMMENDATION_CODES, FACTOR_SMOKING, FACTOR_OVERWEIGHT, FACTOR_STROKE_TIA,
+    FACTOR_ATRIAL_FIBRILLATION, FACTOR_DIABETES, USER_DATA_FIELDS,
+)
+
+if TYPE_CHECKING:
+    from population_stats import PopulationStats
+
+
+# Уровни риска в порядке кодов колонки 'risk_level'
+RISK_LEVELS = tuple(RiskLevel)
+
+# Значение колонок 'abcd2_score' и 'chads2_vasc_score', когда шкала не применяется
+NOT_APPLICABLE = -1
+
+# Типы колонок результата score_encoded
+RESULT_DTYPES = {
+    'framingham_score': np.uint8,
+    'risk_code': np.uint8,          # индекс в таблице риска framingham_risk
+    'risk_level': np.uint8,         # индекс в RISK_LEVELS
+    'abcd2_score': np.int8,
+    'chads2_vasc_score': np.int8,
+    'bmi': np.float32,
+    'bmi_category': np.uint8,       # индекс в BMI_CATEGORIES
+    'warning_flags': np.uint8,      # бит i - WARNING_FLAGS[i]
+    'recommendations': np.uint32,   # бит i - RECOMMENDATIONS[i]
+    'valid': np.bool_,
+}
+
+# Числовые поля и значения по умолчанию (как в user_data.get(...))
+NUMERIC_FIELDS = {
+    'age': 0,
+    'systolic_bp': 0,
+    'diastolic_bp': 90,
+    'ldl_cholesterol': 0,
+    'weight_kg': 0,
+    'height_cm': 0,
+    'tia_symptom_duration': 0,
+}
+
+BOOLEAN_FIELDS = (
+    'on_blood_pressure_meds', 'has_diabetes', 'has_atrial_fibrillation',
+    'previous_stroke_tia', 'family_stroke_history', 'vascular_disease',
+    'limb_weakness', 'speech_disturbance',
+)
+
+# Категориальные поля кодируются индексом значения в кортеже, 0 - прочие значения
+CATEGORICAL_FIELDS = {
+    'smoking': ('никогда', 'курил в прошлом', 'курящий'),
+    'activity_level': ('подвижный', 'малоподвижный', 'неподвижный'),
+    'palpitations': ('никогда', 'редко', 'часто'),
+    'shortness_of_breath': ('никогда', 'редко', 'часто'),
+    'dizziness_fainting': ('никогда', 'редко', 'часто'),
+    'gender': ('мужской', 'женский'),
+}
+
+# Колонки encode_columns в порядке кодирования
+ENCODED_FIELDS = (*NUMERIC_FIELDS, *BOOLEAN_FIELDS, *CATEGORICAL_FIELDS)
+
+
+class BatchRules:
+    """Таблица правил, скомпилированная в массивы для searchsorted"""
+
+    def __init__(self, rules: ScoringRules):
+        self.framingham = []
+        for rule in rules.framingham:
+            if isinstance(rule, BandRule):
+                table = (_edges(rule.bands), np.array(rule.bands.values, dtype=np.int16))
+            elif isinstance(rule, FlagRule):
+                table = np.int16(rule.points)
+            else:
+                table = self._choice_points(rule)
+            self.framingham.append((type(rule), rule.field, table))
+
+        max_score = 0
+        for rule in rules.framingham:
+            if isinstance(rule, BandRule):
+                max_score += max(rule.bands.values)
+            elif isinstance(rule, FlagRule):
+                max_score += rule.points
+            else:
+                max_score += max(points for points, _ in rule.choices.values())
+        if max_score > np.iinfo(RESULT_DTYPES['framingham_score']).max:
+            raise ValueError("Максимальный балл Framingham не помещается в колонку результата")
+
+        self.framingham_risk_edges = _edges(rules.framingham_risk)
+        self.framingham_risk = np.array(rules.framingham_risk.values, dtype=np.float64)
+        self.risk_level_edges = _edges(rules.risk_levels)
+        self.risk_levels = np.array(
+            [RISK_LEVELS.index(RiskLevel[name]) for name in rules.risk_levels.values],
+            dtype=np.uint8,
+        )
+        self.abcd2_duration_edges = _edges(rules.abcd2_duration)
+        self.abcd2_duration = np.array(rules.abcd2_duration.values, dtype=np.int8)
+        self.chads2_vasc_age_edges = _edges(rules.chads2_vasc_age)
+        self.chads2_vasc_age = np.array(rules.chads2_vasc_age.values, dtype=np.int8)
+        self.bmi_category_edges = _edges(rules.bmi_categories)
+        self.bmi_categories = np.array(rules.bmi_categories.values, dtype=np.uint8)
+
+    @staticmethod
+    def _choice_points(rule: ChoiceRule) -> np.ndarray:
+        vocabulary = CATEGORICAL_FIELDS[rule.field]
+        points = np.zeros(len(vocabulary), dtype=np.int16)
+        for value, (value_points, _) in rule.choices.items():
+            if value not in vocabulary[1:]:
+                raise ValueError(
+                    f"Значение '{value}' поля '{rule.field}' не поддерживается "
+                    f"векторизованным расчетом"
+                )
+            points[vocabulary.index(value)] = value_points
+        return points
+
+
+def _edges(bands: Bands) -> np.ndarray:
+    return np.array(bands.edges, dtype=np.float64)
+
+
+@lru_cache(maxsize=16)
+def compile_rules(rules: ScoringRules) -> BatchRules:
+    """Компиляция таблицы правил (один раз на объект ScoringRules)"""
+    return BatchRules(rules)
+
+
+def _column(data: Mapping, name: str) -> np.ndarray:
+    return np.asarray(data[name])
+
+
+def _category_codes(column, choices: Tuple[str, ...]) -> Optional[np.ndarray]:
+    """
+    Коды правил для pandas Categorical по кодам категорий (None - не Categorical)
+
+    Категории сопоставляются с choices один раз, колонка индексируется
+    целочисленными .cat.codes без перевода значений в строки
+    """
+    if getattr(getattr(column, 'dtype', None), 'name', None) != 'category':
+        return None
+    # Последний элемент - для кода -1 (пропуск)
+    lookup = np.zeros(len(column.cat.categories) + 1, dtype=np.uint8)
+    for index, category in enumerate(column.cat.categories):
+        if category in choices[1:]:
+            lookup[index] = choices.index(category)
+    return lookup[np.asarray(column.cat.codes)]
+
+
+def _missing(values: np.ndarray) -> np.ndarray:
+    """Маска пропущенных значений (None/NaN)"""
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    if values.dtype.kind == 'O':
+        return np.fromiter(
+            (v is None or v != v for v in values), dtype=bool, count=len(values)
+        )
+    return np.zeros(len(values), dtype=bool)
+
+
+def row_count(data: Mapping) -> int:
+    """Число строк когорты (по первой колонке)"""
+    for name in data:
+        return len(data[name])
+    return 0
+
+
+def encode_column(data: Mapping, name: str, n: int) -> np.ndarray:
+    """Одна колонка encode_columns (n - число строк, если колонки нет)"""
+    if name in NUMERIC_FIELDS:
+        default = NUMERIC_FIELDS[name]
+        if name not in data:
+            return np.full(n, default, dtype=np.float64)
+        values = _column(data, name)
+        return np.where(_missing(values), default, values).astype(np.float64)
+
+    if name in CATEGORICAL_FIELDS:
+        choices = CATEGORICAL_FIELDS[name]
+        if name not in data:
+            return np.zeros(n, dtype=np.uint8)
+        codes = _category_codes(data[name], choices)
+        if codes is None:
+            codes = np.zeros(n, dtype=np.uint8)
+            values = _column(data, name)
+            for code, choice in enumerate(choices[1:], 1):
+                codes[values == choice] = code
+        return codes
+
+    if name not in data:
+        return np.zeros(n, dtype=bool)
+    values = _column(data, name)
+    if values.dtype == bool:
+        return values
+    return ~_missing(values) & values.astype(bool)
+
+
+def encode_columns(data: Mapping) -> Dict[str, np.ndarray]:
+    """
+    Приведение колонок когорты к числовому виду
+
+    Отсутствующие колонки и пропуски (None/NaN) заменяются значениями
+    по умолчанию, как при отсутствии ключа в user_data
+    """
+    n = row_count(data)
+    return {name: encode_column(data, name, n) for name in ENCODED_FIELDS}
+
+
+def _round_bmi(raw: np.ndarray) -> np.ndarray:
+    """Округление до 0.1, совпадающее со встроенной round()"""
+    bmi = np.round(raw, 1)
+    scaled = raw * 10
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(ties):
+        bmi[i] = round(float(raw[i]), 1)
+    return bmi
+
+
+def score_encoded(enc: Mapping[str, np.ndarray], min_age: int = 15,
+                  rules: ScoringRules = DEFAULT_RULES) -> Dict[str, np.ndarray]:
+    """Расчет всех шкал по закодированным колонкам"""
+    tables = compile_rules(rules)
+    age = enc['age']
+    systolic_bp = enc['systolic_bp']
+    ldl = enc['ldl_cholesterol']
+    previous_stroke = enc['previous_stroke_tia']
+    atrial_fibrillation = enc['has_atrial_fibrillation']
+    diabetes = enc['has_diabetes']
+    often = len(CATEGORICAL_FIELDS['palpitations']) - 1
+
+    # ИМТ
+    weight = enc['weight_kg']
+    height = enc['height_cm']
+    has_bmi = (height > 0) & (weight > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_bmi = np.where(has_bmi, weight / (height / 100) ** 2, 0.0)
+    bmi = _round_bmi(raw_bmi)
+    bmi_category = tables.bmi_categories[
+        np.searchsorted(tables.bmi_category_edges, bmi, side='right')
+    ]
+    bmi_category = np.where(has_bmi, bmi_category, 0).astype(np.uint8)
+
+    # Модифицированная шкала Framingham
+    score = np.zeros(len(age), dtype=np.int16)
+    for rule_type, field, table in tables.framingham:
+        values = enc[field]
+        if rule_type is BandRule:
+            edges, points = table
+            score += points[np.searchsorted(edges, values, side='right')]
+        elif rule_type is FlagRule:
+            score += values * table
+        else:
+            score += table[values]
+    risk_code = np.searchsorted(tables.framingham_risk_edges, score, side='right')
+    risk_level = tables.risk_levels[
+        np.searchsorted(tables.risk_level_edges, tables.framingham_risk[risk_code], side='right')
+    ]
+
+    # ABCD² (только после инсульта/ТИА)
+    duration = enc['tia_symptom_duration']
+    abcd2 = (age >= 60).astype(np.int8)
+    abcd2 += (systolic_bp >= 140) | (enc['diastolic_bp'] >= 90)
+    abcd2 += np.where(enc['limb_weakness'], 2, enc['speech_disturbance']).astype(np.int8)
+    abcd2 += tables.abcd2_duration[
+        np.searchsorted(tables.abcd2_duration_edges, duration, side='right')
+    ]
+    abcd2 += diabetes
+    abcd2 = np.where(previous_stroke, abcd2, NOT_APPLICABLE).astype(np.int8)
+
+    # CHA₂DS₂-VASc (только при мерцательной аритмии)
+    chads2_vasc = (enc['shortness_of_breath'] == often).astype(np.int8)
+    chads2_vasc += (systolic_bp >= 140) | enc['on_blood_pressure_meds']
+    chads2_vasc += tables.chads2_vasc_age[
+        np.searchsorted(tables.chads2_vasc_age_edges, age, side='right')
+    ]
+    chads2_vasc += diabetes
+    chads2_vasc += 2 * previous_stroke
+    chads2_vasc += enc['vascular_disease']
+    chads2_vasc += (enc['gender'] == 1) & (age >= 65)
+    chads2_vasc = np.where(atrial_fibrillation, chads2_vasc, NOT_APPLICABLE).astype(np.int8)
+
+    # Красные флаги, бит i соответствует WARNING_FLAGS[i]
+    flag_conditions = (
+        enc['dizziness_fainting'] == often,
+        enc['shortness_of_breath'] == often,
+        enc['palpitations'] == often,
+        previous_stroke,
+        atrial_fibrillation,
+        systolic_bp >= 180,
+        ldl >= 6.0,
+    )
+    warning_flags = np.zeros(len(age), dtype=np.uint8)
+    for bit, condition in enumerate(flag_conditions):
+        warning_flags |= condition.astype(np.uint8) << bit
+
+    # Рекомендации, бит i соответствует RECOMMENDATIONS[i]: одна выборка из
+    # таблицы по (уровень риска, маска факторов)
+    factors = np.where(bmi > 27, FACTOR_OVERWEIGHT, 0).astype(np.uint8)
+    factors |= (enc['smoking'] > 0).astype(np.uint8) * np.uint8(FACTOR_SMOKING)
+    factors |= previous_stroke.astype(np.uint8) * np.uint8(FACTOR_STROKE_TIA)
+    factors |= atrial_fibrillation.astype(np.uint8) * np.uint8(FACTOR_ATRIAL_FIBRILLATION)
+    factors |= diabetes.astype(np.uint8) * np.uint8(FACTOR_DIABETES)
+    recommendations = RECOMMENDATION_MASKS[risk_level, factors]
+
+    return {
+        'framingham_score': score.astype(np.uint8),
+        'risk_code': risk_code.astype(np.uint8),
+        'risk_level': risk_level,
+        'abcd2_score': abcd2,
+        'chads2_vasc_score': chads2_vasc,
+        'bmi': bmi.astype(np.float32),
+        'bmi_category': bmi_category,
+        'warning_flags': warning_flags,
+        'recommendations': recommendations,
+        'valid': age >= min_age,
+    }
+
+
+def _mask(codes: Sequence[int]) -> int:
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+
+# Маски рекомендаций по коду уровня риска и маске факторов (FACTOR_*)
+RECOMMENDATION_MASKS = np.array(
+    [[_mask(codes) for codes in RECOMMENDATION_CODES[level]] for level in RISK_LEVELS],
+    dtype=np.uint32,
+)
+
+
+def _decode(mask: int, table: Sequence[str]) -> List[str]:
+    return [text for bit, text in enumerate(table) if mask >> bit & 1]
+
+
+def decode_warning_flags(mask: int) -> List[str]:
+    """Список красных флагов по битовой маске"""
+    return _decode(int(mask), WARNING_FLAGS)
+
+
+def decode_recommendations(mask: int) -> List[str]:
+    """Список рекомендаций по битовой маске (в порядке вывода)"""
+    return _decode(int(mask), RECOMMENDATIONS)
+
+
+class BatchResult:
+    """
+    Компактный колоночный результат расчета когорты
+
+    Уровни риска и категории ИМТ хранятся кодами uint8, баллы - узкими
+    целыми, красные флаги и рекомендации - битовыми масками с индексами
+    в общих таблицах строк. Строки собираются только при выводе строки
+    (row) или выгрузке (to_frame).
+    """
+
+    __slots__ = tuple(RESULT_DTYPES) + ('risk_values', 'rules')
+
+    def __init__(self, columns: Mapping[str, np.ndarray], risk_values: Sequence[float],
+                 rules: ScoringRules = DEFAULT_RULES):
+        for name in RESULT_DTYPES:
+            setattr(self, name, columns[name])
+        self.risk_values = np.array(risk_values, dtype=np.float64)
+        self.rules = rules
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Колонка результата; риск и ИМТ возвращаются в исходных единицах"""
+        if name == 'six_month_risk':
+            return self.risk_values[self.risk_code]
+        if name == 'bmi':
+            return np.round(self.bmi.astype(np.float64), 1)
+        if name not in RESULT_DTYPES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in RESULT_DTYPES)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in RESULT_DTYPES}
+
+    def row(self, i: int, user_data: Optional[Mapping] = None) -> RiskResult:
+        """
+        Результат одной строки в виде RiskResult
+
+        Детализация (факторы Framingham, риски ABCD² и CHA₂DS₂-VASc,
+        критерии CHA₂DS₂-VASc) заполняется, если передан user_data этой
+        строки, и тогда результат совпадает с calculate_overall_risk.
+        """
+        abcd2 = int(self.abcd2_score[i])
+        chads2_vasc = int(self.chads2_vasc_score[i])
+        bmi = round(float(self.bmi[i]), 1)
+        result = RiskResult(
+            six_month_risk=float(self.risk_values[self.risk_code[i]]),
+            risk_level=RISK_LEVELS[self.risk_level[i]],
+            framingham_score=int(self.framingham_score[i]),
+            abcd2_score=None if abcd2 == NOT_APPLICABLE else abcd2,
+            chads2_vasc_score=None if chads2_vasc == NOT_APPLICABLE else chads2_vasc,
+            bmi=bmi,
+            bmi_category=BMI_CATEGORIES[self.bmi_category[i]],
+            recommendations=decode_recommendations(self.recommendations[i]),
+            warning_flags=decode_warning_flags(self.warning_flags[i]),
+        )
+        if user_data is not None:
+            rules = self.rules
+            result.risk_factors = rules.framingham_breakdown(user_data)[2]
+            if result.abcd2_score is not None:
+                result.abcd2_two_day_risk, result.abcd2_seven_day_risk = \
+                    rules.abcd2_risk.lookup(abcd2)
+            if result.chads2_vasc_score is not None:
+                # Критерии по тем же правилам, что и в скалярном расчете
+                _, result.chads2_vasc_annual_risk, result.chads2_vasc_criteria = \
+                    _scalar_calculator(rules).calculate_chads2_vasc_score(user_data)
+        return result
+
+    def to_frame(self, text: bool = False):
+        """
+        Выгрузка в pandas DataFrame
+
+        Уровень риска и категория ИМТ - категориальные колонки; при text=True
+        маски флагов и рекомендаций разворачиваются в строки через '; '
+        """
+        import pandas as pd
+        frame = pd.DataFrame({
+            'framingham_score': self.framingham_score,
+            'six_month_risk': self['six_month_risk'],
+            'risk_level': pd.Categorical.from_codes(
+                self.risk_level, categories=[level.value for level in RISK_LEVELS]
+            ),
+            'abcd2_score': self.abcd2_score,
+            'chads2_vasc_score': self.chads2_vasc_score,
+            'bmi': self['bmi'],
+            'bmi_category': pd.Categorical.from_codes(
+                self.bmi_category, categories=list(BMI_CATEGORIES)
+            ),
+            'warning_flags': self.warning_flags,
+            'recommendations': self.recommendations,
+            'valid': self.valid,
+        })
+        if text:
+            frame['warning_flags'] = [
+                '; '.join(decode_warning_flags(mask)) for mask in self.warning_flags
+            ]
+            frame['recommendations'] = [
+                '; '.join(decode_recommendations(mask)) for mask in self.recommendations
+            ]
+        return frame
+
+
+def columns_from_records(records: Sequence[Mapping]) -> Dict[str, list]:
+    """Словарь колонок для calculate_batch из списка user_data (нет ключа -> None)"""
+    return {
+        field: [record.get(field) for record in records]
+        for field in USER_DATA_FIELDS if any(field in record for record in records)
+    }
+
+
+# Типы значений записи, которые векторизованный путь считает как скалярный
+_NUMBER_TYPES = (int, float)
+_BOOLEAN_SET = frozenset(BOOLEAN_FIELDS)
+
+
+def vectorizable(user_data: Mapping) -> bool:
+    """
+    Считается ли запись векторизованно так же, как скалярно
+
+    Числа (не bool и не NaN), логические поля - bool, категориальные -
+    строки. Пропуски (None/NaN), строки вместо
+    чисел и прочее скалярный расчет обрабатывает по-своему (вплоть до
+    ошибки), поэтому такие записи идут скалярным путем.
+    """
+    for name, value in user_data.items():
+        if name in NUMERIC_FIELDS:
+            if type(value) not in _NUMBER_TYPES or value != value:
+                return False
+        elif name in CATEGORICAL_FIELDS:
+            # Незнакомая строка получает код 0 и, как и скалярно, не дает баллов
+            if not isinstance(value, str):
+                return False
+        elif name in _BOOLEAN_SET and type(value) is not bool:
+            return False
+    return True
+
+
+@lru_cache(maxsize=16)
+def _scalar_calculator(rules: ScoringRules) -> StrokeRiskCalculator:
+    return StrokeRiskCalculator(rules)
+
+
+def assess_records(records: Sequence[Mapping], calculator: StrokeRiskCalculator,
+                   scalar: Optional[Callable[[Mapping], RiskResult]] = None,
+                   stats: Optional['PopulationStats'] = None
+                   ) -> List[Tuple[Optional[RiskResult], Optional[Exception]]]:
+    """
+    Полные RiskResult для списка user_data - как calculate_overall_risk
+
+    Записи, прошедшие vectorizable, считаются одним calculate_batch с
+    детализацией по строке; остальные - функцией scalar (по умолчанию
+    calculator.calculate_overall_risk). Для каждой записи возвращается
+    (результат, None) или (None, ошибка TypeError/ValueError). Успешные
+    расчеты учитываются в stats: пакет - одним add_batch.
+    """
+    scalar = scalar or calculator.calculate_overall_risk
+    outcomes: List[Tuple[Optional[RiskResult], Optional[Exception]]] = [None] * len(records)
+    vector = []
+    for i, user_data in enumerate(records):
+        if vectorizable(user_data):
+            vector.append(i)
+            continue
+        try:
+            outcomes[i] = (scalar(user_data), None)
+        except (TypeError, ValueError) as e:
+            outcomes[i] = (None, e)
+        else:
+            if stats is not None:
+                stats.add_result(user_data, outcomes[i][0])
+    if vector:
+        columns = columns_from_records([records[i] for i in vector])
+        batch = calculate_batch(columns, calculator.min_age, calculator.rules)
+        if stats is not None:
+            stats.add_batch(columns, batch)
+        for j, i in enumerate(vector):
+            if batch.valid[j]:
+                outcomes[i] = (batch.row(j, records[i]), None)
+            else:
+                outcomes[i] = (None, ValueError(
+                    f"Минимальный возраст для оценки - {calculator.min_age} лет"))
+    return outcomes
+
+
+def calculate_batch(data: Mapping, min_age: int = 15,
+                    rules: ScoringRules = DEFAULT_RULES) -> BatchResult:
+    """
+    Векторизованный расчет риска для когорты
+
+    data - pandas DataFrame или словарь колонок с полями user_data.
+    Результат - BatchResult с колонками кодов (см. RISK_LEVELS,
+    BMI_CATEGORIES) и битовыми масками (см. WARNING_FLAGS, RECOMMENDATIONS).
+    Строки с возрастом младше min_age помечаются valid=False вместо
+    исключения ValueError.
+    """
+    columns = score_encoded(encode_columns(data), min_age=min_age, rules=rules)
+    return BatchResult(columns, rules.framingham_risk.values, rules)
@@ -0,0 +1,183 @@
+"""
+Бенчмарк скалярной шкалы Framingham: таблица правил против ветвлений
+
+Сравниваются три реализации одной шкалы на одной выборке профилей:
+    if_elif    - исходный расчет с ветвлениями, написанными вручную
+    table_loop - проход по объектам правил таблицы в цикле (интерпретация)
+    rules      - ScoringRules.framingham_factors: правила, заранее разложенные
+                 в кортежи, и bisect_right по отсортированным границам
+
+Запуск:
+    python benchmarks/bench_framingham.py
+    python benchmarks/bench_framingham.py --profiles 5000 --repeat 9 --json framingham.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_benchmarks import per_call_ns  # noqa: E402
+from scoring_rules import DEFAULT_RULES, BandRule, FlagRule, ScoringRules  # noqa: E402
+from synthetic_cohort import generate_profiles  # noqa: E402
+
+
+def if_elif(user_data: Dict) -> Tuple[int, float, List[str]]:
+    """Исходный расчет с ветвлениями (правила RULE_TABLE по умолчанию)"""
+    score = 0
+    risk_factors = []
+    age = user_data.get('age', 0)
+    if age < 35:
+        pass
+    elif age < 45:
+        score += 3
+        risk_factors.append("Возраст 35-44 года")
+    elif age < 55:
+        score += 5
+        risk_factors.append("Возраст 45-54 года")
+    elif age < 65:
+        score += 8
+        risk_factors.append("Возраст 55-64 года")
+    elif age < 75:
+        score += 10
+        risk_factors.append("Возраст 65-74 года")
+    else:
+        score += 12
+        risk_factors.append("Возраст 75+ лет")
+    systolic_bp = user_data.get('systolic_bp', 0)
+    if systolic_bp < 120:
+        pass
+    elif systolic_bp < 130:
+        score += 1
+        risk_factors.append("Нормальное АД (120-129)")
+    elif systolic_bp < 140:
+        score += 3
+        risk_factors.append("Высокое нормальное АД (130-139)")
+    elif systolic_bp < 160:
+        score += 5
+        risk_factors.append("Артериальная гипертензия 1 ст. (140-159)")
+    elif systolic_bp < 180:
+        score += 7
+        risk_factors.append("Артериальная гипертензия 2 ст. (160-179)")
+    else:
+        score += 9
+        risk_factors.append("Артериальная гипертензия 3 ст. (180+)")
+    if user_data.get('on_blood_pressure_meds', False):
+        score += 2
+        risk_factors.append("Прием антигипертензивных препаратов")
+    if user_data.get('has_diabetes', False):
+        score += 4
+        risk_factors.append("Сахарный диабет")
+    smoking_status = user_data.get('smoking', 'никогда')
+    if smoking_status == 'курящий':
+        score += 5
+        risk_factors.append("Курение в настоящее время")
+    elif smoking_status == 'курил в прошлом':
+        score += 2
+        risk_factors.append("Курение в прошлом")
+    if user_data.get('has_atrial_fibrillation', False):
+        score += 6
+        risk_factors.append("Мерцательная аритмия")
+    if user_data.get('previous_stroke_tia', False):
+        score += 8
+        risk_factors.append("Предыдущий инсульт/ТИА")
+    if user_data.get('palpitations', 'никогда') == 'часто':
+        score += 2
+        risk_factors.append("Частое сердцебиение")
+    if user_data.get('family_stroke_history', False):
+        score += 2
+        risk_factors.append("Семейный анамнез инсульта")
+    activity_level = user_data.get('activity_level', 'подвижный')
+    if activity_level == 'малоподвижный':
+        score += 1
+        risk_factors.append("Малоподвижный образ жизни")
+    elif activity_level == 'неподвижный':
+        score += 2
+        risk_factors.append("Неподвижный образ жизни")
+    ldl_cholesterol = user_data.get('ldl_cholesterol', 0)
+    if ldl_cholesterol >= 4.9:
+        score += 3
+        risk_factors.append(f"Высокий холестерин ЛПНП ({ldl_cholesterol} ммоль/л)")
+    elif ldl_cholesterol >= 3.0:
+        score += 1
+    if score <= 5:
+        risk_percent = 0.1
+    elif score <= 10:
+        risk_percent = 0.5
+    elif score <= 15:
+        risk_percent = 1.2
+    elif score <= 20:
+        risk_percent = 2.8
+    elif score <= 25:
+        risk_percent = 5.5
+    elif score <= 30:
+        risk_percent = 9.0
+    else:
+        risk_percent = 15.0
+    return score, round(risk_percent, 1), risk_factors
+
+
+def table_loop(user_data: Dict, rules: ScoringRules = DEFAULT_RULES) -> Tuple[int, float, List[str]]:
+    """Проход по правилам таблицы в цикле"""
+    get = user_data.get
+    score = 0
+    risk_factors = []
+    for rule in rules.framingham:
+        if isinstance(rule, FlagRule):
+            if get(rule.field, False):
+                score += rule.points
+                risk_factors.append(rule.label)
+        elif isinstance(rule, BandRule):
+            value = get(rule.field, rule.default)
+            i = bisect_right(rule.bands.edges, value)
+            score += rule.bands.values[i]
+            label = rule.bands.labels[i]
+            if label:
+                risk_factors.append(label.format(value=value) if rule.templates[i] else label)
+        else:
+            choice = rule.choices.get(get(rule.field, rule.default))
+            if choice:
+                score += choice[0]
+                risk_factors.append(choice[1])
+    return score, round(rules.framingham_risk.lookup(score), 1), risk_factors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--json', help='Сохранить отчет в JSON-файл')
+    args = parser.parse_args()
+
+    profiles = generate_profiles(args.profiles, args.seed)
+    cases = {
+        'if_elif': if_elif,
+        'table_loop': table_loop,
+        'rules': DEFAULT_RULES.framingham_factors,
+    }
+    for profile in profiles:
+        expected = if_elif(profile)
+        for name, func in cases.items():
+            if func(profile) != expected:
+                raise SystemExit(f"{name}: результат отличается для {profile}")
+
+    call_args = [(profile,) for profile in profiles]
+    report = {name: per_call_ns(func, call_args, args.repeat) for name, func in cases.items()}
+    baseline = report['if_elif']['min_ns']
+    print(f"{'реализация':<12} {'медиана, нс':>12} {'минимум, нс':>12} {'к if_elif':>10}")
+    for name, result in report.items():
+        print(f"{name:<12} {result['median_ns']:>12,.0f} {result['min_ns']:>12,.0f} "
+              f"{result['min_ns'] / baseline:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
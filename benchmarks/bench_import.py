@@ -0,0 +1,91 @@
+"""
+Бенчмарк времени импорта (холодный старт исполнителей и CLI)
+
+Каждый модуль импортируется в отдельном процессе с `python -X importtime`;
+из отчета интерпретатора берется суммарное время модуля и самые тяжелые
+зависимости. Результат можно сохранить в JSON и сравнивать между версиями.
+
+Запуск:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py stroke_risk_calculator --repeat 5 --json import.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'scoring_rules',
+    'stroke_risk_calculator',
+    'result_cache',
+    'risk_cube',
+    'batch_scoring',
+    'cohort_scoring',
+]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """Строки отчета -X importtime: (модуль, собственное время, суммарное время), мкс"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str, repeat: int, top: int) -> Dict:
+    """Лучшее из repeat суммарное время импорта модуля и его тяжелые зависимости"""
+    best = None
+    for _ in range(repeat):
+        rows = import_times(module)
+        total = next(cumulative for name, _, cumulative in reversed(rows) if name == module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    heaviest = sorted(rows, key=lambda row: row[2], reverse=True)
+    # Самые тяжелые модули верхнего уровня, кроме самого измеряемого
+    top_level = [(name, cumulative) for name, _, cumulative in heaviest
+                 if name != module and '.' not in name][:top]
+    return {
+        'module': module,
+        'total_ms': round(total / 1000, 2),
+        'modules_loaded': len(rows),
+        'heaviest': [{'module': name, 'ms': round(cumulative / 1000, 2)}
+                     for name, cumulative in top_level],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--json', help='Сохранить отчет в JSON-файл')
+    args = parser.parse_args()
+
+    report = [measure(module, args.repeat, args.top) for module in args.modules]
+    print(f"{'модуль':<24} {'время, мс':>10} {'модулей':>8}  самые тяжелые импорты")
+    for entry in report:
+        heaviest = ', '.join(f"{item['module']} {item['ms']:.1f}" for item in entry['heaviest'])
+        print(f"{entry['module']:<24} {entry['total_ms']:>10.1f} "
+              f"{entry['modules_loaded']:>8}  {heaviest}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': report}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Бенчмарк параллельного расчета когорт
+
+Когорта - DataFrame анкет с категориальными полями pandas Categorical,
+время включает кодирование колонок (encode_columns), как в cohort_scoring.
+
+Запуск:
+    python benchmarks/bench_parallel.py --rows 10000000 --workers 1 2 4 8 16 32
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scoring import calculate_batch, encode_columns  # noqa: E402
+from parallel_scoring import ParallelScorer  # noqa: E402
+from synthetic_cohort import iter_columns, to_frame  # noqa: E402
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--chunk-size', type=int, default=250_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cohort = to_frame(next(iter_columns(args.rows, chunk_size=args.rows)))
+    encoding = best_of(args.repeat, lambda: encode_columns(cohort))
+    baseline = best_of(args.repeat, lambda: calculate_batch(cohort))
+    print(f"кодирование в одном процессе: {encoding:.3f} с из {baseline:.3f} с")
+    print(f"{'исполнители':>12} {'время, с':>10} {'строк/с':>14} {'ускорение':>10}")
+    print(f"{'inline':>12} {baseline:>10.3f} {args.rows / baseline:>14,.0f} {1.0:>10.2f}")
+
+    for workers in args.workers:
+        with ParallelScorer(workers=workers, chunk_size=args.chunk_size) as scorer:
+            scorer.score(cohort)  # прогрев пула
+            elapsed = best_of(args.repeat, lambda: scorer.score(cohort))
+        print(f"{workers:>12} {elapsed:>10.3f} {args.rows / elapsed:>14,.0f} "
+              f"{baseline / elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
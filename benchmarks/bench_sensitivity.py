@@ -0,0 +1,60 @@
+"""
+Бенчмарк сетки "что если": полная сетка default_ranges для одного профиля
+
+Сетка по всем модифицируемым факторам (11 x 3 x 11 x 12 x 3 x 2 ячеек)
+строится одним векторизованным проходом; время сравнивается с бюджетом
+интерактивного ответа (--budget, по умолчанию 50 мс). При превышении
+процесс завершается с кодом 1.
+
+Запуск:
+    python benchmarks/bench_sensitivity.py
+    python benchmarks/bench_sensitivity.py --repeat 20 --budget 0.05 --json sensitivity.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensitivity import default_ranges, sensitivity_grid  # noqa: E402
+
+PROFILE = {'age': 67, 'weight_kg': 88, 'height_cm': 172, 'has_diabetes': True}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0.05,
+                        help='Допустимое время сетки, с (по умолчанию 0.05)')
+    parser.add_argument('--json', help='Сохранить отчет в JSON-файл')
+    args = parser.parse_args()
+
+    ranges = default_ranges(PROFILE)
+    cells = len(sensitivity_grid(PROFILE, ranges))  # прогрев
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        sensitivity_grid(PROFILE, ranges)
+        timings.append(time.perf_counter() - started)
+
+    report = {
+        'cells': cells,
+        'median_s': round(statistics.median(timings), 5),
+        'min_s': round(min(timings), 5),
+        'budget_s': args.budget,
+    }
+    print(f"ячеек: {cells:,}; медиана {report['median_s'] * 1000:.1f} мс, "
+          f"минимум {report['min_s'] * 1000:.1f} мс (бюджет {args.budget * 1000:.0f} мс)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report['median_s'] > args.budget else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+"""
+Бенчмарк пакетной валидации анкет (Questionnaire.validate_frame)
+
+Синтетическая когорта заданного размера проверяется одним вызовом
+validate_frame; время сравнивается с бюджетом (--budget, по умолчанию
+1 с на 1 000 000 строк). При превышении процесс завершается с кодом 1.
+
+Запуск:
+    python benchmarks/bench_validation.py
+    python benchmarks/bench_validation.py --rows 1000000 --repeat 5 --json validation.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from questionnaire import Questionnaire  # noqa: E402
+from synthetic_cohort import iter_frames  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='Допустимое время проверки, с (по умолчанию 1.0)')
+    parser.add_argument('--json', help='Сохранить отчет в JSON-файл')
+    args = parser.parse_args()
+
+    questionnaire = Questionnaire()
+    frame = next(iter_frames(args.rows, seed=args.seed, chunk_size=args.rows))
+    questionnaire.validate_frame(frame.head(10))  # прогрев
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = questionnaire.validate_frame(frame)
+        timings.append(time.perf_counter() - started)
+
+    report = {
+        'rows': args.rows,
+        'invalid_rows': int((~result.valid).sum()),
+        'median_s': round(statistics.median(timings), 4),
+        'min_s': round(min(timings), 4),
+        'rows_per_sec': round(args.rows / min(timings)),
+        'budget_s': args.budget,
+    }
+    print(f"строк: {args.rows:,}; медиана {report['median_s']:.3f} с, "
+          f"минимум {report['min_s']:.3f} с, {report['rows_per_sec']:,} строк/с "
+          f"(бюджет {args.budget:.2f} с)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report['median_s'] > args.budget else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
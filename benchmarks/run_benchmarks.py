@@ -0,0 +1,215 @@
+"""
+Набор бенчмарков расчета риска: задержка шкал, полный расчет, пропускная способность
+
+Измеряется задержка одного вызова каждой шкалы и calculate_overall_risk
+на фиксированной (по seed) выборке профилей, а также строки в секунду и
+пиковая память (tracemalloc) векторизованного расчета когорт разного
+размера: от DataFrame анкет через encode_columns до BatchResult, с
+отдельным временем кодирования и расчета. Отчет пишется в JSON; при указании --baseline результаты
+сравниваются с прошлым отчетом, и при регрессии больше порога процесс
+завершается с кодом 1.
+
+Запуск:
+    python benchmarks/run_benchmarks.py --json bench.json
+    python benchmarks/run_benchmarks.py --rows 10000 1000000 10000000 --json new.json \\
+        --baseline bench.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import InstrumentedCalculator, RiskMetrics  # noqa: E402
+from patient_record import PatientRecord  # noqa: E402
+from stroke_risk_calculator import StrokeRiskCalculator  # noqa: E402
+from synthetic_cohort import generate_profiles, iter_columns, to_frame  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+
+def per_call_ns(func: Callable, args: List[tuple], repeat: int) -> Dict[str, float]:
+    """Медиана и минимум по повторам среднего времени одного вызова, нс"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for call_args in args:
+            func(*call_args)
+        timings.append((time.perf_counter_ns() - started) / len(args))
+    return {'median_ns': round(statistics.median(timings), 1), 'min_ns': round(min(timings), 1)}
+
+
+def latency_cases(calculator: StrokeRiskCalculator, profiles: List[Dict]) -> Dict[str, tuple]:
+    """Имя -> (функция, аргументы вызовов)"""
+    recommendation_args = []
+    for profile in profiles:
+        _, risk, factors = calculator.calculate_framingham_6month_risk(profile)
+        recommendation_args.append((calculator.determine_risk_level(risk), profile, factors))
+    return {
+        'calculate_bmi': (calculator.calculate_bmi,
+                          [(p['weight_kg'], p['height_cm']) for p in profiles]),
+        'calculate_framingham_6month_risk': (calculator.calculate_framingham_6month_risk,
+                                             [(p,) for p in profiles]),
+        'calculate_abcd2_score': (calculator.calculate_abcd2_score, [(p,) for p in profiles]),
+        'calculate_chads2_vasc_score': (calculator.calculate_chads2_vasc_score,
+                                        [(p,) for p in profiles]),
+        'generate_recommendations': (calculator.generate_recommendations, recommendation_args),
+        'calculate_overall_risk': (calculator.calculate_overall_risk, [(p,) for p in profiles]),
+        # Накладные расходы метрик: общее время в каждом вызове, этапы - выборочно
+        'calculate_overall_risk[InstrumentedCalculator]': (
+            InstrumentedCalculator(RiskMetrics()).calculate_overall_risk,
+            [(p,) for p in profiles]),
+        'calculate_overall_risk[все этапы]': (
+            InstrumentedCalculator(RiskMetrics(), stage_sample_every=1).calculate_overall_risk,
+            [(p,) for p in profiles]),
+        # Запись пациента: нормализация один раз и расчет по ней (get() через getattr)
+        'PatientRecord.from_dict': (PatientRecord.from_dict, [(p,) for p in profiles]),
+        'calculate_overall_risk[PatientRecord]': (calculator.calculate_overall_risk,
+                                                  [(PatientRecord.from_dict(p),)
+                                                   for p in profiles]),
+    }
+
+
+def measure_throughput(rows: int, repeat: int, seed: int) -> Dict[str, float]:
+    """
+    Строки в секунду и пиковая память векторизованного расчета когорты
+
+    Расчет начинается с DataFrame анкет, как в cohort_scoring: время
+    включает encode_columns, а также приводится отдельно для кодирования
+    и для score_encoded + BatchResult.
+    """
+    from batch_scoring import BatchResult, encode_columns, score_encoded
+    from scoring_rules import DEFAULT_RULES
+
+    frame = to_frame(next(iter_columns(rows, seed, chunk_size=rows)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoded = encode_columns(frame)
+        encoded_at = time.perf_counter()
+        BatchResult(score_encoded(encoded), DEFAULT_RULES.framingham_risk.values)
+        timings.append((time.perf_counter() - started, encoded_at - started))
+    del encoded
+
+    # Память измеряется отдельным прогоном: трассировка замедляет расчет
+    tracemalloc.start()
+    BatchResult(score_encoded(encode_columns(frame)), DEFAULT_RULES.framingham_risk.values)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best, encode = min(timings)
+    return {
+        'rows': rows,
+        'seconds': round(best, 4),
+        'encode_seconds': round(encode, 4),
+        'score_seconds': round(best - encode, 4),
+        'rows_per_sec': round(rows / best),
+        'score_rows_per_sec': round(rows / (best - encode)),
+        'peak_mb': round(peak / 2**20, 2),
+        'peak_bytes_per_row': round(peak / rows, 1),
+    }
+
+
+def environment() -> Dict[str, str]:
+    import numpy as np
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Регрессии относительно прошлого отчета больше порога (доля)"""
+    regressions = []
+    for name, current in report['latency'].items():
+        previous = baseline.get('latency', {}).get(name)
+        if previous and current['median_ns'] > previous['median_ns'] * (1 + threshold):
+            regressions.append(
+                f"{name}: {previous['median_ns']:.0f} -> {current['median_ns']:.0f} нс/вызов"
+            )
+    previous_rows = {entry['rows']: entry for entry in baseline.get('throughput', [])}
+    for current in report['throughput']:
+        previous = previous_rows.get(current['rows'])
+        if previous and current['rows_per_sec'] < previous['rows_per_sec'] * (1 - threshold):
+            regressions.append(
+                f"когорта {current['rows']:,}: {previous['rows_per_sec']:,} -> "
+                f"{current['rows_per_sec']:,} строк/с"
+            )
+        if previous and current['peak_mb'] > previous['peak_mb'] * (1 + threshold):
+            regressions.append(
+                f"когорта {current['rows']:,}: пиковая память "
+                f"{previous['peak_mb']} -> {current['peak_mb']} МБ"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=2000,
+                        help='Профилей в выборке для задержки (по умолчанию 2000)')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='Размеры когорт для пропускной способности')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--json', help='Сохранить отчет в JSON-файл')
+    parser.add_argument('--baseline', help='JSON-отчет прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Допустимое ухудшение, доля (по умолчанию 0.10)')
+    args = parser.parse_args(argv)
+
+    calculator = StrokeRiskCalculator()
+    profiles = generate_profiles(args.profiles, args.seed)
+    report = {'environment': environment(), 'latency': {}, 'throughput': []}
+
+    print(f"{'вызов':<48} {'медиана, нс':>12} {'минимум, нс':>12}")
+    for name, (func, call_args) in latency_cases(calculator, profiles).items():
+        func(*call_args[0])  # прогрев
+        result = report['latency'][name] = per_call_ns(func, call_args, args.repeat)
+        print(f"{name:<48} {result['median_ns']:>12,.0f} {result['min_ns']:>12,.0f}")
+
+    print(f"\n{'строк':>12} {'время, с':>10} {'кодир., с':>10} {'расчет, с':>10} "
+          f"{'строк/с':>14} {'пик, МБ':>10} {'байт/строку':>12}")
+    for rows in args.rows:
+        result = measure_throughput(rows, min(args.repeat, 3), args.seed)
+        report['throughput'].append(result)
+        print(f"{rows:>12,} {result['seconds']:>10.3f} {result['encode_seconds']:>10.3f} "
+              f"{result['score_seconds']:>10.3f} {result['rows_per_sec']:>14,} "
+              f"{result['peak_mb']:>10.1f} {result['peak_bytes_per_row']:>12.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nРегрессии больше {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nРегрессий больше {args.threshold:.0%} нет")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""
+Мой Риск: компактный файл когорты для повторного расчета без разбора CSV
+©️ 2025
+
+Когорта один раз переводится в файл .npy со структурным типом
+COHORT_DTYPE - записями фиксированной ширины (43 байта на пациента) со
+всеми полями, которые читает калькулятор. Расчет идет прямо по
+np.memmap этого файла порциями: поля порции передаются в score_encoded
+без построения словарей Python и без разбора текста.
+
+Запуск:
+    python -m cohort_file convert cohort.csv cohort.npy
+    python -m cohort_file score cohort.npy
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+from batch_scoring import (
+    BOOLEAN_FIELDS, CATEGORICAL_FIELDS, NUMERIC_FIELDS, RESULT_DTYPES, RISK_LEVELS,
+    BatchResult, encode_columns, score_encoded,
+)
+from scoring_rules import ScoringRules, DEFAULT_RULES
+
+
+# Порция расчета: временные колонки score_encoded остаются в кэше процессора
+DEFAULT_CHUNK_SIZE = 65_536
+
+# Числовые поля, для которых хватает float32 (целые и половинные значения
+# представляются точно); остальные хранятся в float64 без потерь
+FLOAT32_FIELDS = ('age', 'height_cm', 'systolic_bp', 'diastolic_bp', 'tia_symptom_duration')
+
+# Запись пациента: числовые поля, логические поля битами в 'flags'
+# (бит i - BOOLEAN_FIELDS[i]) и коды категориальных полей (как encode_columns)
+COHORT_DTYPE = np.dtype(
+    [(name, '<f4' if name in FLOAT32_FIELDS else '<f8') for name in NUMERIC_FIELDS]
+    + [('flags', 'u1')]
+    + [(name, 'u1') for name in CATEGORICAL_FIELDS]
+)
+
+
+def encode_records(data: Mapping) -> np.ndarray:
+    """Массив записей COHORT_DTYPE из DataFrame или словаря колонок"""
+    encoded = encode_columns(data)
+    records = np.zeros(len(encoded['age']), dtype=COHORT_DTYPE)
+    for name in NUMERIC_FIELDS:
+        values = encoded[name]
+        records[name] = values
+        if name in FLOAT32_FIELDS and not np.array_equal(records[name], values):
+            raise ValueError(f"Значения поля '{name}' не представимы точно в float32")
+    flags = records['flags']
+    for bit, name in enumerate(BOOLEAN_FIELDS):
+        flags |= encoded[name].astype(np.uint8) << bit
+    for name in CATEGORICAL_FIELDS:
+        records[name] = encoded[name]
+    return records
+
+
+def decode_records(records: np.ndarray) -> Dict[str, np.ndarray]:
+    """Колонки для score_encoded из порции записей (числовые поля - float64)"""
+    columns = {name: records[name].astype(np.float64) for name in NUMERIC_FIELDS}
+    flags = records['flags']
+    for bit, name in enumerate(BOOLEAN_FIELDS):
+        columns[name] = (flags & (1 << bit)).astype(bool)
+    for name in CATEGORICAL_FIELDS:
+        columns[name] = records[name]
+    return columns
+
+
+def write_cohort_file(path: str, chunks: Iterable[Mapping]) -> int:
+    """
+    Запись порций когорты (DataFrame или словари колонок) в файл .npy
+
+    Число строк заранее неизвестно, поэтому записи сначала пишутся во
+    временный файл, а затем копируются за заголовок .npy. Возвращает
+    число строк.
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    rows = 0
+    try:
+        with open(temporary, 'wb') as raw:
+            for chunk in chunks:
+                records = encode_records(chunk)
+                raw.write(records.tobytes())
+                rows += len(records)
+        with open(path + '.part', 'wb') as out, open(temporary, 'rb') as raw:
+            np.lib.format.write_array_header_1_0(out, {
+                'descr': np.lib.format.dtype_to_descr(COHORT_DTYPE),
+                'fortran_order': False,
+                'shape': (rows,),
+            })
+            while True:
+                block = raw.read(16 * 1024 * 1024)
+                if not block:
+                    break
+                out.write(block)
+        os.replace(path + '.part', path)
+    finally:
+        for leftover in (temporary, path + '.part'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return rows
+
+
+def convert(input_path: str, output_path: str, chunk_size: int = 100_000) -> int:
+    """Однократный перевод файла когорты (CSV/Parquet) в формат COHORT_DTYPE"""
+    from cohort_scoring import read_chunks
+    return write_cohort_file(output_path, read_chunks(input_path, chunk_size))
+
+
+def open_cohort(path: str) -> np.memmap:
+    """Отображение файла когорты в память (только чтение)"""
+    records = np.load(path, mmap_mode='r')
+    if records.dtype != COHORT_DTYPE:
+        raise ValueError(f"{path}: тип записей не совпадает с COHORT_DTYPE")
+    return records
+
+
+def score_cohort(records: Union[str, np.ndarray],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 min_age: int = 15,
+                 rules: ScoringRules = DEFAULT_RULES) -> BatchResult:
+    """
+    Расчет риска по файлу когорты или массиву записей COHORT_DTYPE
+
+    Записи читаются порциями по chunk_size строк, поэтому поверх результата
+    в памяти находятся только колонки одной порции.
+    """
+    if isinstance(records, str):
+        records = open_cohort(records)
+    rows = len(records)
+    columns = {name: np.empty(rows, dtype=dtype) for name, dtype in RESULT_DTYPES.items()}
+    for start in range(0, rows, chunk_size):
+        chunk = decode_records(records[start:start + chunk_size])
+        for name, values in score_encoded(chunk, min_age, rules).items():
+            columns[name][start:start + chunk_size] = values
+    return BatchResult(columns, rules.framingham_risk.values, rules)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m cohort_file',
+        description='Мой Риск: компактный файл когорты'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert_command = commands.add_parser('convert', help='Перевести CSV/Parquet в .npy')
+    convert_command.add_argument('input', help='Входной файл (.csv или .parquet)')
+    convert_command.add_argument('output', help='Файл когорты .npy')
+    convert_command.add_argument('--chunk-size', type=int, default=100_000)
+    score_command = commands.add_parser('score', help='Распределение уровней риска')
+    score_command.add_argument('input', help='Файл когорты .npy')
+    score_command.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == 'convert':
+        rows = convert(args.input, args.output, args.chunk_size)
+        print(f"Записано {rows} строк: {args.output}", file=sys.stderr)
+    else:
+        result = score_cohort(args.input, args.chunk_size)
+        rows = len(result)
+        counts = np.bincount(result.risk_level, minlength=len(RISK_LEVELS))
+        for level, count in zip(RISK_LEVELS, counts):
+            print(f"{level.value}: {count}")
+    elapsed = time.perf_counter() - started
+    print(f"{rows} строк за {elapsed:.2f} с ({rows / max(elapsed, 1e-9):,.0f} строк/с)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
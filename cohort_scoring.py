@@ -0,0 +1,259 @@
+"""
+Мой Риск: потоковый расчет риска для больших когорт (CSV/Parquet)
+©️ 2025
+
+Запуск:
+    python -m stroke_risk_calculator score in.csv out.parquet
+
+Файл читается блоками фиксированного размера, каждый блок считается
+векторизованно и сразу записывается, поэтому потребление памяти не зависит
+от размера файла. Для Parquet (вход или выход) нужен пакет pyarrow;
+результат в Parquet записывается каталогом part-файлов.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from batch_scoring import calculate_batch, BatchResult
+from population_stats import PopulationStats
+from stroke_risk_calculator import USER_DATA_FIELDS
+
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+def _is_parquet(path: str) -> bool:
+    return path.endswith('.parquet')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для работы с Parquet установите пакет pyarrow")
+    return pq
+
+
+def read_chunks(path: str, chunk_size: int, skip_chunks: int = 0,
+                id_column: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Чтение входного файла блоками по chunk_size строк"""
+    wanted = set(USER_DATA_FIELDS)
+    if id_column:
+        wanted.add(id_column)
+
+    if _is_parquet(path):
+        pq = _require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        batches = parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+        for index, batch in enumerate(batches):
+            if index >= skip_chunks:
+                yield batch.to_pandas()
+        return
+
+    skip_rows = skip_chunks * chunk_size
+    yield from pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        skiprows=(lambda row: 0 < row <= skip_rows) if skip_rows else None,
+        usecols=lambda name: name in wanted,
+    )
+
+
+def result_frame(chunk: pd.DataFrame, batch: BatchResult,
+                 id_column: Optional[str] = None) -> pd.DataFrame:
+    """Таблица результатов блока chunk, рассчитанного в batch"""
+    frame = batch.to_frame()
+    if id_column:
+        frame.insert(0, id_column, chunk[id_column].to_numpy())
+    return frame
+
+
+class Checkpoint:
+    """Файл прогресса рядом с результатом: сколько блоков уже записано"""
+
+    def __init__(self, output_path: str):
+        self.path = output_path + '.progress.json'
+
+    def load(self) -> Optional[dict]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, state: dict):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CsvResultWriter:
+    """Дозапись результатов в один CSV-файл"""
+
+    def __init__(self, path: str, resume_bytes: Optional[int]):
+        self.path = path
+        if resume_bytes is None:
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+        else:
+            # Отбрасываем блок, записанный после последней контрольной точки
+            self.file = open(path, 'r+', encoding='utf-8', newline='')
+            self.file.truncate(resume_bytes)
+            self.file.seek(resume_bytes)
+        self.header = resume_bytes is None or resume_bytes == 0
+
+    def write(self, frame: pd.DataFrame, index: int):
+        frame.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """Запись результатов каталогом part-файлов Parquet"""
+
+    def __init__(self, path: str, resume_chunks: Optional[int]):
+        self.pq = _require_pyarrow()
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Удаляем части, не попавшие в контрольную точку
+        for name in os.listdir(path):
+            if not name.startswith('part-'):
+                continue
+            if resume_chunks is None or int(name[5:10]) >= resume_chunks:
+                os.remove(os.path.join(path, name))
+
+    def write(self, frame: pd.DataFrame, index: int):
+        import pyarrow as pa
+        part_path = os.path.join(self.path, f'part-{index:05d}.parquet')
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        self.pq.write_table(table, part_path + '.tmp')
+        os.replace(part_path + '.tmp', part_path)
+
+    def position(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+
+def score_file(input_path: str, output_path: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               id_column: Optional[str] = None,
+               resume: bool = False,
+               log=sys.stderr,
+               population_stats: Optional[PopulationStats] = None) -> int:
+    """
+    Потоковый расчет риска для файла когорты
+
+    При resume=True продолжает с последнего полностью записанного блока
+    того же входного файла (путь и размер сверяются с контрольной точкой).
+    Контрольная точка удаляется после успешного завершения.
+    Агрегаты оценок файла (в том числе прерванного запуска - они хранятся
+    в контрольной точке) добавляются в population_stats.
+    Возвращает общее число обработанных строк.
+    """
+    checkpoint = Checkpoint(output_path)
+    state = checkpoint.load() if resume else None
+    input_file = {'path': os.path.abspath(input_path), 'size': os.path.getsize(input_path)}
+    if state is not None and state['chunk_size'] != chunk_size:
+        raise ValueError(
+            f"Размер блока {chunk_size} не совпадает с прерванным запуском "
+            f"({state['chunk_size']})"
+        )
+    if state is not None and state.get('input') != input_file:
+        raise ValueError(
+            f"Входной файл {input_path} не совпадает с прерванным запуском "
+            f"({state.get('input')}); запустите расчет без --resume"
+        )
+    if state is None:
+        checkpoint.clear()
+        state = {'input': input_file, 'chunk_size': chunk_size,
+                 'chunks_done': 0, 'rows_done': 0, 'bytes': 0}
+        resume_marker = None
+    else:
+        resume_marker = state['bytes'] if not _is_parquet(output_path) else state['chunks_done']
+        print(f"Продолжение с блока {state['chunks_done']} "
+              f"({state['rows_done']} строк)", file=log)
+
+    file_stats = PopulationStats.from_dict(state['population_stats']) \
+        if state.get('population_stats') else PopulationStats()
+
+    if _is_parquet(output_path):
+        writer = ParquetResultWriter(output_path, resume_marker)
+    else:
+        writer = CsvResultWriter(output_path, resume_marker)
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    try:
+        chunks = read_chunks(input_path, chunk_size, state['chunks_done'], id_column)
+        for chunk in chunks:
+            index = state['chunks_done']
+            batch = calculate_batch(chunk)
+            writer.write(result_frame(chunk, batch, id_column), index)
+            file_stats.add_batch(chunk, batch)
+
+            state['chunks_done'] = index + 1
+            state['rows_done'] += len(chunk)
+            state['bytes'] = writer.position()
+            state['population_stats'] = file_stats.to_dict()
+            checkpoint.save(state)
+
+            rows_this_run += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"Блок {index}: {state['rows_done']} строк, "
+                  f"{rows_this_run / elapsed:,.0f} строк/с", file=log)
+        # Файл записан полностью: продолжать больше нечего
+        checkpoint.clear()
+    finally:
+        writer.close()
+        if population_stats is not None:
+            population_stats.merge(file_stats)
+
+    return state['rows_done']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m stroke_risk_calculator',
+        description='Мой Риск: расчет риска инсульта для когорты'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score = commands.add_parser('score', help='Рассчитать риск для файла CSV/Parquet')
+    score.add_argument('input', help='Входной файл (.csv или .parquet)')
+    score.add_argument('output', help='Файл результатов (.csv или каталог .parquet)')
+    score.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                       help='Число строк в блоке')
+    score.add_argument('--id-column', help='Колонка идентификатора пациента')
+    score.add_argument('--resume', action='store_true',
+                       help='Продолжить с последнего записанного блока')
+    score.add_argument('--population-stats', metavar='PATH',
+                       help='Сохранить агрегаты оценок когорты в JSON')
+
+    args = parser.parse_args(argv)
+    stats = PopulationStats() if args.population_stats else None
+    total = score_file(args.input, args.output, args.chunk_size,
+                       args.id_column, args.resume, population_stats=stats)
+    if stats is not None:
+        stats.save(args.population_stats)
+    print(f"Готово: {total} строк", file=sys.stderr)
+    return 0
@@ -0,0 +1,125 @@
+"""
+Мой Риск: пересчет риска только для компонентов, зависящих от измененных полей
+©️ 2025
+
+Таблица зависимостей связывает компоненты результата с полями user_data,
+которые они читают. При изменении нескольких полей (ползунки анкеты,
+повторная оценка наблюдаемого пациента) пересчитываются только затронутые
+компоненты, остальные берутся из прошлого RiskResult:
+
+    evaluator = IncrementalEvaluator()
+    result = evaluator.calculator.calculate_overall_risk(user_data)
+    user_data, result = evaluator.update(user_data, result, {'weight_kg': 82})
+"""
+
+import copy
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from stroke_risk_calculator import StrokeRiskCalculator, RiskResult
+
+
+# Компонент -> поля user_data, которые он читает (Framingham - по таблице правил)
+COMPONENT_INPUTS: Dict[str, FrozenSet[str]] = {
+    'validation': frozenset({'age'}),
+    'bmi': frozenset({'weight_kg', 'height_cm'}),
+    'abcd2': frozenset({
+        'previous_stroke_tia', 'age', 'systolic_bp', 'diastolic_bp',
+        'limb_weakness', 'speech_disturbance', 'tia_symptom_duration', 'has_diabetes',
+    }),
+    'chads2_vasc': frozenset({
+        'has_atrial_fibrillation', 'shortness_of_breath', 'systolic_bp',
+        'on_blood_pressure_meds', 'age', 'has_diabetes', 'previous_stroke_tia',
+        'vascular_disease', 'gender',
+    }),
+    # Поля маски факторов рекомендаций (ИМТ - через компонент bmi)
+    'recommendations': frozenset({
+        'smoking', 'previous_stroke_tia', 'has_atrial_fibrillation', 'has_diabetes',
+    }),
+    'warning_flags': frozenset({
+        'dizziness_fainting', 'shortness_of_breath', 'palpitations',
+        'previous_stroke_tia', 'has_atrial_fibrillation', 'systolic_bp', 'ldl_cholesterol',
+    }),
+}
+
+# Компонент -> компоненты, от результатов которых он зависит
+# (рекомендации строятся по уровню риска Framingham и ИМТ)
+COMPONENT_DEPENDS: Dict[str, Tuple[str, ...]] = {
+    'recommendations': ('framingham', 'bmi'),
+}
+
+
+class IncrementalEvaluator:
+    """Пересчет RiskResult по набору измененных полей"""
+
+    def __init__(self, calculator: Optional[StrokeRiskCalculator] = None):
+        self.calculator = calculator or StrokeRiskCalculator()
+        self.inputs = dict(COMPONENT_INPUTS)
+        self.inputs['framingham'] = frozenset(
+            rule.field for rule in self.calculator.rules.framingham
+        )
+        # Обратный индекс: поле -> компоненты, которые его читают
+        self._readers: Dict[str, Set[str]] = {}
+        for name, fields in self.inputs.items():
+            for field in fields:
+                self._readers.setdefault(field, set()).add(name)
+
+    def affected(self, changed: Iterable[str]) -> Set[str]:
+        """Компоненты, которые нужно пересчитать при изменении полей changed"""
+        components = set()
+        for field in changed:
+            components.update(self._readers.get(field, ()))
+        for name, depends in COMPONENT_DEPENDS.items():
+            if components.intersection(depends):
+                components.add(name)
+        return components
+
+    def reevaluate(self, previous: RiskResult, user_data: Dict,
+                   changed: Iterable[str]) -> RiskResult:
+        """
+        Результат для user_data (уже с новыми значениями) по прошлому результату
+
+        Списки неизмененных компонентов общие с previous.
+        """
+        calculator = self.calculator
+        components = self.affected(changed)
+        if 'validation' in components and not calculator.validate_user_data(user_data):
+            raise ValueError(f"Минимальный возраст для оценки - {calculator.min_age} лет")
+
+        updates = {}
+        if 'bmi' in components:
+            updates['bmi'], updates['bmi_category'] = calculator.calculate_bmi(
+                user_data.get('weight_kg', 0), user_data.get('height_cm', 0)
+            )
+        if 'framingham' in components:
+            score, risk, weighted_factors = calculator.calculate_framingham_breakdown(user_data)
+            updates.update(framingham_score=score, six_month_risk=risk,
+                           risk_factors=weighted_factors,
+                           risk_level=calculator.determine_risk_level(risk))
+        if 'abcd2' in components:
+            (updates['abcd2_score'], updates['abcd2_two_day_risk'],
+             updates['abcd2_seven_day_risk']) = (
+                calculator.calculate_abcd2_score(user_data) or (None, None, None))
+        if 'chads2_vasc' in components:
+            (updates['chads2_vasc_score'], updates['chads2_vasc_annual_risk'],
+             updates['chads2_vasc_criteria']) = (
+                calculator.calculate_chads2_vasc_score(user_data) or (None, None, []))
+        if 'recommendations' in components:
+            updates['recommendations'] = calculator.generate_recommendations(
+                updates.get('risk_level', previous.risk_level), user_data,
+                bmi=updates.get('bmi', previous.bmi)
+            )
+        if 'warning_flags' in components:
+            updates['warning_flags'] = calculator.check_warning_flags(user_data)
+        result = copy.copy(previous)
+        for name, value in updates.items():
+            setattr(result, name, value)
+        return result
+
+    def update(self, user_data: Dict, previous: RiskResult,
+               changes: Dict) -> Tuple[Dict, RiskResult]:
+        """Новые user_data и результат после изменения значений changes"""
+        missing = object()
+        changed = [name for name, value in changes.items()
+                   if user_data.get(name, missing) != value]
+        new_data = {**user_data, **changes}
+        return new_data, self.reevaluate(previous, new_data, changed)
@@ -0,0 +1,289 @@
+"""
+Мой Риск: метрики этапов расчета риска в формате Prometheus
+©️ 2025
+
+Инструментирование подключается явно: InstrumentedCalculator - подкласс
+StrokeRiskCalculator, который замеряет каждый расчет целиком, а этапы -
+в выборке расчетов (stage_sample_every). Обычный StrokeRiskCalculator
+не содержит никаких проверок и замеров, поэтому выключенные метрики
+ничего не стоят.
+
+    metrics = RiskMetrics()
+    calculator = InstrumentedCalculator(metrics)
+    start_metrics_server(metrics, port=9108)   # GET /metrics
+    metrics.write_prometheus('/var/lib/node_exporter/riskometr.prom')
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from scoring_rules import ScoringRules, DEFAULT_RULES
+from stroke_risk_calculator import StrokeRiskCalculator, RiskLevel, RiskResult
+
+
+# Границы корзин гистограммы задержки, секунды
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 1e-2, 1e-1)
+
+STAGES = ('validation', 'bmi', 'framingham', 'abcd2', 'chads2_vasc',
+          'recommendations', 'warning_flags', 'overall')
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (счетчики не накопительные)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RiskMetrics:
+    """
+    Гистограммы этапов, распределение уровней риска и ошибки проверки данных
+
+    Общее время расчетов (observe_overall) копится в буфере потока без
+    блокировки и переносится в гистограмму пачками по flush_every замеров,
+    а также перед выгрузкой (to_prometheus) и по flush().
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, flush_every: int = 256):
+        self.stages: Dict[str, Histogram] = {stage: Histogram(buckets) for stage in STAGES}
+        self.risk_levels: Dict[RiskLevel, int] = {level: 0 for level in RiskLevel}
+        self.validation_failures = 0
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._buffers: List[list] = []
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    def observe_assessment(self, timings: List[Tuple[str, float]],
+                           level: Optional[RiskLevel]):
+        """Замеры этапов одного расчета и его уровень риска за одну блокировку"""
+        with self._lock:
+            for stage, seconds in timings:
+                self.stages[stage].observe(seconds)
+            if level is not None:
+                self.risk_levels[level] += 1
+
+    def observe_overall(self, seconds: float, level: Optional[RiskLevel]):
+        """Общее время одного расчета и его уровень риска (через буфер потока)"""
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = []
+            with self._lock:
+                self._buffers.append(buffer)
+        buffer.append((seconds, level))
+        if len(buffer) >= self.flush_every:
+            with self._lock:
+                self._drain(buffer)
+
+    def _drain(self, buffer: list):
+        # Под self._lock; поток-владелец может дописывать в конец буфера
+        items = buffer[:]
+        del buffer[:len(items)]
+        overall = self.stages['overall']
+        for seconds, level in items:
+            overall.observe(seconds)
+            if level is not None:
+                self.risk_levels[level] += 1
+
+    def flush(self):
+        """Перенести буферы потоков в гистограмму и счетчики"""
+        with self._lock:
+            for buffer in self._buffers:
+                self._drain(buffer)
+
+    def count_validation_failure(self):
+        with self._lock:
+            self.validation_failures += 1
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате экспозиции Prometheus"""
+        with self._lock:
+            for buffer in self._buffers:
+                self._drain(buffer)
+            lines = [
+                '# HELP stroke_risk_stage_duration_seconds Длительность этапов расчета риска',
+                '# TYPE stroke_risk_stage_duration_seconds histogram',
+            ]
+            for stage, histogram in self.stages.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'stroke_risk_stage_duration_seconds_bucket'
+                                 f'{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'stroke_risk_stage_duration_seconds_sum{{stage="{stage}"}} '
+                             f'{histogram.sum!r}')
+                lines.append(f'stroke_risk_stage_duration_seconds_count{{stage="{stage}"}} '
+                             f'{histogram.count}')
+            lines += [
+                '# HELP stroke_risk_assessments_total Выполненные расчеты по уровню риска',
+                '# TYPE stroke_risk_assessments_total counter',
+            ]
+            lines += [f'stroke_risk_assessments_total{{risk_level="{level.name}"}} {count}'
+                      for level, count in self.risk_levels.items()]
+            lines += [
+                '# HELP stroke_risk_validation_failures_total Отклоненные данные пользователя',
+                '# TYPE stroke_risk_validation_failures_total counter',
+                f'stroke_risk_validation_failures_total {self.validation_failures}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Атомарная запись в файл (для textfile-коллектора node_exporter)"""
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+def _timed(stage: str, method):
+    """Обертка метода калькулятора, замеряющая этап stage"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._local.timings.append((stage, perf_counter() - started))
+    return wrapper
+
+
+class _StageTimedCalculator(StrokeRiskCalculator):
+    """Калькулятор с замером каждого этапа для выборочных вызовов InstrumentedCalculator"""
+
+    calculate_bmi = _timed('bmi', StrokeRiskCalculator.calculate_bmi)
+    calculate_framingham_breakdown = _timed(
+        'framingham', StrokeRiskCalculator.calculate_framingham_breakdown)
+    calculate_abcd2_score = _timed('abcd2', StrokeRiskCalculator.calculate_abcd2_score)
+    calculate_chads2_vasc_score = _timed(
+        'chads2_vasc', StrokeRiskCalculator.calculate_chads2_vasc_score)
+    generate_recommendations = _timed(
+        'recommendations', StrokeRiskCalculator.generate_recommendations)
+    check_warning_flags = _timed('warning_flags', StrokeRiskCalculator.check_warning_flags)
+    validate_user_data = _timed('validation', StrokeRiskCalculator.validate_user_data)
+
+    def __init__(self, rules: ScoringRules):
+        super().__init__(rules)
+        # Замеры этапов текущего расчета в этом потоке
+        self._local = threading.local()
+
+    def calculate_with_stages(self, user_data: Dict,
+                              timings: List[Tuple[str, float]]) -> RiskResult:
+        """Расчет с записью замеров этапов в timings (включая неудачный)"""
+        self._local.timings = timings
+        started = perf_counter()
+        try:
+            return self.calculate_overall_risk(user_data)
+        finally:
+            timings.append(('overall', perf_counter() - started))
+            self._local.timings = None
+
+
+class InstrumentedCalculator(StrokeRiskCalculator):
+    """
+    StrokeRiskCalculator с метриками calculate_overall_risk
+
+    Общее время, уровень риска и ошибки проверки учитываются в каждом
+    вызове. Этапы замеряются выборочно - в каждом stage_sample_every-м
+    вызове (0 - не замерять) отдельным калькулятором с обертками этапов,
+    поэтому обычный вызов не проходит ни через одну обертку и стоит
+    два замера времени и запись в буфер потока.
+    """
+
+    def __init__(self, metrics: Optional[RiskMetrics] = None,
+                 rules: ScoringRules = DEFAULT_RULES, stage_sample_every: int = 64):
+        super().__init__(rules)
+        self.metrics = metrics or RiskMetrics()
+        self.stage_sample_every = stage_sample_every
+        self._stage_timed = _StageTimedCalculator(rules)
+
+    @property
+    def stage_sample_every(self) -> int:
+        return self._sample_every
+
+    @stage_sample_every.setter
+    def stage_sample_every(self, every: int):
+        self._sample_every = every
+        # Вызовов до следующего выборочного (следующий вызов замеряется)
+        self._until_sample = 1 if every else -1
+
+    def calculate_overall_risk(self, user_data: Dict) -> RiskResult:
+        # Счетчик без блокировки: при гонке потоков сдвигается только выборка
+        until_sample = self._until_sample = self._until_sample - 1
+        if not until_sample:
+            self._until_sample = self._sample_every
+            return self._calculate_with_stages(user_data)
+        started = perf_counter()
+        try:
+            result = StrokeRiskCalculator.calculate_overall_risk(self, user_data)
+        except BaseException as error:
+            self.metrics.observe_overall(perf_counter() - started, None)
+            if isinstance(error, ValueError) and not super().validate_user_data(user_data):
+                self.metrics.count_validation_failure()
+            raise
+        self.metrics.observe_overall(perf_counter() - started, result.risk_level)
+        return result
+
+    def _calculate_with_stages(self, user_data: Dict) -> RiskResult:
+        stage_timed = self._stage_timed
+        stage_timed.min_age = self.min_age
+        stage_timed.current_year = self.current_year
+        result, timings = None, []
+        try:
+            result = stage_timed.calculate_with_stages(user_data, timings)
+            return result
+        except ValueError:
+            if not super().validate_user_data(user_data):
+                self.metrics.count_validation_failure()
+            raise
+        finally:
+            # Замеры этапов сбрасываются в метрики одной блокировкой
+            self.metrics.observe_assessment(
+                timings, result.risk_level if result is not None else None
+            )
+
+
+def start_metrics_server(metrics: RiskMetrics, port: int = 9108,
+                         host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Локальный HTTP-сервер GET /metrics в фоновом потоке"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
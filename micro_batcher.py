@@ -0,0 +1,172 @@
+"""
+Мой Риск: адаптивная микропакетизация одновременных запросов расчета
+©️ 2025
+
+Запросы, пришедшие в пределах короткого окна (или до max_batch штук),
+считаются одним векторизованным вызовом calculate_batch, и каждый
+вызывающий получает свой результат. Окно подстраивается под нагрузку:
+одиночные запросы считаются сразу скалярным расчетом, окно открывается
+только когда запросы начинают приходить одновременно, и снова
+сужается, когда пакеты перестают набираться.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from population_stats import PopulationStats
+from stroke_risk_calculator import StrokeRiskCalculator, RiskResult
+
+
+@dataclass
+class BatcherStats:
+    requests: int
+    batches: int
+    vectorized: int
+    window_ms: float
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+
+class MicroBatcher:
+    """
+    Асинхронный микропакетный расчет поверх StrokeRiskCalculator
+
+    Пакеты от min_vector_batch запросов считаются векторизованно
+    (batch_scoring.assess_records), меньшие - скалярным
+    calculate_overall_risk; результат и ошибки от пути расчета не зависят
+    и совпадают с прямым вызовом калькулятора. Если задан population_stats,
+    каждый успешный расчет учитывается в нем (пакет - одним add_batch).
+    """
+
+    def __init__(self, calculator: Optional[StrokeRiskCalculator] = None,
+                 max_batch: int = 256, max_wait: float = 0.002,
+                 min_vector_batch: int = 8,
+                 population_stats: Optional[PopulationStats] = None):
+        if max_batch <= 0 or max_wait < 0:
+            raise ValueError("max_batch должен быть положительным, max_wait - неотрицательным")
+        self.calculator = calculator or StrokeRiskCalculator()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.min_vector_batch = min_vector_batch
+        self.population_stats = population_stats
+        # Текущее окно ожидания; 0 - запрос считается сразу
+        self.window = 0.0
+        self._queue: List[Tuple[Dict, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batch')
+        self._requests = 0
+        self._batches = 0
+        self._vectorized = 0
+
+    async def assess(self, user_data: Dict) -> RiskResult:
+        """Результат расчета для user_data после ближайшего пакета"""
+        if not isinstance(user_data, dict):
+            raise TypeError("user_data должен быть словарем")
+        if self._closing:
+            raise RuntimeError("Микропакетный расчет остановлен")
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((user_data, future))
+        self._wakeup.set()
+        return await future
+
+    async def close(self):
+        """Досчитать очередь и остановить обработчик"""
+        self._closing = True
+        if self._worker is not None:
+            self._wakeup.set()
+            await self._worker
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> BatcherStats:
+        return BatcherStats(self._requests, self._batches, self._vectorized,
+                            round(self.window * 1000, 3))
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.window and not self._closing:
+                await self._collect(time.perf_counter() + self.window)
+            while self._queue:
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                await self._dispatch(batch)
+                self._adapt(len(batch))
+            if self._closing:
+                return
+
+    async def _collect(self, deadline: float):
+        """Ожидание новых запросов до конца окна или до полного пакета"""
+        while len(self._queue) < self.max_batch and not self._closing:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+            self._wakeup.clear()
+
+    def _adapt(self, size: int):
+        """
+        Подстройка окна: если к концу расчета пакета успели прийти новые
+        запросы или пакет больше одного, окно растет вдвое (до max_wait);
+        одиночный пакет при пустой очереди сужает его вдвое до нуля.
+        """
+        if size > 1 or self._queue:
+            self.window = min(self.max_wait, max(self.window * 2, self.max_wait / 16))
+        else:
+            self.window = self.window / 2 if self.window > self.max_wait / 16 else 0.0
+
+    async def _dispatch(self, batch: List[Tuple[Dict, asyncio.Future]]):
+        self._requests += len(batch)
+        self._batches += 1
+        records = [user_data for user_data, _ in batch]
+        try:
+            if len(batch) < self.min_vector_batch:
+                # Малый пакет дешевле посчитать скалярно прямо в цикле событий
+                outcomes = [self._assess_one(user_data) for user_data in records]
+            else:
+                self._vectorized += 1
+                outcomes = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._assess_many, records
+                )
+        except Exception as e:
+            # Непредвиденная ошибка расчета не должна останавливать обработчик
+            # и оставлять вызывающих без ответа
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _assess_one(self, user_data: Dict) -> Tuple[Optional[RiskResult], Optional[Exception]]:
+        try:
+            result = self.calculator.calculate_overall_risk(user_data)
+        except (TypeError, ValueError) as e:
+            return None, e
+        if self.population_stats is not None:
+            self.population_stats.add_result(user_data, result)
+        return result, None
+
+    def _assess_many(self, records: List[Dict]) -> List[Tuple[Optional[RiskResult], Optional[Exception]]]:
+        from batch_scoring import assess_records
+
+        return assess_records(records, self.calculator, stats=self.population_stats)
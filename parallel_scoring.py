@@ -0,0 +1,204 @@
+"""
+Мой Риск: параллельный расчет риска для когорт на нескольких ядрах
+©️ 2025
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Mapping, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from batch_scoring import (
+    encode_column, encode_columns, row_count, score_encoded, BatchResult, BOOLEAN_FIELDS,
+    CATEGORICAL_FIELDS, NUMERIC_FIELDS, RESULT_DTYPES,
+)
+from scoring_rules import ScoringRules, DEFAULT_RULES
+
+if TYPE_CHECKING:
+    from population_stats import PopulationStats
+
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+# Раскладка колонок в общем блоке памяти: (имя, тип, смещение)
+Layout = List[Tuple[str, str, int]]
+
+
+def _layout(dtypes: Mapping[str, np.dtype], rows: int) -> Tuple[Layout, int]:
+    layout = []
+    offset = 0
+    for name, dtype in dtypes.items():
+        dtype = np.dtype(dtype)
+        # Выравнивание по 8 байт для быстрого доступа к колонкам
+        offset = (offset + 7) // 8 * 8
+        layout.append((name, dtype.str, offset))
+        offset += dtype.itemsize * rows
+    return layout, max(offset, 1)
+
+
+def _views(buffer, layout: Layout, rows: int) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray((rows,), dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        for name, dtype, offset in layout
+    }
+
+
+# Правила исполнителя: передаются один раз при запуске процесса пула
+_worker_rules: Optional[ScoringRules] = None
+
+
+def _init_worker(rules: ScoringRules):
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _split_columns(data: Mapping, rows: int) -> Tuple[Dict[str, np.ndarray],
+                                                       Dict[str, np.ndarray]]:
+    """
+    Колонки для общей памяти: (сырые числовые, закодированные)
+
+    Числовые и логические колонки числового типа передаются как есть и
+    кодируются исполнителями по своим строкам; категориальные (коды
+    Categorical или строки) и колонки типа object кодируются здесь
+    """
+    raw, encoded = {}, {}
+    for name in (*NUMERIC_FIELDS, *BOOLEAN_FIELDS):
+        if name in data:
+            values = np.asarray(data[name])
+            if values.dtype.kind in 'biuf':
+                raw[name] = values
+                continue
+        encoded[name] = encode_column(data, name, rows)
+    for name in CATEGORICAL_FIELDS:
+        encoded[name] = encode_column(data, name, rows)
+    return raw, encoded
+
+
+def _score_shard(input_name: str, input_layout: Layout, raw_names: Tuple[str, ...],
+                 output_name: str, output_layout: Layout,
+                 rows: int, start: int, stop: int, min_age: int) -> int:
+    """Кодирование и расчет строк [start, stop) в процессе-исполнителе"""
+    input_block = shared_memory.SharedMemory(name=input_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    try:
+        columns = _views(input_block.buf, input_layout, rows)
+        results = _views(output_block.buf, output_layout, rows)
+        shard = {name: values[start:stop] for name, values in columns.items()}
+        for name in raw_names:
+            shard[name] = encode_column(shard, name, stop - start)
+        for name, values in score_encoded(shard, min_age, _worker_rules).items():
+            results[name][start:stop] = values
+        # Представления должны быть освобождены до закрытия блоков
+        del columns, results, shard
+    finally:
+        input_block.close()
+        output_block.close()
+    return stop - start
+
+
+class ParallelScorer:
+    """
+    Параллельный расчет когорты в пуле процессов
+
+    Входные колонки передаются исполнителям через общую память: числовые -
+    как есть (их кодирует каждый исполнитель для своих строк), категориальные
+    - уже закодированными. Каждый исполнитель пишет свой диапазон строк прямо
+    в общий блок результата, поэтому порядок строк совпадает с входным.
+    Правила передаются в процессы пула один раз, при их запуске. Если
+    задан population_stats, каждая рассчитанная когорта учитывается в нем.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 min_age: int = 15,
+                 rules: ScoringRules = DEFAULT_RULES,
+                 population_stats: Optional['PopulationStats'] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_age = min_age
+        self.rules = rules
+        self.population_stats = population_stats
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.rules,)
+            )
+        return self._executor
+
+    def score(self, data: Mapping) -> BatchResult:
+        """Расчет когорты (DataFrame или словарь колонок)"""
+        rows = row_count(data)
+        if self.workers == 1 or rows <= self.chunk_size:
+            columns = score_encoded(encode_columns(data), self.min_age, self.rules)
+        else:
+            columns = self._score_shared(*_split_columns(data, rows), rows)
+        result = BatchResult(columns, self.rules.framingham_risk.values, self.rules)
+        if self.population_stats is not None:
+            self.population_stats.add_batch(data, result)
+        return result
+
+    def score_encoded(self, encoded: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Колонки результата для уже закодированных входных колонок (см. encode_columns)"""
+        rows = len(next(iter(encoded.values())))
+        if self.workers == 1 or rows <= self.chunk_size:
+            return score_encoded(encoded, self.min_age, self.rules)
+        return self._score_shared({}, encoded, rows)
+
+    def _score_shared(self, raw: Mapping[str, np.ndarray], encoded: Mapping[str, np.ndarray],
+                      rows: int) -> Dict[str, np.ndarray]:
+        inputs = {**raw, **encoded}
+        input_layout, input_size = _layout(
+            {name: values.dtype for name, values in inputs.items()}, rows
+        )
+        output_layout, output_size = _layout(RESULT_DTYPES, rows)
+        input_block = shared_memory.SharedMemory(create=True, size=input_size)
+        output_block = shared_memory.SharedMemory(create=True, size=output_size)
+        try:
+            columns = _views(input_block.buf, input_layout, rows)
+            for name, values in inputs.items():
+                columns[name][:] = values
+            del columns
+
+            futures = [
+                self._pool().submit(
+                    _score_shard, input_block.name, input_layout, tuple(raw),
+                    output_block.name, output_layout,
+                    rows, start, min(start + self.chunk_size, rows), self.min_age
+                )
+                for start in range(0, rows, self.chunk_size)
+            ]
+            for future in futures:
+                future.result()
+
+            return {
+                name: values.copy()
+                for name, values in _views(output_block.buf, output_layout, rows).items()
+            }
+        finally:
+            input_block.close()
+            input_block.unlink()
+            output_block.close()
+            output_block.unlink()
+
+
+def score_parallel(data: Mapping, workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   min_age: int = 15) -> BatchResult:
+    """Разовый параллельный расчет когорты"""
+    with ParallelScorer(workers, chunk_size, min_age) as scorer:
+        return scorer.score(data)
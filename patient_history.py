@@ -0,0 +1,219 @@
+"""
+Мой Риск: история оценок пациента с индексом по времени и трендами
+©️ 2025
+
+Оценки хранятся по стабильному идентификатору пациента в списках,
+упорядоченных по времени оценки, поэтому "последние N" и "траектория
+риска с даты" находятся бинарным поиском. Для наклона САД
+поддерживаются суммы метода наименьших квадратов, а изменение риска и
+новые красные флаги берутся из двух последних оценок - тренд
+обновляется при вставке без просмотра истории.
+
+С хранилищем ResponseStore каждая оценка дописывается в сегмент, а при
+открытии индекс восстанавливается чтением хранилища:
+
+    history = PatientHistory(ResponseStore('history'))
+    trend = history.add('p-42', result, user_data)
+    trend.risk_delta, trend.sbp_slope, trend.new_warning_flags
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from response_store import ResponseStore
+from stroke_risk_calculator import RiskLevel, RiskResult, WARNING_FLAGS
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+_FLAG_BITS = {flag: 1 << bit for bit, flag in enumerate(WARNING_FLAGS)}
+
+
+def _flag_mask(flags: List[str]) -> int:
+    mask = 0
+    for flag in flags:
+        mask |= _FLAG_BITS[flag]
+    return mask
+
+
+def _flag_list(mask: int) -> List[str]:
+    return [flag for bit, flag in enumerate(WARNING_FLAGS) if mask >> bit & 1]
+
+
+def _utc(moment: datetime) -> datetime:
+    """Время в UTC; время без пояса считается местным, как в datetime.timestamp()"""
+    return moment.astimezone(timezone.utc)
+
+
+class HistoryEntry:
+    """Одна оценка пациента (время - в UTC, красные флаги - битовая маска по WARNING_FLAGS)"""
+
+    __slots__ = ('assessed_at', 'six_month_risk', 'risk_level', 'framingham_score',
+                 'systolic_bp', 'warning_flags')
+
+    def __init__(self, assessed_at: datetime, six_month_risk: float, risk_level: RiskLevel,
+                 framingham_score: int, systolic_bp: float, warning_flags: int):
+        self.assessed_at = _utc(assessed_at)
+        self.six_month_risk = six_month_risk
+        self.risk_level = risk_level
+        self.framingham_score = framingham_score
+        self.systolic_bp = systolic_bp
+        self.warning_flags = warning_flags
+
+    @property
+    def flags(self) -> List[str]:
+        return _flag_list(self.warning_flags)
+
+    def to_dict(self) -> Dict:
+        return {
+            'assessed_at': self.assessed_at.isoformat(),
+            'six_month_risk': self.six_month_risk,
+            'risk_level': self.risk_level.name,
+            'framingham_score': self.framingham_score,
+            'systolic_bp': self.systolic_bp,
+            'warning_flags': self.warning_flags,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'HistoryEntry':
+        return cls(datetime.fromisoformat(data['assessed_at']), data['six_month_risk'],
+                   RiskLevel[data['risk_level']], data['framingham_score'],
+                   data['systolic_bp'], data['warning_flags'])
+
+
+@dataclass
+class PatientTrend:
+    assessments: int
+    last_risk: float
+    risk_level: RiskLevel
+    # Изменение риска относительно предыдущей и первой оценки (п.п.)
+    risk_delta: Optional[float]
+    risk_change: float
+    previous_level: Optional[RiskLevel]
+    # Наклон САД, мм рт.ст. в год (None, пока нет двух моментов времени)
+    sbp_slope: Optional[float]
+    new_warning_flags: List[str] = field(default_factory=list)
+
+
+class _PatientIndex:
+    """Оценки одного пациента по возрастанию времени и суммы для наклона САД"""
+
+    __slots__ = ('times', 'entries', 'origin', 'n', 'sum_t', 'sum_s', 'sum_tt', 'sum_ts')
+
+    def __init__(self, origin: float):
+        self.times: List[float] = []
+        self.entries: List[HistoryEntry] = []
+        # Время отсчитывается от первой оценки: суммы квадратов не теряют точность
+        self.origin = origin
+        self.n = 0
+        self.sum_t = self.sum_s = self.sum_tt = self.sum_ts = 0.0
+
+    def insert(self, timestamp: float, entry: HistoryEntry):
+        if not self.times or timestamp >= self.times[-1]:
+            self.times.append(timestamp)
+            self.entries.append(entry)
+        else:
+            position = bisect_right(self.times, timestamp)
+            self.times.insert(position, timestamp)
+            self.entries.insert(position, entry)
+        t = (timestamp - self.origin) / SECONDS_PER_YEAR
+        s = entry.systolic_bp
+        self.n += 1
+        self.sum_t += t
+        self.sum_s += s
+        self.sum_tt += t * t
+        self.sum_ts += t * s
+
+    def trend(self) -> PatientTrend:
+        last = self.entries[-1]
+        previous = self.entries[-2] if len(self.entries) > 1 else None
+        denominator = self.n * self.sum_tt - self.sum_t ** 2
+        slope = None
+        if self.n > 1 and denominator > 1e-12 * max(1.0, self.n * self.sum_tt):
+            slope = (self.n * self.sum_ts - self.sum_t * self.sum_s) / denominator
+        return PatientTrend(
+            assessments=self.n,
+            last_risk=last.six_month_risk,
+            risk_level=last.risk_level,
+            risk_delta=(round(last.six_month_risk - previous.six_month_risk, 1)
+                        if previous else None),
+            risk_change=round(last.six_month_risk - self.entries[0].six_month_risk, 1),
+            previous_level=previous.risk_level if previous else None,
+            sbp_slope=slope,
+            new_warning_flags=_flag_list(
+                last.warning_flags & ~(previous.warning_flags if previous else 0)),
+        )
+
+
+class PatientHistory:
+    """История оценок по идентификатору пациента"""
+
+    def __init__(self, store: Optional[ResponseStore] = None):
+        self.store = store
+        self._patients: Dict[str, _PatientIndex] = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            for _, record in store.scan():
+                self._insert(record['patient_id'], HistoryEntry.from_dict(record))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(index.n for index in self._patients.values())
+
+    def patients(self) -> List[str]:
+        with self._lock:
+            return list(self._patients)
+
+    def _insert(self, patient_id: str, entry: HistoryEntry) -> _PatientIndex:
+        timestamp = entry.assessed_at.timestamp()
+        index = self._patients.get(patient_id)
+        if index is None:
+            index = self._patients[patient_id] = _PatientIndex(timestamp)
+        index.insert(timestamp, entry)
+        return index
+
+    def add(self, patient_id: str, result: RiskResult, user_data: Mapping,
+            assessed_at: Optional[datetime] = None) -> PatientTrend:
+        """
+        Добавить оценку; возвращает обновленный тренд пациента
+
+        assessed_at по умолчанию - текущее время; время без пояса считается
+        местным и, как и остальное, приводится к UTC.
+        """
+        entry = HistoryEntry(assessed_at or datetime.now(timezone.utc), result.six_month_risk,
+                             result.risk_level, result.framingham_score,
+                             user_data.get('systolic_bp', 0), _flag_mask(result.warning_flags))
+        with self._lock:
+            if self.store is not None:
+                self.store.append({'patient_id': patient_id, **entry.to_dict()})
+            return self._insert(patient_id, entry).trend()
+
+    def trend(self, patient_id: str) -> Optional[PatientTrend]:
+        with self._lock:
+            index = self._patients.get(patient_id)
+            return index.trend() if index is not None else None
+
+    def last(self, patient_id: str, n: int = 1) -> List[HistoryEntry]:
+        """Последние n оценок, от ранних к поздним"""
+        with self._lock:
+            index = self._patients.get(patient_id)
+            return index.entries[-n:] if index is not None and n > 0 else []
+
+    def between(self, patient_id: str, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> List[HistoryEntry]:
+        """Оценки в интервале [start, end]"""
+        with self._lock:
+            index = self._patients.get(patient_id)
+            if index is None:
+                return []
+            low = bisect_left(index.times, start.timestamp()) if start else 0
+            high = bisect_right(index.times, end.timestamp()) if end else len(index.times)
+            return index.entries[low:high]
+
+    def risk_trajectory(self, patient_id: str,
+                        since: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
+        """(время, риск на 6 месяцев) с даты since"""
+        return [(entry.assessed_at, entry.six_month_risk)
+                for entry in self.between(patient_id, since)]
@@ -0,0 +1,248 @@
+"""
+Мой Риск: типизированная запись пациента вместо свободного словаря user_data
+©️ 2025
+
+PatientRecord нормализует ответы один раз при создании: варианты ответов
+приводятся к перечислениям (синонимы анкеты, например 'никогда не курил',
+к одному значению), да/нет/есть - к bool, пропуски числовых полей - к
+значениям по умолчанию калькулятора. Запись поддерживает get() и
+обращение по ключу, поэтому принимается всеми методами
+StrokeRiskCalculator наравне со словарем:
+
+    record = PatientRecord.from_dict(user_data)
+    calculator.calculate_overall_risk(record)
+
+Нормализация выполняется один раз, а get() записи - это dict.get
+словаря нормализованных значений, поэтому расчет по записи не медленнее,
+чем по словарю (см. benchmarks/run_benchmarks.py,
+calculate_overall_risk[PatientRecord]). Для массового расчета списки
+записей передаются в calculate_batch.
+"""
+
+from enum import Enum
+from typing import Any, Dict, Iterator, Mapping, Optional, Type
+
+from stroke_risk_calculator import USER_DATA_FIELDS
+
+
+class Choice(str, Enum):
+    """
+    Вариант ответа: строка со значением из анкеты
+
+    Хэш и текст совпадают со строкой, поэтому члены перечисления
+    подходят и для таблиц правил, и для JSON.
+    """
+
+    __hash__ = str.__hash__
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+    @property
+    def code(self) -> int:
+        """Код варианта (индекс в перечислении, как в batch_scoring.CATEGORICAL_FIELDS)"""
+        return list(type(self)).index(self)
+
+
+class Gender(Choice):
+    MALE = 'мужской'
+    FEMALE = 'женский'
+
+
+class Smoking(Choice):
+    NEVER = 'никогда'
+    FORMER = 'курил в прошлом'
+    CURRENT = 'курящий'
+
+
+class ActivityLevel(Choice):
+    ACTIVE = 'подвижный'
+    SEDENTARY = 'малоподвижный'
+    IMMOBILE = 'неподвижный'
+
+
+class Frequency(Choice):
+    NEVER = 'никогда'
+    RARELY = 'редко'
+    OFTEN = 'часто'
+
+
+# Категориальные поля: перечисление и значение при пропуске (как в калькуляторе)
+CHOICE_FIELDS: Dict[str, tuple] = {
+    'gender': (Gender, None),
+    'smoking': (Smoking, Smoking.NEVER),
+    'activity_level': (ActivityLevel, ActivityLevel.ACTIVE),
+    'palpitations': (Frequency, Frequency.NEVER),
+    'shortness_of_breath': (Frequency, Frequency.NEVER),
+    'dizziness_fainting': (Frequency, Frequency.NEVER),
+}
+
+# Синонимы вариантов ответа из анкеты app.py
+CHOICE_ALIASES = {
+    'никогда не курил': Smoking.NEVER,
+}
+
+NUMERIC_DEFAULTS = {
+    'age': 0,
+    'height_cm': 0,
+    'weight_kg': 0,
+    'systolic_bp': 0,
+    'diastolic_bp': 90,
+    'ldl_cholesterol': 0,
+    'tia_symptom_duration': 0,
+}
+
+# Значение ответа -> нормализованное значение поля (члены перечислений
+# совпадают со своими строками, поэтому тоже находятся в таблице)
+_CHOICE_LOOKUP: Dict[str, Dict[Any, Choice]] = {
+    field: {**{member.value: member for member in enum},
+            **{alias: member for alias, member in CHOICE_ALIASES.items()
+               if isinstance(member, enum)},
+            None: default}
+    for field, (enum, default) in CHOICE_FIELDS.items()
+}
+_BOOLEAN_LOOKUP = {True: True, False: False, 1: True, 0: False, None: False,
+                   'да': True, 'есть': True, 'нет': False, '': False}
+_FIELD_SET = frozenset(USER_DATA_FIELDS)
+
+
+def _missing(value) -> bool:
+    return value is None or value != value
+
+
+def _choice(field: str):
+    table = _CHOICE_LOOKUP[field]
+
+    def normalize(value) -> Optional[Choice]:
+        try:
+            return table[value]
+        except (KeyError, TypeError):
+            pass
+        if _missing(value):
+            return table[None]
+        raise ValueError(f"Недопустимое значение поля '{field}': {value!r}")
+    return normalize
+
+
+def _boolean(field: str):
+    def normalize(value) -> bool:
+        try:
+            return _BOOLEAN_LOOKUP[value]
+        except (KeyError, TypeError):
+            pass
+        if isinstance(value, str):
+            raise ValueError(f"Недопустимое значение поля '{field}': {value!r}")
+        return False if _missing(value) else bool(value)
+    return normalize
+
+
+def _number(field: str):
+    default = NUMERIC_DEFAULTS[field]
+
+    def normalize(value):
+        if type(value) is int or type(value) is float and value == value:
+            return value
+        if _missing(value):
+            return default
+        if isinstance(value, (str, bytes, bool)):
+            raise ValueError(f"Поле '{field}' должно быть числом: {value!r}")
+        # Скаляры NumPy/pandas приводятся к int/float
+        return value.item() if hasattr(value, 'item') else value
+    return normalize
+
+
+# Поле -> функция нормализации в порядке USER_DATA_FIELDS (остальные поля - да/нет)
+_NORMALIZERS = tuple(
+    (field, _choice(field) if field in CHOICE_FIELDS
+     else _number(field) if field in NUMERIC_DEFAULTS else _boolean(field))
+    for field in USER_DATA_FIELDS
+)
+
+
+class PatientRecord:
+    """
+    Нормализованные ответы одного пациента (все поля USER_DATA_FIELDS)
+
+    Значения лежат в словаре, а get - его связанный метод dict.get:
+    калькулятор читает поля через get(), поэтому расчет по записи стоит
+    столько же, сколько по словарю. Поля доступны и как атрибуты.
+    """
+
+    __slots__ = ('_values', 'get')
+
+    def __init__(self, **fields):
+        unknown = fields.keys() - _FIELD_SET
+        if unknown:
+            raise TypeError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+        self._fill(fields.get)
+
+    def _fill(self, get):
+        self._values = values = {field: normalize(get(field))
+                                 for field, normalize in _NORMALIZERS}
+        self.get = values.get
+
+    @classmethod
+    def from_dict(cls, user_data: Mapping) -> 'PatientRecord':
+        """Запись из user_data; посторонние ключи игнорируются"""
+        record = cls.__new__(cls)
+        record._fill(user_data.get)
+        return record
+
+    @classmethod
+    def from_frame(cls: Type['PatientRecord'], frame) -> Iterator['PatientRecord']:
+        """Записи по строкам pandas DataFrame"""
+        columns = [name for name in frame.columns if name in USER_DATA_FIELDS]
+        for row in frame[columns].itertuples(index=False, name=None):
+            yield cls.from_dict(dict(zip(columns, row)))
+
+    def __reduce__(self):
+        return type(self).from_dict, (self._values,)
+
+    def replace(self, **changes) -> 'PatientRecord':
+        """Копия записи с измененными полями"""
+        return type(self)(**{**self.to_dict(), **changes})
+
+    # Протокол словаря, который использует калькулятор (get - см. описание класса)
+
+    def __getitem__(self, name: str) -> Any:
+        return self._values[name]
+
+    def __contains__(self, name) -> bool:
+        return name in _FIELD_SET
+
+    def keys(self):
+        return USER_DATA_FIELDS
+
+    def items(self):
+        return self._values.items()
+
+    def values(self):
+        return self._values.values()
+
+    def __iter__(self):
+        return iter(USER_DATA_FIELDS)
+
+    def __len__(self) -> int:
+        return len(USER_DATA_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PatientRecord):
+            return NotImplemented
+        return self._values == other._values
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{field}={value!r}' for field, value in self._values.items())
+        return f'PatientRecord({fields})'
+
+
+def _field(name: str) -> property:
+    return property(lambda record: record._values[name], doc=f"Поле '{name}'")
+
+
+for _name in USER_DATA_FIELDS:
+    setattr(PatientRecord, _name, _field(_name))
+del _name
@@ -0,0 +1,242 @@
+"""
+Мой Риск: потоковые агрегаты по всем выполненным оценкам
+©️ 2025
+
+PopulationStats хранит только фиксированные счетчики и гистограммы:
+распределение уровней риска, гистограмму баллов Framingham, частоту
+красных флагов и среднее/дисперсию САД по возрастным группам (алгоритм
+Уэлфорда). Память не зависит от числа оценок. Частичные агрегаты
+рабочих процессов объединяются merge(), снимок пишется в JSON:
+
+    calculator = AggregatingCalculator()
+    calculator.calculate_overall_risk(user_data)
+    calculator.stats.save('population.json')
+
+Тот же объект можно передать параметром population_stats в ParallelScorer,
+MicroBatcher, ScoringService и cohort_scoring.score_file (в командной
+строке - --population-stats PATH).
+"""
+
+import json
+import math
+import os
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from batch_scoring import BatchResult, RISK_LEVELS, RESULT_DTYPES, columns_from_records
+from scoring_rules import ScoringRules, DEFAULT_RULES
+from stroke_risk_calculator import StrokeRiskCalculator, RiskResult, WARNING_FLAGS
+
+
+# Возрастные группы для САД: нижние границы групп после первой
+AGE_BAND_EDGES = (30, 45, 60, 75)
+AGE_BANDS = ('15-29', '30-44', '45-59', '60-74', '75+')
+
+# Корзины гистограммы Framingham - все значения колонки баллов
+FRAMINGHAM_BINS = int(np.iinfo(RESULT_DTYPES['framingham_score']).max) + 1
+
+_FLAG_INDEX = {flag: i for i, flag in enumerate(WARNING_FLAGS)}
+_LEVEL_INDEX = {level: i for i, level in enumerate(RISK_LEVELS)}
+
+
+class Welford:
+    """Число наблюдений, среднее и сумма квадратов отклонений"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def add_array(self, values: np.ndarray):
+        if len(values):
+            self.merge(Welford(len(values), float(values.mean()),
+                               float(((values - values.mean()) ** 2).sum())))
+
+    def merge(self, other: 'Welford'):
+        """Объединение с другим агрегатом (формула Чана)"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+def _number(user_data: Mapping, name: str, default: float) -> float:
+    """Числовое поле записи; пропуск (нет ключа, None, NaN) - значение по умолчанию"""
+    value = user_data.get(name)
+    return default if value is None or value != value else value
+
+
+def _numeric(data: Mapping, name: str, default: float) -> np.ndarray:
+    """Числовая колонка с пропусками, замененными значением по умолчанию"""
+    values = np.asarray(data[name], dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+
+class PopulationStats:
+    """Объединяемые агрегаты оценок фиксированного размера"""
+
+    def __init__(self):
+        self.total = 0
+        self.risk_levels: List[int] = [0] * len(RISK_LEVELS)
+        self.framingham: List[int] = [0] * FRAMINGHAM_BINS
+        self.warning_flags: List[int] = [0] * len(WARNING_FLAGS)
+        self.six_month_risk = Welford()
+        self.sbp_by_age = [Welford() for _ in AGE_BANDS]
+        self._lock = threading.Lock()
+
+    def add_result(self, user_data: Mapping, result: RiskResult):
+        """Учесть результат calculate_overall_risk (пропуски - как в add_batch)"""
+        band = bisect_right(AGE_BAND_EDGES, _number(user_data, 'age', 0))
+        systolic_bp = _number(user_data, 'systolic_bp', 0)
+        with self._lock:
+            self.total += 1
+            self.risk_levels[_LEVEL_INDEX[result.risk_level]] += 1
+            self.framingham[min(result.framingham_score, FRAMINGHAM_BINS - 1)] += 1
+            for flag in result.warning_flags:
+                self.warning_flags[_FLAG_INDEX[flag]] += 1
+            self.six_month_risk.add(result.six_month_risk)
+            self.sbp_by_age[band].add(systolic_bp)
+
+    def add_batch(self, data: Mapping, result: BatchResult):
+        """Учесть векторизованный расчет когорты data (строки valid=False пропускаются)"""
+        valid = result.valid
+        age = _numeric(data, 'age', 0)[valid] if 'age' in data else np.zeros(valid.sum())
+        systolic_bp = (_numeric(data, 'systolic_bp', 0)[valid] if 'systolic_bp' in data
+                       else np.zeros(len(age)))
+        levels = np.bincount(result.risk_level[valid], minlength=len(RISK_LEVELS))
+        scores = np.bincount(result.framingham_score[valid], minlength=FRAMINGHAM_BINS)
+        flags = result.warning_flags[valid]
+        flag_counts = [int(np.count_nonzero(flags & (1 << bit)))
+                       for bit in range(len(WARNING_FLAGS))]
+        risk = result['six_month_risk'][valid]
+        bands = np.searchsorted(AGE_BAND_EDGES, age, side='right')
+
+        with self._lock:
+            self.total += len(age)
+            self.risk_levels = [a + int(b) for a, b in zip(self.risk_levels, levels)]
+            self.framingham = [a + int(b) for a, b in zip(self.framingham, scores)]
+            self.warning_flags = [a + b for a, b in zip(self.warning_flags, flag_counts)]
+            self.six_month_risk.add_array(risk)
+            for band, welford in enumerate(self.sbp_by_age):
+                welford.add_array(systolic_bp[bands == band])
+
+    def merge(self, other: 'PopulationStats'):
+        """Добавить агрегаты другого процесса или снимка"""
+        # Снимок other под его блокировкой: он может пополняться в других потоках.
+        # Блокировки берутся по очереди, поэтому встречные merge не блокируют друг друга
+        with other._lock:
+            total = other.total
+            risk_levels = list(other.risk_levels)
+            framingham = list(other.framingham)
+            warning_flags = list(other.warning_flags)
+            six_month_risk = Welford(other.six_month_risk.count, other.six_month_risk.mean,
+                                     other.six_month_risk.m2)
+            sbp_by_age = [Welford(w.count, w.mean, w.m2) for w in other.sbp_by_age]
+        with self._lock:
+            self.total += total
+            self.risk_levels = [a + b for a, b in zip(self.risk_levels, risk_levels)]
+            self.framingham = [a + b for a, b in zip(self.framingham, framingham)]
+            self.warning_flags = [a + b for a, b in zip(self.warning_flags, warning_flags)]
+            self.six_month_risk.merge(six_month_risk)
+            for welford, other_welford in zip(self.sbp_by_age, sbp_by_age):
+                welford.merge(other_welford)
+
+    # Представление для панелей
+
+    def risk_level_mix(self) -> Dict[str, float]:
+        """Доли уровней риска"""
+        return {level.value: count / self.total if self.total else 0.0
+                for level, count in zip(RISK_LEVELS, self.risk_levels)}
+
+    def flag_frequency(self) -> Dict[str, float]:
+        """Доля оценок с каждым красным флагом"""
+        return {flag: count / self.total if self.total else 0.0
+                for flag, count in zip(WARNING_FLAGS, self.warning_flags)}
+
+    def mean_sbp_by_age(self) -> Dict[str, Optional[float]]:
+        return {band: welford.mean if welford.count else None
+                for band, welford in zip(AGE_BANDS, self.sbp_by_age)}
+
+    # Снимки
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            last = max((i for i, count in enumerate(self.framingham) if count), default=-1)
+            return {
+                'total': self.total,
+                'risk_levels': {level.name: count
+                                for level, count in zip(RISK_LEVELS, self.risk_levels)},
+                'framingham': self.framingham[:last + 1],
+                'warning_flags': list(self.warning_flags),
+                'six_month_risk': [self.six_month_risk.count, self.six_month_risk.mean,
+                                   self.six_month_risk.m2],
+                'sbp_by_age': {band: [welford.count, welford.mean, welford.m2]
+                               for band, welford in zip(AGE_BANDS, self.sbp_by_age)},
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PopulationStats':
+        stats = cls()
+        stats.total = data['total']
+        stats.risk_levels = [data['risk_levels'][level.name] for level in RISK_LEVELS]
+        stats.framingham[:len(data['framingham'])] = data['framingham']
+        stats.warning_flags = list(data['warning_flags'])
+        stats.six_month_risk = Welford(*data['six_month_risk'])
+        stats.sbp_by_age = [Welford(*data['sbp_by_age'][band]) for band in AGE_BANDS]
+        return stats
+
+    def save(self, path: str):
+        """Атомарная запись снимка в JSON"""
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PopulationStats':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+class AggregatingCalculator(StrokeRiskCalculator):
+    """StrokeRiskCalculator, учитывающий каждый расчет в PopulationStats"""
+
+    def __init__(self, stats: Optional[PopulationStats] = None,
+                 rules: ScoringRules = DEFAULT_RULES):
+        super().__init__(rules)
+        self.stats = stats or PopulationStats()
+
+    def calculate_overall_risk(self, user_data: Dict) -> RiskResult:
+        result = super().calculate_overall_risk(user_data)
+        self.stats.add_result(user_data, result)
+        return result
+
+    def calculate_batch(self, data) -> BatchResult:
+        if isinstance(data, (list, tuple)):
+            # Записи переводятся в колонки один раз - для расчета и для агрегатов
+            data = columns_from_records(data)
+        result = super().calculate_batch(data)
+        self.stats.add_batch(data, result)
+        return result
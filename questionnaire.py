@@ -3,15 +3,149 @@
 ©️ 2025
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
+import atexit
 import json
+import os
 from datetime import datetime
 
+from response_store import ResponseStore, data_directory
+
+
+class ValidationRule:
+    """Одна проверка схемы анкеты: поле, вид проверки и текст ошибки"""
+
+    __slots__ = ('code', 'field', 'kind', 'limit', 'message')
+
+    def __init__(self, field: str, kind: str, limit, message: str):
+        self.code = f'{field}.{kind}'
+        self.field = field
+        self.kind = kind
+        self.limit = limit
+        self.message = message
+
+
+class BatchValidation:
+    """
+    Результат пакетной проверки: матрица ошибок строки x правила
+
+    errors[i, j] - строка i нарушает правило codes[j]
+    """
+
+    def __init__(self, rules: Sequence[ValidationRule], errors):
+        self.rules = tuple(rules)
+        self.codes = tuple(rule.code for rule in rules)
+        self.errors = errors
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    @property
+    def valid(self):
+        """Маска строк без ошибок"""
+        return ~self.errors.any(axis=1)
+
+    def error_counts(self) -> Dict[str, int]:
+        """Число строк с каждой ошибкой (только нарушенные правила)"""
+        counts = self.errors.sum(axis=0)
+        return {code: int(count) for code, count in zip(self.codes, counts) if count}
+
+    def row_codes(self, i: int) -> List[str]:
+        return [self.codes[j] for j in self.errors[i].nonzero()[0]]
+
+    def row_errors(self, i: int) -> List[str]:
+        """Тексты ошибок строки i"""
+        return [self.rules[j].message for j in self.errors[i].nonzero()[0]]
+
+
+class BatchValidator:
+    """
+    Проверка всей таблицы ответов векторизованными проходами
+
+    Схема (типы, min/max, варианты ответа, обязательность) компилируется
+    в список правил один раз; каждое правило - одна операция над колонкой.
+    """
+
+    # Ответы да/нет в таблицах часто уже приведены к bool (как user_data в app.py)
+    YES_NO = ('да', 'нет')
+
+    def __init__(self, questions: Sequence[Dict], required_fields: Sequence[str]):
+        required = list(required_fields)
+        required += [q['id'] for q in questions if q.get('required') and q['id'] not in required]
+        self.rules: List[ValidationRule] = [
+            ValidationRule(field, 'required', None, f"Обязательное поле '{field}' не заполнено")
+            for field in required
+        ]
+        for q in questions:
+            field = q['id']
+            if q['type'] == 'number':
+                self.rules.append(ValidationRule(
+                    field, 'type', None, f"Поле '{field}' должно быть числом"))
+                if 'min' in q:
+                    self.rules.append(ValidationRule(
+                        field, 'min', q['min'], f"Значение поля '{field}' меньше {q['min']}"))
+                if 'max' in q:
+                    self.rules.append(ValidationRule(
+                        field, 'max', q['max'], f"Значение поля '{field}' больше {q['max']}"))
+            elif 'options' in q:
+                options = list(q['options'])
+                if tuple(options) == self.YES_NO:
+                    options += [True, False]
+                self.rules.append(ValidationRule(
+                    field, 'option', options,
+                    f"Недопустимое значение поля '{field}'"))
+
+    def validate(self, frame) -> BatchValidation:
+        """Проверка pandas DataFrame (или словаря колонок)"""
+        import numpy as np
+        import pandas as pd
+
+        if not isinstance(frame, pd.DataFrame):
+            frame = pd.DataFrame(frame)
+        rows = len(frame)
+        errors = np.zeros((rows, len(self.rules)), dtype=bool)
+        # Пропуски и числовые значения считаются один раз на колонку
+        missing: Dict[str, np.ndarray] = {}
+        numeric: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        for j, rule in enumerate(self.rules):
+            if rule.field not in frame:
+                if rule.kind == 'required':
+                    errors[:, j] = True
+                continue
+            column = frame[rule.field]
+            if rule.field not in missing:
+                missing[rule.field] = column.isna().to_numpy()
+            absent = missing[rule.field]
+
+            if rule.kind == 'required':
+                errors[:, j] = absent
+            elif rule.kind == 'option':
+                errors[:, j] = ~absent & ~column.isin(rule.limit).to_numpy()
+            else:
+                if rule.field not in numeric:
+                    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+                    numeric[rule.field] = values, ~absent & np.isnan(values)
+                values, not_number = numeric[rule.field]
+                if rule.kind == 'type':
+                    errors[:, j] = not_number
+                elif rule.kind == 'min':
+                    errors[:, j] = values < rule.limit
+                else:
+                    errors[:, j] = values > rule.limit
+        return BatchValidation(self.rules, errors)
+
 
 class Questionnaire:
-    """Управление анкетой пользователя"""
+    """
+    Управление анкетой пользователя
+
+    Ответы сохраняются в хранилище store; без него - в общее хранилище
+    каталога responses в data_directory(), открываемое при первой записи.
+    """
     
-    def __init__(self):
+    def __init__(self, store: Optional[ResponseStore] = None):
+        self.store = store
         self.required_fields = [
             'age', 'gender', 'height_cm', 'weight_kg',
             'systolic_bp', 'has_diabetes', 'smoking'
@@ -55,6 +189,7 @@ class Questionnaire:
                 'required': True
             }
         ]
+        self._batch_validator = None
     
     def validate_responses(self, responses: Dict) -> List[str]:
         """Валидация ответов"""
@@ -72,20 +207,48 @@ class Questionnaire:
         
         return errors
     
-    def save_responses(self, responses: Dict, filename: str = None):
-        """Сохранение ответов в файл"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"анкета_{timestamp}.json"
-        
+    def validate_frame(self, frame) -> BatchValidation:
+        """Пакетная валидация таблицы ответов (матрица ошибок и коды правил)"""
+        if self._batch_validator is None:
+            self._batch_validator = BatchValidator(self.questions, self.required_fields)
+        return self._batch_validator.validate(frame)
+    
+    def save_responses(self, responses: Dict, filename: str = None,
+                       store: Optional[ResponseStore] = None):
+        """
+        Сохранение ответов
+
+        Запись дописывается в сегмент хранилища (store, хранилище анкеты
+        или общее по умолчанию) и возвращается ее id. С filename ответы
+        выгружаются в отдельный файл и возвращается его имя.
+        """
+        now = datetime.now()
         data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'responses': responses,
             'app_version': '1.0',
             'year': 2025
         }
         
+        if filename is None:
+            if store is None:
+                store = self.store if self.store is not None else default_response_store()
+            return store.append(data)
+        
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
         
         return filename
+
+
+_default_store: Optional[ResponseStore] = None
+
+
+def default_response_store() -> ResponseStore:
+    """Общее хранилище анкет процесса (каталог responses в data_directory())"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResponseStore(os.path.join(data_directory(), 'responses'))
+        # Буферизованные записи сбрасываются на диск при выходе
+        atexit.register(_default_store.close)
+    return _default_store
@@ -0,0 +1,279 @@
+"""
+Мой Риск: хранилище анкет в сегментах JSONL только с дозаписью
+©️ 2025
+
+Записи дописываются компактными строками JSON в сегменты
+<первый id>.jsonl. Рядом с каждым сегментом лежит индекс <первый id>.idx -
+массив смещений строк (uint64 little-endian), поэтому запись читается по
+id двумя позиционными чтениями без просмотра файлов, и отметка
+<первый id>.created с временем создания сегмента.
+
+Запись буферизуется; fsync выполняется группой - раз в sync_every записей
+или не позже чем через sync_interval секунд после предыдущего: фоновый
+поток сбрасывает записи, после которых новых не было (и при
+ротации/закрытии). Фоновый fsync выполняется вне блокировки по
+копиям дескрипторов, поэтому дозапись не ждет диска. Сегмент закрывается по размеру или возрасту, возраст
+считается от создания файла и не сбрасывается при повторном открытии.
+При открытии последний сегмент проверяется: недописанная строка
+отрезается, индекс перестраивается.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Tuple
+
+OFFSET = struct.Struct('<Q')
+DATA_SUFFIX = '.jsonl'
+INDEX_SUFFIX = '.idx'
+CREATED_SUFFIX = '.created'
+ID_WIDTH = 12
+
+
+def data_directory() -> str:
+    """
+    Каталог данных приложения: RISKOMETR_DATA_DIR, по умолчанию
+    $XDG_STATE_HOME/riskometr (~/.local/state/riskometr), а не текущий
+    каталог процесса
+    """
+    return os.environ.get('RISKOMETR_DATA_DIR') or os.path.join(
+        os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'), 'riskometr')
+
+
+class ResponseStore:
+    """Хранилище записей (словарей) с целочисленными id по порядку добавления"""
+
+    def __init__(self, directory: str,
+                 max_segment_bytes: int = 64 * 1024 * 1024,
+                 max_segment_age: float = 24 * 3600,
+                 sync_every: int = 100,
+                 sync_interval: float = 1.0,
+                 buffer_size: int = 64 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        # Записей добавлено и записей, гарантированно сброшенных на диск
+        self._written = 0
+        self._synced = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # Первые id сегментов по возрастанию; последний сегмент - активный
+        self._bases: List[int] = sorted(
+            int(name[:-len(DATA_SUFFIX)]) for name in os.listdir(directory)
+            if name.endswith(DATA_SUFFIX) and name[:-len(DATA_SUFFIX)].isdigit()
+        )
+        self._data = None
+        self._index = None
+        if self._bases:
+            self._next_id = self._bases[-1] + self._recover(self._bases[-1])
+            self._open_segment(self._bases[-1])
+        else:
+            self._next_id = 0
+            self._start_segment()
+
+        self._syncer = None
+        if sync_interval > 0:
+            self._syncer = threading.Thread(target=self._sync_loop, daemon=True,
+                                            name='response-store-sync')
+            self._syncer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._next_id - (self._bases[0] if self._bases else 0)
+
+    # Сегменты
+
+    def _path(self, base: int, suffix: str) -> str:
+        return os.path.join(self.directory, f'{base:0{ID_WIDTH}d}{suffix}')
+
+    def _recover(self, base: int) -> int:
+        """Отрезать недописанную строку активного сегмента и перестроить индекс"""
+        with open(self._path(base, DATA_SUFFIX), 'rb+') as data:
+            offsets = []
+            position = 0
+            for line in data:
+                if not line.endswith(b'\n'):
+                    break
+                offsets.append(position)
+                position += len(line)
+            data.truncate(position)
+        with open(self._path(base, INDEX_SUFFIX), 'wb') as index:
+            index.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        return len(offsets)
+
+    def _created_at(self, base: int) -> float:
+        """Время создания сегмента (time.time())"""
+        try:
+            with open(self._path(base, CREATED_SUFFIX), 'r', encoding='ascii') as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            # Сегменты без отметки: время создания файла, если ОС его хранит
+            stat = os.stat(self._path(base, DATA_SUFFIX))
+            return getattr(stat, 'st_birthtime', stat.st_mtime)
+
+    def _open_segment(self, base: int):
+        self._data = open(self._path(base, DATA_SUFFIX), 'ab', buffering=self.buffer_size)
+        self._index = open(self._path(base, INDEX_SUFFIX), 'ab', buffering=self.buffer_size)
+        self._segment_bytes = self._data.tell()
+        self._segment_created = self._created_at(base)
+        self._last_sync = time.monotonic()
+
+    def _start_segment(self):
+        with open(self._path(self._next_id, CREATED_SUFFIX), 'w', encoding='ascii') as f:
+            f.write(repr(time.time()))
+        self._bases.append(self._next_id)
+        self._open_segment(self._next_id)
+
+    def _close_segment(self):
+        self._sync()
+        self._data.close()
+        self._index.close()
+
+    def _flush(self):
+        if self._data is not None:
+            self._data.flush()
+            self._index.flush()
+
+    def _sync(self):
+        self._flush()
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+        self._synced = self._written
+        self._last_sync = time.monotonic()
+
+    def _sync_loop(self):
+        """Фоновый fsync записей, пролежавших без сброса sync_interval секунд"""
+        delay = self.sync_interval
+        while not self._closed.wait(delay):
+            with self._lock:
+                if self._data is None:
+                    return
+                elapsed = time.monotonic() - self._last_sync
+                if elapsed < self.sync_interval:
+                    delay = self.sync_interval - elapsed
+                    continue
+                delay = self.sync_interval
+                if self._written == self._synced:
+                    continue
+                # Под блокировкой - только сброс буферов и копии дескрипторов:
+                # сегмент может быть закрыт ротацией, пока идет fsync
+                self._flush()
+                files = (os.dup(self._data.fileno()), os.dup(self._index.fileno()))
+                written = self._written
+                self._last_sync = time.monotonic()
+            try:
+                for fd in files:
+                    os.fsync(fd)
+            finally:
+                for fd in files:
+                    os.close(fd)
+            with self._lock:
+                self._synced = max(self._synced, written)
+
+    # Запись
+
+    def append(self, record: Dict) -> int:
+        """Добавить запись; возвращает ее id"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._data is None:
+                raise ValueError("Хранилище закрыто")
+            if self._segment_bytes and (
+                self._segment_bytes + len(line) > self.max_segment_bytes
+                or time.time() - self._segment_created >= self.max_segment_age
+            ):
+                self._close_segment()
+                self._start_segment()
+
+            record_id = self._next_id
+            self._data.write(line)
+            self._index.write(OFFSET.pack(self._segment_bytes))
+            self._segment_bytes += len(line)
+            self._next_id += 1
+
+            self._written += 1
+            if (self._written - self._synced >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+            return record_id
+
+    def sync(self):
+        """Принудительно сбросить буферы и выполнить fsync"""
+        with self._lock:
+            if self._data is not None and self._written > self._synced:
+                self._sync()
+
+    def close(self):
+        self._closed.set()
+        if self._syncer is not None and self._syncer is not threading.current_thread():
+            self._syncer.join()
+        with self._lock:
+            if self._data is not None:
+                self._close_segment()
+                self._data = self._index = None
+
+    # Чтение
+
+    def _locate(self, record_id: int) -> Tuple[int, int]:
+        position = bisect_right(self._bases, record_id) - 1
+        if position < 0 or record_id >= self._next_id:
+            raise KeyError(record_id)
+        return self._bases[position], position
+
+    def get(self, record_id: int) -> Dict:
+        """Запись по id (KeyError, если такой нет)"""
+        with self._lock:
+            base, position = self._locate(record_id)
+            if position == len(self._bases) - 1:
+                # Активный сегмент: буферизованные строки должны быть видны чтению
+                self._flush()
+            data_path = self._path(base, DATA_SUFFIX)
+            index_path = self._path(base, INDEX_SUFFIX)
+
+        with open(index_path, 'rb') as index:
+            index.seek((record_id - base) * OFFSET.size)
+            entries = index.read(2 * OFFSET.size)
+        start = OFFSET.unpack_from(entries)[0]
+        with open(data_path, 'rb') as data:
+            data.seek(start)
+            if len(entries) == 2 * OFFSET.size:
+                line = data.read(OFFSET.unpack_from(entries, OFFSET.size)[0] - start)
+            else:
+                # Последняя запись сегмента: длина - до конца строки
+                line = data.readline()
+        return json.loads(line)
+
+    def scan(self, start_id: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Записи начиная с start_id в порядке добавления"""
+        with self._lock:
+            self._flush()
+            bases = list(self._bases)
+            end_id = self._next_id
+        for i, base in enumerate(bases):
+            segment_end = bases[i + 1] if i + 1 < len(bases) else end_id
+            if segment_end <= start_id:
+                continue
+            with open(self._path(base, DATA_SUFFIX), 'rb') as data:
+                for record_id, line in enumerate(data, start=base):
+                    if record_id >= end_id:
+                        return
+                    if record_id >= start_id:
+                        yield record_id, json.loads(line)
+
+    def segments(self) -> List[str]:
+        """Пути файлов сегментов по порядку"""
+        with self._lock:
+            return [self._path(base, DATA_SUFFIX) for base in self._bases]
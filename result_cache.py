@@ -0,0 +1,102 @@
+"""
+Мой Риск: LRU-кэш результатов расчета риска
+©️ 2025
+"""
+
+import dataclasses
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from stroke_risk_calculator import StrokeRiskCalculator, RiskResult, USER_DATA_FIELDS
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def cache_key(user_data: Dict) -> str:
+    """
+    Канонический хэш user_data
+
+    Учитываются только поля, которые читает калькулятор; порядок ключей
+    не важен. Типы значений сохраняются (45 и 45.0 - разные ключи), так
+    как они влияют на текст факторов риска.
+    """
+    normalized = {field: user_data[field] for field in USER_DATA_FIELDS if field in user_data}
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _copy_result(result: RiskResult) -> RiskResult:
+    """Копия результата, чтобы вызывающие не меняли закэшированные списки"""
+    return dataclasses.replace(result, **{
+        field.name: list(value)
+        for field in dataclasses.fields(result)
+        if isinstance(value := getattr(result, field.name), list)
+    })
+
+
+class RiskResultCache:
+    """
+    Ограниченный LRU-кэш поверх StrokeRiskCalculator.calculate_overall_risk
+
+    Подключается явно; безопасен при одновременном использовании из
+    нескольких потоков (сессий Streamlit).
+    """
+
+    def __init__(self, calculator: Optional[StrokeRiskCalculator] = None,
+                 max_size: int = 1024):
+        if max_size <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.calculator = calculator or StrokeRiskCalculator()
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, RiskResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def calculate_overall_risk(self, user_data: Dict) -> RiskResult:
+        """Расчет риска с повторным использованием результата для тех же данных"""
+        key = cache_key(user_data)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return _copy_result(result)
+            self._misses += 1
+
+        # Расчет вне блокировки: другие сессии не ждут
+        result = self.calculator.calculate_overall_risk(user_data)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return _copy_result(result)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions,
+                              len(self._entries), self.max_size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
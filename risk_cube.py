@@ -0,0 +1,270 @@
+"""
+Мой Риск: предрассчитанный куб риска по шкале Framingham
+©️ 2025
+
+Область входных данных шкалы конечна: целый возраст 15-100 лет,
+систолическое АД 80-250, ЛПНП с шагом 0.1 ммоль/л, логические поля и
+категориальные ответы. Построение перебирает всю область один раз и
+сохраняет баллы, риск на 6 месяцев и уровень риска в файл, который затем
+отображается в память (mmap). Несколько процессов-серверов разделяют его
+через страничный кэш ОС без собственных копий.
+
+Куб хранится по классам эквивалентности правил: для интервальных полей
+в файле лежат таблицы "значение -> номер интервала" на всю область,
+поэтому ответ - одна адресация в кубе после нескольких табличных чтений.
+
+Построение:
+    python -m risk_cube risk.cube
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import mmap
+import struct
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from scoring_rules import ScoringRules, DEFAULT_RULES, BandRule, FlagRule
+from stroke_risk_calculator import StrokeRiskCalculator, RiskLevel
+
+
+MAGIC = b'RSKCUBE1'
+HEADER = struct.Struct('<8sI')
+
+# Область значений интервальных полей: (минимум, максимум, шаг)
+DOMAIN = {
+    'age': (15, 100, 1),
+    'systolic_bp': (80, 250, 1),
+    'ldl_cholesterol': (0.0, 10.0, 0.1),
+}
+
+# Байт на ячейку: баллы, номер значения риска, номер уровня риска
+CELL_SIZE = 3
+
+
+def rules_fingerprint(rules: ScoringRules) -> str:
+    """Отпечаток таблицы правил, для которой построен куб"""
+    payload = json.dumps(rules.table, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _domain_values(field: str) -> List[float]:
+    low, high, step = DOMAIN[field]
+    count = int(round((high - low) / step)) + 1
+    if isinstance(step, int):
+        return [low + i * step for i in range(count)]
+    # Значения с шагом 0.1 получаем делением, чтобы они совпадали с вводом (4.9, а не 4.8999...)
+    scale = int(round(1 / step))
+    return [(int(round(low * scale)) + i) / scale for i in range(count)]
+
+
+def _axes(rules: ScoringRules) -> List[Dict]:
+    """Оси куба: по одной на каждое правило шкалы Framingham"""
+    axes = []
+    for rule in rules.framingham:
+        if isinstance(rule, BandRule):
+            if rule.field not in DOMAIN:
+                raise ValueError(f"Для поля '{rule.field}' не задана область значений")
+            values = _domain_values(rule.field)
+            band_map = [rule.bands.index(value) for value in values]
+            representatives = {}
+            for value, band in zip(values, band_map):
+                representatives.setdefault(band, value)
+            axes.append({'kind': 'bands', 'field': rule.field, 'size': len(rule.bands.values),
+                         'default': rule.default, 'map': band_map,
+                         'representatives': representatives})
+        elif isinstance(rule, FlagRule):
+            axes.append({'kind': 'flag', 'field': rule.field, 'size': 2})
+        else:
+            # Нулевая позиция - любое значение вне таблицы выбора
+            choices = [None] + list(rule.choices)
+            axes.append({'kind': 'choice', 'field': rule.field, 'size': len(choices),
+                         'default': rule.default, 'choices': choices})
+    return axes
+
+
+def build_risk_cube(path: str, rules: ScoringRules = DEFAULT_RULES) -> int:
+    """
+    Построение файла куба риска
+
+    Каждая ячейка считается обычным скалярным расчетом на представителе
+    своего класса эквивалентности. Возвращает число ячеек.
+    """
+    calculator = StrokeRiskCalculator(rules)
+    axes = _axes(rules)
+    risk_values = list(rules.framingham_risk.values)
+    levels = list(RiskLevel)
+
+    strides = []
+    stride = 1
+    for axis in reversed(axes):
+        strides.append(stride)
+        stride *= axis['size']
+    strides.reverse()
+    cell_count = stride
+
+    cells = bytearray(cell_count * CELL_SIZE)
+    for index, position in enumerate(itertools.product(*(range(a['size']) for a in axes))):
+        user_data = {}
+        for axis, i in zip(axes, position):
+            if axis['kind'] == 'bands':
+                # Интервалы вне области значений недостижимы; их ячейки не читаются
+                user_data[axis['field']] = axis['representatives'].get(i, DOMAIN[axis['field']][0])
+            elif axis['kind'] == 'flag':
+                user_data[axis['field']] = bool(i)
+            else:
+                user_data[axis['field']] = axis['choices'][i]
+        score, risk_percent, _ = calculator.calculate_framingham_6month_risk(user_data)
+        if score > 255:
+            raise ValueError("Баллы Framingham не помещаются в ячейку куба")
+        level = calculator.determine_risk_level(risk_percent)
+        offset = index * CELL_SIZE
+        cells[offset:offset + CELL_SIZE] = bytes(
+            (score, risk_values.index(risk_percent), levels.index(level))
+        )
+
+    header = {
+        'fingerprint': rules_fingerprint(rules),
+        'risk_values': risk_values,
+        'levels': [level.name for level in levels],
+        'axes': [],
+    }
+    maps = bytearray()
+    for axis, axis_stride in zip(axes, strides):
+        entry = {'kind': axis['kind'], 'field': axis['field'], 'stride': axis_stride,
+                 'default': axis.get('default', False)}
+        if axis['kind'] == 'bands':
+            low, high, step = DOMAIN[axis['field']]
+            entry.update(low=low, high=high, step=step, map_offset=len(maps))
+            maps += bytes(axis['map'])
+        elif axis['kind'] == 'choice':
+            entry['choices'] = axis['choices']
+        header['axes'].append(entry)
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(maps)
+        f.write(cells)
+    return cell_count
+
+
+def _compile_cell_index(flags: Sequence, choices: Sequence, bands: Sequence) -> Callable:
+    """
+    Номер ячейки одной функцией без цикла по осям
+
+    Вклады осей заранее умножены на их шаги (stride): флаг добавляет
+    константу, выбор и интервальное поле - элемент таблицы смещений.
+    Поля, значения по умолчанию и шаги подставляются в код литералами.
+    """
+    namespace: Dict[str, Any] = {'inf': math.inf}
+    lines = [
+        'def cell_index(user_data):',
+        '    get = user_data.get',
+        '    index = 0',
+    ]
+    for field, stride in flags:
+        lines += [f'    if get({field!r}, False):',
+                  f'        index += {stride!r}']
+    for i, (field, default, offsets) in enumerate(choices):
+        namespace[f'choice_{i}'] = offsets
+        lines.append(f'    index += choice_{i}.get(get({field!r}, {default!r}), 0)')
+    for i, (field, default, low, scale, offsets) in enumerate(bands):
+        namespace[f'bands_{i}'] = offsets
+        lines += [
+            f'    value = get({field!r}, {default!r})',
+            # NaN и бесконечности - в скалярный расчет, round() на них падает
+            '    if not -inf < value < inf:',
+            '        return None',
+            f'    step = round(value * {scale!r})',
+            # Только точные значения сетки: 4.9, но не 4.85
+            f'    if step / {scale!r} != value:',
+            '        return None',
+            f'    position = step - {low!r}',
+            f'    if not 0 <= position < {len(offsets)!r}:',
+            '        return None',
+            f'    index += bands_{i}[position]',
+        ]
+    lines.append('    return index')
+    exec('\n'.join(lines), namespace)
+    return namespace['cell_index']
+
+
+class RiskCube:
+    """Куб риска, отображенный в память только для чтения"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Файл {path} не является кубом риска")
+        start = HEADER.size
+        header = json.loads(self._mmap[start:start + header_size].decode('utf-8'))
+        maps_start = start + header_size
+
+        self.fingerprint = header['fingerprint']
+        self.risk_values = tuple(header['risk_values'])
+        self.levels = tuple(RiskLevel[name] for name in header['levels'])
+
+        self._view = view = memoryview(self._mmap)
+        flags, choices, bands = [], [], []
+        maps_size = 0
+        for axis in header['axes']:
+            stride = axis['stride']
+            if axis['kind'] == 'bands':
+                scale = int(round(1 / axis['step']))
+                size = int(round((axis['high'] - axis['low']) * scale)) + 1
+                map_start = maps_start + axis['map_offset']
+                offsets = [band * stride for band in self._mmap[map_start:map_start + size]]
+                maps_size = max(maps_size, axis['map_offset'] + size)
+                bands.append((axis['field'], axis['default'],
+                              int(round(axis['low'] * scale)), scale, offsets))
+            elif axis['kind'] == 'flag':
+                flags.append((axis['field'], stride))
+            else:
+                offsets = {value: i * stride for i, value in enumerate(axis['choices'])
+                           if value is not None}
+                choices.append((axis['field'], axis['default'], offsets))
+        self._cells = view[maps_start + maps_size:]
+        self.cell_index = _compile_cell_index(flags, choices, bands)
+
+    def close(self):
+        self._cells.release()
+        self._view.release()
+        self._mmap.close()
+
+    def lookup(self, user_data: Dict) -> Optional[Tuple[int, float, RiskLevel]]:
+        """
+        Баллы Framingham, риск на 6 месяцев и уровень риска одним чтением из куба
+
+        Номер ячейки - cell_index(user_data), None для данных вне области куба.
+        """
+        index = self.cell_index(user_data)
+        if index is None:
+            return None
+        offset = index * CELL_SIZE
+        score, risk, level = self._cells[offset:offset + CELL_SIZE]
+        return score, self.risk_values[risk], self.levels[level]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m risk_cube',
+        description='Построение куба риска по шкале Framingham'
+    )
+    parser.add_argument('output', help='Путь к файлу куба')
+    parser.add_argument('--rules', help='JSON-файл таблицы правил (по умолчанию встроенная)')
+    args = parser.parse_args(argv)
+
+    rules = ScoringRules.from_json(args.rules) if args.rules else DEFAULT_RULES
+    cells = build_risk_cube(args.output, rules)
+    print(f"Куб записан: {args.output} ({cells} ячеек)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+"""
+Мой Риск: таблица правил балльных шкал
+©️ 2025
+
+Границы интервалов, баллы и подписи факторов риска описаны декларативно
+в RULE_TABLE и один раз компилируются в ScoringRules. Скалярный и
+векторизованный расчеты вычисляют шкалы по одной и той же таблице, поэтому
+пороги можно настраивать без изменения кода (см. ScoringRules.from_json).
+Скалярный расчет ищет интервал по отсортированным границам через
+bisect_right - так же, как векторизованный через np.searchsorted.
+"""
+
+import json
+import math
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+RULE_TABLE: Dict[str, Any] = {
+    # Факторы модифицированной шкалы Framingham в порядке вывода
+    'framingham': [
+        {
+            'type': 'bands', 'field': 'age', 'default': 0,
+            'edges': [35, 45, 55, 65, 75],
+            'points': [0, 3, 5, 8, 10, 12],
+            'labels': [None, "Возраст 35-44 года", "Возраст 45-54 года",
+                       "Возраст 55-64 года", "Возраст 65-74 года", "Возраст 75+ лет"],
+        },
+        {
+            'type': 'bands', 'field': 'systolic_bp', 'default': 0,
+            'edges': [120, 130, 140, 160, 180],
+            'points': [0, 1, 3, 5, 7, 9],
+            'labels': [None, "Нормальное АД (120-129)", "Высокое нормальное АД (130-139)",
+                       "Артериальная гипертензия 1 ст. (140-159)",
+                       "Артериальная гипертензия 2 ст. (160-179)",
+                       "Артериальная гипертензия 3 ст. (180+)"],
+        },
+        {
+            'type': 'flag', 'field': 'on_blood_pressure_meds', 'points': 2,
+            'label': "Прием антигипертензивных препаратов",
+        },
+        {'type': 'flag', 'field': 'has_diabetes', 'points': 4, 'label': "Сахарный диабет"},
+        {
+            'type': 'choice', 'field': 'smoking', 'default': 'никогда',
+            'choices': {
+                'курящий': [5, "Курение в настоящее время"],
+                'курил в прошлом': [2, "Курение в прошлом"],
+            },
+        },
+        {
+            'type': 'flag', 'field': 'has_atrial_fibrillation', 'points': 6,
+            'label': "Мерцательная аритмия",
+        },
+        {
+            'type': 'flag', 'field': 'previous_stroke_tia', 'points': 8,
+            'label': "Предыдущий инсульт/ТИА",
+        },
+        {
+            'type': 'choice', 'field': 'palpitations', 'default': 'никогда',
+            'choices': {'часто': [2, "Частое сердцебиение"]},
+        },
+        {
+            'type': 'flag', 'field': 'family_stroke_history', 'points': 2,
+            'label': "Семейный анамнез инсульта",
+        },
+        {
+            'type': 'choice', 'field': 'activity_level', 'default': 'подвижный',
+            'choices': {
+                'малоподвижный': [1, "Малоподвижный образ жизни"],
+                'неподвижный': [2, "Неподвижный образ жизни"],
+            },
+        },
+        {
+            'type': 'bands', 'field': 'ldl_cholesterol', 'default': 0,
+            'edges': [3.0, 4.9],
+            'points': [0, 1, 3],
+            'labels': [None, None, "Высокий холестерин ЛПНП ({value} ммоль/л)"],
+        },
+    ],
+    # Баллы Framingham -> риск на 6 месяцев (%), по данным INTERSTROKE
+    'framingham_risk': {
+        'edges': [6, 11, 16, 21, 26, 31],
+        'values': [0.1, 0.5, 1.2, 2.8, 5.5, 9.0, 15.0],
+    },
+    # Риск на 6 месяцев (%) -> уровень риска (имя RiskLevel)
+    'risk_levels': {
+        'edges': [1.0, 3.0, 10.0],
+        'values': ['LOW', 'MODERATE', 'HIGH', 'CRITICAL'],
+    },
+    # ABCD²: длительность симптомов (мин) -> баллы
+    'abcd2_duration': {'edges': [10, 60], 'values': [0, 1, 2]},
+    # ABCD²: баллы -> риск инсульта на 2 и 7 дней (%)
+    'abcd2_risk': {
+        'edges': [4, 5],
+        'values': [[1.0, 1.2], [4.1, 5.9], [8.1, 11.7]],
+    },
+    # CHA₂DS₂-VASc: возраст -> баллы и критерий
+    'chads2_vasc_age': {
+        'edges': [65, 75],
+        'values': [0, 1, 2],
+        'labels': [None, "Возраст 65-74 года", "Возраст ≥75 лет"],
+    },
+    # CHA₂DS₂-VASc: баллы -> годовой риск инсульта (%)
+    'chads2_vasc_risk': [0.0, 1.3, 2.2, 3.2, 4.0, 6.7, 9.8, 9.6, 12.5, 15.2],
+    # ИМТ: границы категорий BMI_CATEGORIES[1:]
+    'bmi_categories': {'edges': [18.5, 25, 30]},
+}
+
+
+def _check_edges(name: str, edges: Sequence, values: Sequence):
+    if not all(isinstance(edge, (int, float)) and math.isfinite(edge) for edge in edges):
+        raise ValueError(f"Правило '{name}': границы должны быть конечными числами")
+    if list(edges) != sorted(edges):
+        raise ValueError(f"Правило '{name}': границы должны быть упорядочены")
+    if len(values) != len(edges) + 1:
+        raise ValueError(f"Правило '{name}': значений должно быть на одно больше, чем границ")
+
+
+class Bands:
+    """Таблица интервалов: значение ищется по левым (включительным) границам"""
+
+    __slots__ = ('edges', 'values', 'labels')
+
+    def __init__(self, name: str, edges: Sequence, values: Sequence,
+                 labels: Optional[Sequence[Optional[str]]] = None):
+        _check_edges(name, edges, values)
+        self.edges = tuple(edges)
+        self.values = tuple(values)
+        self.labels = tuple(labels) if labels is not None else (None,) * len(self.values)
+
+    def index(self, value) -> int:
+        return bisect_right(self.edges, value)
+
+    def lookup(self, value):
+        return self.values[bisect_right(self.edges, value)]
+
+
+class BandRule:
+    """Фактор риска по интервалам числового поля"""
+
+    __slots__ = ('field', 'default', 'bands', 'templates')
+
+    def __init__(self, field: str, default, edges: Sequence[float],
+                 points: Sequence[int], labels: Sequence[Optional[str]]):
+        self.field = field
+        self.default = default
+        self.bands = Bands(field, edges, points, labels)
+        self.templates = tuple(bool(label) and '{value}' in label for label in labels)
+
+
+class FlagRule:
+    """Фактор риска по логическому полю"""
+
+    __slots__ = ('field', 'points', 'label')
+
+    def __init__(self, field: str, points: int, label: str):
+        self.field = field
+        self.points = points
+        self.label = label
+
+
+class ChoiceRule:
+    """Фактор риска по значению категориального поля"""
+
+    __slots__ = ('field', 'default', 'choices')
+
+    def __init__(self, field: str, default: str, choices: Dict[str, Sequence]):
+        self.field = field
+        self.default = default
+        self.choices = {value: (points, label) for value, (points, label) in choices.items()}
+
+
+_RULE_TYPES = {'bands': BandRule, 'flag': FlagRule, 'choice': ChoiceRule}
+
+
+# Виды шагов расчета Framingham (см. _framingham_steps)
+_FLAG, _BANDS, _CHOICE = range(3)
+
+
+def _framingham_steps(rules: Sequence) -> Tuple[tuple, ...]:
+    """
+    Правила Framingham в виде кортежей для цикла без isinstance и атрибутов
+
+    Для интервальных правил - отсортированные границы для bisect_right,
+    баллы и подписи интервалов (подписи с {value} - как шаблоны)
+    """
+    steps = []
+    for rule in rules:
+        if isinstance(rule, FlagRule):
+            steps.append((_FLAG, rule.field, False, (rule.points, rule.label)))
+        elif isinstance(rule, BandRule):
+            bands = rule.bands
+            labels = tuple((label, template) if label else None
+                           for label, template in zip(bands.labels, rule.templates))
+            steps.append((_BANDS, rule.field, rule.default, (bands.edges, bands.values, labels)))
+        else:
+            choices = tuple((value, points, label)
+                            for value, (points, label) in rule.choices.items())
+            steps.append((_CHOICE, rule.field, rule.default, choices))
+    return tuple(steps)
+
+
+class ScoringRules:
+    """Скомпилированная таблица правил балльных шкал"""
+
+    def __init__(self, table: Dict[str, Any] = RULE_TABLE):
+        self.table = table
+        self.framingham: List = []
+        for spec in table['framingham']:
+            spec = dict(spec)
+            rule_type = _RULE_TYPES.get(spec.pop('type'))
+            if rule_type is None:
+                raise ValueError(f"Неизвестный тип правила для поля '{spec.get('field')}'")
+            self.framingham.append(rule_type(**spec))
+
+        self.framingham_risk = Bands('framingham_risk', **table['framingham_risk'])
+        self._framingham_steps = _framingham_steps(self.framingham)
+        self._framingham_risk = tuple(round(value, 1) for value in self.framingham_risk.values)
+        self.risk_levels = Bands('risk_levels', **table['risk_levels'])
+        self.abcd2_duration = Bands('abcd2_duration', **table['abcd2_duration'])
+        self.abcd2_risk = Bands(
+            'abcd2_risk', table['abcd2_risk']['edges'],
+            [tuple(risks) for risks in table['abcd2_risk']['values']]
+        )
+        self.chads2_vasc_age = Bands('chads2_vasc_age', **table['chads2_vasc_age'])
+        self.chads2_vasc_risk = tuple(table['chads2_vasc_risk'])
+        edges = table['bmi_categories']['edges']
+        self.bmi_categories = Bands('bmi_categories', edges, range(1, len(edges) + 2))
+
+    def framingham_breakdown(self, user_data: Dict) -> Tuple[int, float, List[Tuple[str, int]]]:
+        """
+        Баллы Framingham, риск на 6 месяцев и факторы риска с их баллами
+
+        В список попадают только факторы с подписью (ЛПНП 3.0-4.8 дает балл без подписи)
+        """
+        get = user_data.get
+        score = 0
+        risk_factors = []
+        append = risk_factors.append
+        for kind, field, default, table in self._framingham_steps:
+            if kind is _FLAG:
+                if get(field, False):
+                    points, label = table
+                    score += points
+                    append((label, points))
+            elif kind is _BANDS:
+                value = get(field, default)
+                edges, points, labels = table
+                i = bisect_right(edges, value)
+                score += points[i]
+                label = labels[i]
+                if label is not None:
+                    text, template = label
+                    append((text.format(value=value) if template else text, points[i]))
+            else:
+                value = get(field, default)
+                for choice, points, label in table:
+                    if value == choice:
+                        score += points
+                        append((label, points))
+                        break
+        risk = self._framingham_risk[bisect_right(self.framingham_risk.edges, score)]
+        return score, risk, risk_factors
+
+    def framingham_factors(self, user_data: Dict) -> Tuple[int, float, List[str]]:
+        """Баллы Framingham, риск на 6 месяцев и подписи факторов риска"""
+        score, risk, risk_factors = self.framingham_breakdown(user_data)
+        return score, risk, [label for label, _ in risk_factors]
+
+    @classmethod
+    def from_json(cls, path: str) -> 'ScoringRules':
+        """Загрузка таблицы правил из JSON-файла той же структуры, что RULE_TABLE"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def to_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.table, f, ensure_ascii=False, indent=2)
+
+
+DEFAULT_RULES = ScoringRules()
@@ -0,0 +1,524 @@
+"""
+Мой Риск: HTTP-сервис расчета риска для интеграции с внешними системами
+©️ 2025
+
+Запуск:
+    python -m scoring_service --port 8765
+
+Методы:
+    POST /assess        - один объект user_data -> RiskResult в JSON
+    POST /assess/batch  - JSON-массив -> JSON-массив результатов;
+                          NDJSON (Content-Type: application/x-ndjson) ->
+                          поток NDJSON, строка результата на строку запроса
+    GET  /stats         - перцентили задержки, счетчики, статистика кэша
+                          (и агрегаты оценок при --population-stats)
+    GET  /metrics       - метрики этапов расчета в формате Prometheus
+                          (при запуске с --metrics)
+    GET  /health
+
+Сервис работает на asyncio без внешних зависимостей: соединения
+keep-alive, не больше max_concurrency одновременных расчетов и не больше
+max_pending ожидающих запросов (остальные получают 503). Поток NDJSON
+читается блоками, и следующий блок читается только после отправки
+результатов предыдущего, поэтому медленный клиент не накапливает память.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from instrumentation import InstrumentedCalculator, RiskMetrics, PROMETHEUS_CONTENT_TYPE
+from population_stats import PopulationStats
+from result_cache import RiskResultCache
+from stroke_risk_calculator import StrokeRiskCalculator
+
+
+DEFAULT_PORT = 8765
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 16 * 1024 * 1024
+BATCH_CHUNK_SIZE = 1000
+KEEPALIVE_TIMEOUT = 15.0
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    408: 'Request Timeout', 411: 'Length Required', 413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large', 503: 'Service Unavailable',
+}
+
+NDJSON = 'application/x-ndjson'
+
+# Путь -> (метод, обработчик ScoringService)
+ROUTES = {
+    '/assess': ('POST', '_assess'),
+    '/assess/batch': ('POST', '_assess_batch'),
+    '/stats': ('GET', '_stats'),
+    '/metrics': ('GET', '_metrics'),
+    '/health': ('GET', '_health'),
+}
+
+
+class HttpError(Exception):
+    """Ошибка запроса с HTTP-статусом ответа"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LatencyStats:
+    """Задержки запросов по маршрутам в скользящем окне последних запросов"""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, route: str, seconds: float):
+        samples = self._samples.get(route)
+        if samples is None:
+            samples = self._samples[route] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self._counts[route] = self._counts.get(route, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """p50/p90/p99/max в миллисекундах по окну и общее число запросов"""
+        report = {}
+        for route, samples in self._samples.items():
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            report[route] = {
+                'count': self._counts[route],
+                **{
+                    f'p{q}_ms': round(ordered[min(last, int(q / 100 * len(ordered)))] * 1000, 3)
+                    for q in (50, 90, 99)
+                },
+                'max_ms': round(ordered[-1] * 1000, 3),
+            }
+        return report
+
+
+def _parse_json(payload: bytes):
+    try:
+        return json.loads(payload)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HttpError(400, f"Некорректный JSON: {e}")
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """Стартовая строка и заголовки запроса; None, если клиент закрыл соединение"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HttpError(400, "Неполный заголовок запроса")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Слишком большой заголовок запроса")
+    except asyncio.TimeoutError:
+        return None
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HttpError(400, "Некорректная стартовая строка запроса")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    if not headers.get('content-length', '0').isdigit():
+        raise HttpError(400, "Некорректный Content-Length")
+    return method, target.split('?', 1)[0], version, headers
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    """Строка служебной части chunked-тела (размер блока, завершающие заголовки)"""
+    try:
+        return await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        # readline сообщает о строке длиннее лимита потока через ValueError
+        raise HttpError(400, "Слишком длинная строка размера блока")
+
+
+async def _body_chunks(reader: asyncio.StreamReader, headers: Dict[str, str],
+                       max_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Тело запроса по частям не длиннее 64 КБ (Content-Length или chunked)
+
+    Размер каждого блока chunked сверяется с остатком max_size до чтения
+    блока; None - без ограничения общего размера (поток NDJSON)
+    """
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        remaining = max_size
+        while True:
+            size_line = await _read_line(reader)
+            try:
+                size = int(size_line.split(b';', 1)[0], 16)
+            except ValueError:
+                raise HttpError(400, "Некорректный размер блока")
+            if size < 0:
+                raise HttpError(400, "Некорректный размер блока")
+            if size == 0:
+                # Завершающие заголовки не используются
+                while (await _read_line(reader)) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            if remaining is not None:
+                if size > remaining:
+                    raise HttpError(413, "Слишком большое тело запроса")
+                remaining -= size
+            while size > 0:
+                chunk = await reader.readexactly(min(size, 64 * 1024))
+                size -= len(chunk)
+                yield chunk
+            if await reader.readexactly(2) != b'\r\n':
+                raise HttpError(400, "Некорректное окончание блока")
+    else:
+        remaining = int(headers.get('content-length', 0))
+        if max_size is not None and remaining > max_size:
+            raise HttpError(413, "Слишком большое тело запроса")
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, 64 * 1024))
+            if not chunk:
+                raise HttpError(400, "Тело запроса короче Content-Length")
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    if 'content-length' not in headers and 'transfer-encoding' not in headers:
+        raise HttpError(411, "Нужен заголовок Content-Length")
+    body = bytearray()
+    async for chunk in _body_chunks(reader, headers, MAX_BODY_SIZE):
+        body += chunk
+    return bytes(body)
+
+
+async def _body_lines(reader: asyncio.StreamReader, headers: Dict[str, str]) -> AsyncIterator[bytes]:
+    """Непустые строки тела запроса NDJSON"""
+    pending = b''
+    async for chunk in _body_chunks(reader, headers):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        if len(pending) > MAX_HEADER_SIZE * 16:
+            raise HttpError(413, "Слишком длинная строка NDJSON")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+class ScoringService:
+    """
+    HTTP-сервис расчета риска
+
+    Одиночные запросы считаются через общий LRU-кэш, пакетные -
+    векторизованно через calculate_batch (см. batch_scoring.assess_records);
+    в обоих случаях ответ - полный RiskResult с детализацией. Если задан
+    population_stats, успешные расчеты учитываются в нем и выводятся
+    в GET /stats.
+    """
+
+    def __init__(self, calculator: Optional[StrokeRiskCalculator] = None,
+                 max_concurrency: int = 4, max_pending: int = 64,
+                 batch_chunk_size: int = BATCH_CHUNK_SIZE,
+                 cache_size: int = 4096,
+                 metrics: Optional[RiskMetrics] = None,
+                 population_stats: Optional[PopulationStats] = None):
+        if calculator is None:
+            calculator = InstrumentedCalculator(metrics) if metrics else StrokeRiskCalculator()
+        self.calculator = calculator
+        self.metrics = metrics
+        self.population_stats = population_stats
+        self.cache = RiskResultCache(self.calculator, max_size=cache_size)
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.batch_chunk_size = batch_chunk_size
+        self.latency = LatencyStats()
+        self.rejected = 0
+        self._waiting = 0
+        self._in_flight = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='scoring')
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.start_server(self._handle_connection, host, port,
+                                          limit=MAX_HEADER_SIZE)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    # Расчет
+
+    def assess_one(self, user_data) -> Dict:
+        if not isinstance(user_data, dict):
+            return {'error': "Ожидается JSON-объект user_data"}
+        try:
+            result = self.cache.calculate_overall_risk(user_data)
+        except (TypeError, ValueError) as e:
+            return {'error': str(e)}
+        if self.population_stats is not None:
+            self.population_stats.add_result(user_data, result)
+        return result.to_dict()
+
+    def assess_many(self, records: List) -> List[Dict]:
+        """
+        Расчет списка user_data с тем же ответом, что у assess_one
+
+        Записи с данными ожидаемых типов считаются векторизованно, остальные
+        (и не-объекты) - по одной, поэтому ошибки тоже совпадают с /assess.
+        """
+        from batch_scoring import assess_records
+
+        results: List[Optional[Dict]] = [None] * len(records)
+        objects = []
+        for i, record in enumerate(records):
+            if isinstance(record, dict):
+                objects.append(i)
+            else:
+                results[i] = self.assess_one(record)
+        outcomes = assess_records([records[i] for i in objects], self.calculator,
+                                  self.cache.calculate_overall_risk, self.population_stats)
+        for i, (result, error) in zip(objects, outcomes):
+            results[i] = {'error': str(error)} if error is not None else result.to_dict()
+        return results
+
+    def _reject(self):
+        self.rejected += 1
+        raise HttpError(503, "Сервис перегружен, повторите запрос позже")
+
+    async def _run(self, func, *args, admit: bool = True):
+        """Расчет в пуле потоков с ограничением числа одновременных расчетов"""
+        if admit and self._semaphore.locked() and self._waiting >= self.max_pending:
+            self._reject()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await _read_head(reader)
+                except HttpError as e:
+                    await self._send_json(writer, e.status, {'error': e.message}, False)
+                    break
+                if request is None:
+                    break
+                method, path, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                              else connection == 'keep-alive')
+
+                started = time.perf_counter()
+                try:
+                    keep_alive = await self._dispatch(method, path, headers, reader, writer,
+                                                      keep_alive)
+                except HttpError as e:
+                    # Непрочитанный остаток тела не позволяет продолжить соединение
+                    keep_alive = False
+                    await self._send_json(writer, e.status, {'error': e.message}, False)
+                route = f'{method} {path}' if path in ROUTES else 'other'
+                self.latency.record(route, time.perf_counter() - started)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str],
+                        reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        keep_alive: bool) -> bool:
+        """Обработка запроса; возвращает, можно ли продолжить соединение"""
+        if path not in ROUTES:
+            raise HttpError(404, f"Неизвестный путь {path}")
+        allowed, handler = ROUTES[path]
+        if method != allowed:
+            raise HttpError(405, f"Для {path} поддерживается только {allowed}")
+        if method == 'GET':
+            # Тело GET-запроса не ожидается, но должно быть прочитано
+            async for _ in _body_chunks(reader, headers, MAX_BODY_SIZE):
+                pass
+        return await getattr(self, handler)(headers, reader, writer, keep_alive)
+
+    async def _assess(self, headers, reader, writer, keep_alive):
+        user_data = _parse_json(await _read_body(reader, headers))
+        if not isinstance(user_data, dict):
+            raise HttpError(400, "Ожидается JSON-объект user_data")
+        result = await self._run(self.assess_one, user_data)
+        await self._send_json(writer, 400 if 'error' in result else 200, result, keep_alive)
+        return keep_alive
+
+    async def _assess_batch(self, headers, reader, writer, keep_alive):
+        if headers.get('content-type', '').split(';')[0].strip() == NDJSON:
+            return await self._assess_stream(headers, reader, writer, keep_alive)
+        records = _parse_json(await _read_body(reader, headers))
+        if not isinstance(records, list):
+            raise HttpError(400, "Ожидается JSON-массив user_data")
+        results = await self._run(self.assess_many, records)
+        await self._send_json(writer, 200, results, keep_alive)
+        return keep_alive
+
+    async def _assess_stream(self, headers, reader, writer, keep_alive):
+        """NDJSON: расчет и отправка блоками по batch_chunk_size строк"""
+        if self._semaphore.locked() and self._waiting >= self.max_pending:
+            self._reject()
+        writer.write(_head(200, {
+            'Content-Type': f'{NDJSON}; charset=utf-8',
+            'Transfer-Encoding': 'chunked',
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }))
+
+        def send(results: List[Dict]):
+            payload = b''.join(_dumps(result) + b'\n' for result in results)
+            writer.write(b'%x\r\n%s\r\n' % (len(payload), payload))
+
+        async def flush(records: List, errors: Dict[int, Dict]):
+            valid = [record for i, record in enumerate(records) if i not in errors]
+            results = iter(await self._run(self.assess_many, valid, admit=False))
+            # Строки с некорректным JSON получают ошибку на своей позиции
+            send([errors.get(i) or next(results) for i in range(len(records))])
+            await writer.drain()
+
+        records, errors = [], {}
+        try:
+            async for line in _body_lines(reader, headers):
+                try:
+                    records.append(json.loads(line))
+                except (UnicodeDecodeError, ValueError) as e:
+                    errors[len(records)] = {'error': f"Некорректный JSON: {e}"}
+                    records.append(None)
+                if len(records) >= self.batch_chunk_size:
+                    await flush(records, errors)
+                    records, errors = [], {}
+            if records:
+                await flush(records, errors)
+        except HttpError as e:
+            # Заголовок ответа уже отправлен: ошибка передается последней строкой потока
+            send([{'error': e.message}])
+            keep_alive = False
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return keep_alive
+
+    async def _stats(self, headers, reader, writer, keep_alive):
+        cache = self.cache.stats()
+        report = {
+            'latency': self.latency.snapshot(),
+            'in_flight': self._in_flight,
+            'waiting': self._waiting,
+            'rejected': self.rejected,
+            'cache': {'hits': cache.hits, 'misses': cache.misses,
+                      'size': cache.size, 'hit_rate': round(cache.hit_rate, 4)},
+        }
+        if self.population_stats is not None:
+            report['population'] = self.population_stats.to_dict()
+        await self._send_json(writer, 200, report, keep_alive)
+        return keep_alive
+
+    async def _metrics(self, headers, reader, writer, keep_alive):
+        if self.metrics is None:
+            raise HttpError(404, "Метрики выключены (запуск с --metrics)")
+        body = self.metrics.to_prometheus().encode('utf-8')
+        writer.write(_head(200, {
+            'Content-Type': PROMETHEUS_CONTENT_TYPE,
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }) + body)
+        await writer.drain()
+        return keep_alive
+
+    async def _health(self, headers, reader, writer, keep_alive):
+        await self._send_json(writer, 200, {'status': 'ok'}, keep_alive)
+        return keep_alive
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        body = _dumps(payload)
+        writer.write(_head(status, {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }) + body)
+        await writer.drain()
+
+
+async def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, **options):
+    service = ScoringService(**options)
+    server = await service.start(host, port)
+    print(f"Сервис расчета риска: http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m scoring_service',
+        description='HTTP-сервис расчета риска инсульта'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-concurrency', type=int, default=4,
+                        help='Одновременных расчетов (по умолчанию 4)')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='Запросов в очереди до ответа 503 (по умолчанию 64)')
+    parser.add_argument('--batch-chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                        help=f'Строк NDJSON в одном блоке расчета (по умолчанию {BATCH_CHUNK_SIZE})')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Замерять этапы расчета и отдавать их на GET /metrics')
+    parser.add_argument('--population-stats', metavar='PATH',
+                        help='Копить агрегаты оценок (GET /stats) и сохранять их в JSON '
+                             'при остановке')
+    args = parser.parse_args(argv)
+    stats = None
+    if args.population_stats:
+        stats = (PopulationStats.load(args.population_stats)
+                 if os.path.exists(args.population_stats) else PopulationStats())
+    try:
+        asyncio.run(serve(args.host, args.port, max_concurrency=args.max_concurrency,
+                          max_pending=args.max_pending,
+                          batch_chunk_size=args.batch_chunk_size,
+                          metrics=RiskMetrics() if args.metrics else None,
+                          population_stats=stats))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stats is not None:
+            stats.save(args.population_stats)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""
+Мой Риск: сетка "что если" по модифицируемым факторам риска
+©️ 2025
+
+Для одного профиля строится декартово произведение значений выбранных
+факторов (например, САД x курение), и вся сетка считается одним
+векторизованным проходом score_encoded:
+
+    grid = sensitivity_grid(user_data, {'systolic_bp': [120, 130, 140],
+                                        'smoking': ['курящий', 'никогда не курил']})
+    grid['six_month_risk']          # массив формы (3, 2)
+    grid.cell(systolic_bp=130, smoking='никогда не курил')   # RiskResult
+"""
+
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from batch_scoring import BatchResult, encode_columns, score_encoded
+from scoring_rules import ScoringRules, DEFAULT_RULES
+from stroke_risk_calculator import RiskResult
+
+
+# Факторы, которые пациент может изменить
+MODIFIABLE_FIELDS = (
+    'systolic_bp', 'smoking', 'weight_kg', 'ldl_cholesterol',
+    'activity_level', 'on_blood_pressure_meds',
+)
+
+
+def default_ranges(user_data: Mapping) -> Dict[str, List]:
+    """Диапазоны значений модифицируемых факторов вокруг профиля (как в анкете)"""
+    weight = int(round(user_data.get('weight_kg', 70) or 70))
+    return {
+        'systolic_bp': list(range(100, 201, 10)),
+        'smoking': ['никогда не курил', 'курил в прошлом', 'курящий'],
+        'weight_kg': list(range(max(30, weight - 25), min(200, weight + 25) + 1, 5)),
+        'ldl_cholesterol': [round(value, 1) for value in np.arange(1.5, 7.01, 0.5)],
+        'activity_level': ['подвижный', 'малоподвижный', 'неподвижный'],
+        'on_blood_pressure_meds': [False, True],
+    }
+
+
+class SensitivityGrid:
+    """Результат сетки: оси (поле -> значения) и колонки BatchResult формы осей"""
+
+    def __init__(self, axes: Dict[str, List], result: BatchResult):
+        self.axes = axes
+        self.result = result
+        self.shape: Tuple[int, ...] = tuple(len(values) for values in axes.values())
+
+    def __len__(self) -> int:
+        return len(self.result)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Колонка результата (см. BatchResult), развернутая по осям сетки"""
+        return self.result[name].reshape(self.shape)
+
+    def cell(self, **values) -> RiskResult:
+        """Результат ячейки с заданными значениями всех осей"""
+        index = tuple(self.axes[name].index(values[name]) for name in self.axes)
+        return self.result.row(int(np.ravel_multi_index(index, self.shape)))
+
+
+def sensitivity_grid(user_data: Mapping, ranges: Mapping[str, Sequence],
+                     min_age: int = 15, rules: ScoringRules = DEFAULT_RULES) -> SensitivityGrid:
+    """
+    Расчет профиля user_data для всех сочетаний значений ranges
+
+    ranges - {поле: значения} для полей из MODIFIABLE_FIELDS; остальные поля
+    берутся из профиля. Оси сетки идут в порядке ranges.
+    """
+    unknown = [name for name in ranges if name not in MODIFIABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Поля не относятся к модифицируемым факторам: {', '.join(unknown)}")
+    if user_data.get('age', 0) < min_age:
+        raise ValueError(f"Минимальный возраст для оценки - {min_age} лет")
+
+    axes = {name: list(values) for name, values in ranges.items()}
+    rows = int(np.prod([len(values) for values in axes.values()], dtype=np.int64))
+
+    # Профиль кодируется один раз и размножается; оси кодируются отдельно
+    base = encode_columns({name: [value] for name, value in user_data.items()})
+    columns = {name: np.broadcast_to(values, (rows,)) for name, values in base.items()}
+    codes = [encode_columns({name: values})[name] for name, values in axes.items()]
+    for name, grid in zip(axes, np.meshgrid(*codes, indexing='ij')):
+        columns[name] = grid.ravel()
+
+    result = BatchResult(score_encoded(columns, min_age, rules), rules.framingham_risk.values,
+                         rules)
+    return SensitivityGrid(axes, result)
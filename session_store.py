@@ -0,0 +1,214 @@
+"""
+Мой Риск: хранилище сессий приложения вне памяти процесса Streamlit
+©️ 2025
+
+st.session_state живет в памяти одного процесса: за балансировщиком с
+несколькими репликами ответы теряются при переходе на другую реплику и
+при перезапуске. SessionStore хранит состояние сессии (словарь,
+сериализуемый в JSON) по идентификатору сессии со сроком жизни ttl:
+
+    store = open_session_store('sessions.sqlite3')
+    store.put(session_id, {'user_data': user_data, 'calculated': True})
+    store.get(session_id)
+
+SQLiteSessionStore - локальная база в режиме WAL (чтения не блокируются
+записью, реплики на одном хосте используют общий файл) с пулом
+соединений. Просроченные сессии не возвращаются и удаляются не чаще
+раза в evict_interval секунд при записи. Другой бэкенд подключается
+реализацией методов SessionStore.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class SessionStore(ABC):
+    """Состояние сессий по идентификатору со сроком жизни ttl секунд"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.clock = clock
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Состояние сессии или None, если ее нет или срок истек"""
+
+    @abstractmethod
+    def put(self, session_id: str, state: Dict):
+        """Сохранить состояние и продлить срок жизни сессии"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Удалить сессию"""
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """Удалить просроченные сессии; возвращает их число"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemorySessionStore(SessionStore):
+    """Сессии в памяти процесса (одна реплика, без сохранения при перезапуске)"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.time):
+        super().__init__(ttl, clock)
+        self._sessions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._sessions.get(session_id)
+        if item is None or item[0] <= self.clock():
+            return None
+        # Копия через JSON: как и у SQLite, изменения не попадают в хранилище без put()
+        return json.loads(item[1])
+
+    def put(self, session_id: str, state: Dict):
+        data = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            self._sessions[session_id] = (self.clock() + self.ttl, data)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_expired(self) -> int:
+        now = self.clock()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._sessions.items()
+                       if expires_at <= now]
+            for key in expired:
+                del self._sessions[key]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Сессии в файле SQLite (WAL, пул соединений, вытеснение по сроку жизни)"""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, pool_size: int = 4,
+                 evict_interval: float = 300.0, busy_timeout: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+        super().__init__(ttl, clock)
+        self.path = path
+        self.evict_interval = evict_interval
+        self.busy_timeout = busy_timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        self._closed = False
+        self._last_eviction = clock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            # Режим WAL хранится в самом файле базы
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                ' session_id TEXT PRIMARY KEY,'
+                ' state TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                     isolation_level=None, check_same_thread=False)
+        # В режиме WAL synchronous=NORMAL не теряет целостность базы
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Соединение из пула; лишние соединения закрываются при возврате"""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            if self._closed:
+                connection.close()
+            else:
+                try:
+                    self._pool.put_nowait(connection)
+                except queue.Full:
+                    connection.close()
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return connection.execute(
+                'SELECT COUNT(*) FROM sessions WHERE expires_at > ?', (self.clock(),)
+            ).fetchone()[0]
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT state FROM sessions WHERE session_id = ? AND expires_at > ?',
+                (session_id, self.clock()),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, session_id: str, state: Dict):
+        data = json.dumps(state, ensure_ascii=False)
+        now = self.clock()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT INTO sessions (session_id, state, expires_at) VALUES (?, ?, ?)'
+                ' ON CONFLICT (session_id) DO UPDATE'
+                ' SET state = excluded.state, expires_at = excluded.expires_at',
+                (session_id, data, now + self.ttl),
+            )
+        if now - self._last_eviction >= self.evict_interval:
+            self.evict_expired()
+
+    def delete(self, session_id: str):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def evict_expired(self) -> int:
+        self._last_eviction = now = self.clock()
+        with self._connection() as connection:
+            return connection.execute(
+                'DELETE FROM sessions WHERE expires_at <= ?', (now,)
+            ).rowcount
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def open_session_store(spec: Optional[str] = None, **options) -> SessionStore:
+    """
+    Хранилище по описанию: 'memory' (или пусто) - в памяти процесса,
+    иначе путь к файлу SQLite (допускается префикс 'sqlite:///')
+    """
+    if not spec or spec == 'memory':
+        return MemorySessionStore(**options)
+    if spec.startswith('sqlite:///'):
+        spec = spec[len('sqlite:///'):]
+    return SQLiteSessionStore(spec, **options)
@@ -3,11 +3,87 @@
 ©️ 2025
 """
 
-import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Optional, Union, TYPE_CHECKING
+from dataclasses import dataclass, field, asdict
 from enum import Enum
 
+from scoring_rules import ScoringRules, DEFAULT_RULES
+
+if TYPE_CHECKING:
+    from patient_record import PatientRecord
+
+
+# Категории ИМТ в порядке кодов (используются и векторизованным расчетом)
+BMI_CATEGORIES = (
+    "Недостаточно данных",
+    "Недостаточный вес",
+    "Нормальный вес",
+    "Избыточный вес",
+    "Ожирение",
+)
+
+# Красные флаги в порядке битов маски
+WARNING_FLAGS = (
+    "Частые головокружения или обмороки",
+    "Частая одышка при нагрузке",
+    "Частое сердцебиение",
+    "Предыдущий инсульт или ТИА",
+    "Мерцательная аритмия",
+    "Критически высокое АД (≥180)",
+    "Очень высокий холестерин ЛПНП (≥6.0 ммоль/л)",
+)
+
+# Тексты рекомендаций; порядок совпадает с порядком вывода, коды - индексы
+RECOMMENDATIONS = (
+    "⚕️ Регулярно проходите диспансеризацию по полису ОМС",
+    "📝 Ведите дневник артериального давления",
+    "✅ Ваш риск низкий. Поддерживайте здоровый образ жизни",
+    "🏃‍♂️ Физическая активность: 150 мин умеренной нагрузки в неделю",
+    "🥗 Питание: сократите соль до <5 г/день, добавьте овощи/фрукты",
+    "📅 Измеряйте АД 1 раз в месяц",
+    "⚠️ Ваш риск умеренный. Требуется активная профилактика",
+    "🩺 Измеряйте АД ежедневно (утром и вечером)",
+    "📊 Если АД ≥140/90 ≥3 дня подряд — запишитесь к терапевту",
+    "🚭 Начните отказ от курения — риск снижается через 24 часа",
+    "⚖️ Снижение веса на 5-10% уменьшит риск инсульта на 25%",
+    "🚨 Ваш риск высокий! Требуется срочная врачебная оценка",
+    "🏥 Запишитесь к терапевту в ближайшие дни",
+    "📞 Знайте симптомы инсульта (FAST) и номера 103/112",
+    "🆘 При повторных симптомах — немедленно звоните 103!",
+    "‼️ КРИТИЧЕСКИЙ РИСК! Требуется НЕМЕДЛЕННОЕ обращение к врачу",
+    "🆘 Немедленно обратитесь к терапевту или кардиологу",
+    "📱 Всегда имейте при себе телефон для вызова скорой",
+    "👨‍⚕️ Рассмотрите госпитализацию для комплексного обследования",
+    "❤️ При мерцательной аритмии требуется консультация кардиолога",
+    "🧠 После инсульта/ТИА необходим регулярный контроль невролога",
+    "🩸 Контролируйте уровень глюкозы и посещайте эндокринолога",
+)
+
+# Коды рекомендаций (индексы RECOMMENDATIONS)
+COMMON_RECOMMENDATIONS = (0, 1)
+REC_QUIT_SMOKING = 9
+REC_LOSE_WEIGHT = 10
+REC_CALL_AMBULANCE = 14
+REC_CARDIOLOGIST = 19
+REC_NEUROLOGIST = 20
+REC_ENDOCRINOLOGIST = 21
+
+# Поля user_data, которые читает калькулятор
+USER_DATA_FIELDS = (
+    'age', 'gender', 'height_cm', 'weight_kg',
+    'systolic_bp', 'diastolic_bp', 'ldl_cholesterol',
+    'on_blood_pressure_meds', 'has_diabetes', 'has_atrial_fibrillation',
+    'previous_stroke_tia', 'family_stroke_history', 'vascular_disease',
+    'smoking', 'activity_level', 'palpitations',
+    'shortness_of_breath', 'dizziness_fainting',
+    'limb_weakness', 'speech_disturbance', 'tia_symptom_duration',
+)
+
+
+# Данные пациента: словарь user_data или нормализованная запись PatientRecord
+# (методы калькулятора читают поля только через get)
+UserData = Union[Dict, 'PatientRecord']
+
 
 class RiskLevel(Enum):
     LOW = "Низкий"
@@ -16,6 +92,61 @@ class RiskLevel(Enum):
     CRITICAL = "Критический"
 
 
+# Рекомендации по уровню риска
+LEVEL_RECOMMENDATIONS = {
+    RiskLevel.LOW: (2, 3, 4, 5),
+    RiskLevel.MODERATE: (6, 7, 8),
+    RiskLevel.HIGH: (11, 12, 13),
+    RiskLevel.CRITICAL: (15, 16, 17, 18),
+}
+
+# Биты маски факторов, от которых зависят рекомендации
+FACTOR_SMOKING = 1                  # курит сейчас или курил в прошлом
+FACTOR_OVERWEIGHT = 2               # ИМТ > 27
+FACTOR_STROKE_TIA = 4               # перенесенный инсульт/ТИА
+FACTOR_ATRIAL_FIBRILLATION = 8
+FACTOR_DIABETES = 16
+FACTOR_BITS = 5
+
+SMOKING_FACTOR_VALUES = frozenset({'курящий', 'курил в прошлом'})
+
+
+def _recommendation_codes(risk_level: RiskLevel, factors: int) -> Tuple[int, ...]:
+    """Коды рекомендаций для уровня риска и маски факторов"""
+    # Общие рекомендации для всех и рекомендации по уровню риска
+    codes = list(COMMON_RECOMMENDATIONS)
+    codes.extend(LEVEL_RECOMMENDATIONS[risk_level])
+
+    if risk_level == RiskLevel.MODERATE:
+        if factors & FACTOR_SMOKING:
+            codes.append(REC_QUIT_SMOKING)
+        if factors & FACTOR_OVERWEIGHT:
+            codes.append(REC_LOSE_WEIGHT)
+    elif risk_level == RiskLevel.HIGH:
+        if factors & FACTOR_STROKE_TIA:
+            codes.append(REC_CALL_AMBULANCE)
+
+    # Специфические рекомендации по факторам риска
+    if factors & FACTOR_ATRIAL_FIBRILLATION:
+        codes.append(REC_CARDIOLOGIST)
+    if factors & FACTOR_STROKE_TIA:
+        codes.append(REC_NEUROLOGIST)
+    if factors & FACTOR_DIABETES:
+        codes.append(REC_ENDOCRINOLOGIST)
+    return tuple(codes)
+
+
+# Коды рекомендаций для всех сочетаний (уровень риска, маска факторов)
+RECOMMENDATION_CODES = {
+    level: tuple(_recommendation_codes(level, factors) for factors in range(1 << FACTOR_BITS))
+    for level in RiskLevel
+}
+_RECOMMENDATION_TEXTS = {
+    level: tuple(tuple(RECOMMENDATIONS[code] for code in codes) for codes in table)
+    for level, table in RECOMMENDATION_CODES.items()
+}
+
+
 @dataclass
 class RiskResult:
     six_month_risk: float
@@ -27,161 +158,56 @@ class RiskResult:
     bmi_category: str
     recommendations: List[str]
     warning_flags: List[str]
+    # Промежуточные результаты того же расчета (для детализации без пересчета)
+    risk_factors: List[Tuple[str, int]] = field(default_factory=list)
+    abcd2_two_day_risk: Optional[float] = None
+    abcd2_seven_day_risk: Optional[float] = None
+    chads2_vasc_annual_risk: Optional[float] = None
+    chads2_vasc_criteria: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        """Результат в виде словаря для JSON (уровень риска - его текст)"""
+        data = asdict(self)
+        data['risk_level'] = self.risk_level.value
+        return data
 
 
 class StrokeRiskCalculator:
     """Основной калькулятор риска инсульта на 6 месяцев"""
     
-    def __init__(self):
+    def __init__(self, rules: ScoringRules = DEFAULT_RULES):
         self.min_age = 15
         self.current_year = 2025
+        self.rules = rules
+        self._risk_levels = tuple(RiskLevel[name] for name in rules.risk_levels.values)
+        self.risk_cube = None
         
     def calculate_bmi(self, weight_kg: float, height_cm: float) -> Tuple[float, str]:
         """Расчет индекса массы тела"""
         if height_cm <= 0 or weight_kg <= 0:
-            return 0.0, "Недостаточно данных"
+            return 0.0, BMI_CATEGORIES[0]
         
         height_m = height_cm / 100
         bmi = round(weight_kg / (height_m ** 2), 1)
-        
-        if bmi < 18.5:
-            category = "Недостаточный вес"
-        elif 18.5 <= bmi < 25:
-            category = "Нормальный вес"
-        elif 25 <= bmi < 30:
-            category = "Избыточный вес"
-        else:
-            category = "Ожирение"
-            
+        category = BMI_CATEGORIES[self.rules.bmi_categories.lookup(bmi)]
         return bmi, category
     
-    def calculate_framingham_6month_risk(self, user_data: Dict) -> Tuple[int, float]:
+    def calculate_framingham_6month_risk(self, user_data: UserData) -> Tuple[int, float, List[str]]:
         """
         Модифицированная шкала Framingham для 6-месячного риска
         
         Основана на Framingham Stroke Risk Profile с адаптацией 
         для краткосрочного прогноза (6 месяцев вместо 10 лет)
         """
-        score = 0
-        risk_factors = []
-        
-        # 1. Возраст (усиленный вес для краткосрочного риска)
-        age = user_data.get('age', 0)
-        if age < 35:
-            score += 0
-        elif 35 <= age < 45:
-            score += 3
-            risk_factors.append("Возраст 35-44 года")
-        elif 45 <= age < 55:
-            score += 5
-            risk_factors.append("Возраст 45-54 года")
-        elif 55 <= age < 65:
-            score += 8
-            risk_factors.append("Возраст 55-64 года")
-        elif 65 <= age < 75:
-            score += 10
-            risk_factors.append("Возраст 65-74 года")
-        else:
-            score += 12
-            risk_factors.append("Возраст 75+ лет")
-        
-        # 2. Систолическое артериальное давление
-        systolic_bp = user_data.get('systolic_bp', 0)
-        if systolic_bp < 120:
-            score += 0
-        elif 120 <= systolic_bp < 130:
-            score += 1
-            risk_factors.append("Нормальное АД (120-129)")
-        elif 130 <= systolic_bp < 140:
-            score += 3
-            risk_factors.append("Высокое нормальное АД (130-139)")
-        elif 140 <= systolic_bp < 160:
-            score += 5
-            risk_factors.append("Артериальная гипертензия 1 ст. (140-159)")
-        elif 160 <= systolic_bp < 180:
-            score += 7
-            risk_factors.append("Артериальная гипертензия 2 ст. (160-179)")
-        else:
-            score += 9
-            risk_factors.append("Артериальная гипертензия 3 ст. (180+)")
-        
-        # 3. Прием антигипертензивных препаратов (НОВОЕ ПО ТЗ)
-        if user_data.get('on_blood_pressure_meds', False):
-            score += 2
-            risk_factors.append("Прием антигипертензивных препаратов")
-        
-        # 4. Сахарный диабет
-        if user_data.get('has_diabetes', False):
-            score += 4
-            risk_factors.append("Сахарный диабет")
-        
-        # 5. Курение
-        smoking_status = user_data.get('smoking', 'никогда')
-        if smoking_status == 'курящий':
-            score += 5
-            risk_factors.append("Курение в настоящее время")
-        elif smoking_status == 'курил в прошлом':
-            score += 2
-            risk_factors.append("Курение в прошлом")
-        
-        # 6. Мерцательная аритмия (НОВОЕ ПО ТЗ)
-        if user_data.get('has_atrial_fibrillation', False):
-            score += 6
-            risk_factors.append("Мерцательная аритмия")
-        
-        # 7. Предыдущий инсульт/ТИА (НОВОЕ ПО ТЗ)
-        if user_data.get('previous_stroke_tia', False):
-            score += 8
-            risk_factors.append("Предыдущий инсульт/ТИА")
-        
-        # 8. Учащенное сердцебиение
-        palpitations = user_data.get('palpitations', 'никогда')
-        if palpitations == 'часто':
-            score += 2
-            risk_factors.append("Частое сердцебиение")
-        
-        # 9. Семейный анамнез инсульта
-        if user_data.get('family_stroke_history', False):
-            score += 2
-            risk_factors.append("Семейный анамнез инсульта")
-        
-        # 10. Образ жизни
-        activity_level = user_data.get('activity_level', 'подвижный')
-        if activity_level == 'малоподвижный':
-            score += 1
-            risk_factors.append("Малоподвижный образ жизни")
-        elif activity_level == 'неподвижный':
-            score += 2
-            risk_factors.append("Неподвижный образ жизни")
-        
-        # 11. Холестерин ЛПНП
-        ldl_cholesterol = user_data.get('ldl_cholesterol', 0)
-        if ldl_cholesterol >= 4.9:
-            score += 3
-            risk_factors.append(f"Высокий холестерин ЛПНП ({ldl_cholesterol} ммоль/л)")
-        elif ldl_cholesterol >= 3.0:
-            score += 1
-        
-        # Конвертация баллов в процент риска на 6 месяцев
-        # На основе данных INTERSTROKE и мета-анализа
-        if score <= 5:
-            risk_percent = 0.1  # < 0.1%
-        elif 6 <= score <= 10:
-            risk_percent = 0.5  # 0.5%
-        elif 11 <= score <= 15:
-            risk_percent = 1.2  # 1.2%
-        elif 16 <= score <= 20:
-            risk_percent = 2.8  # 2.8%
-        elif 21 <= score <= 25:
-            risk_percent = 5.5  # 5.5%
-        elif 26 <= score <= 30:
-            risk_percent = 9.0  # 9.0%
-        else:
-            risk_percent = 15.0  # 15.0%
-        
-        return score, round(risk_percent, 1), risk_factors
+        return self.rules.framingham_factors(user_data)
+    
+    def calculate_framingham_breakdown(self, user_data: UserData) -> Tuple[int, float, List[Tuple[str, int]]]:
+        """Шкала Framingham с баллами каждого фактора риска"""
+        # Возраст, АД, диабет, курение, аритмия, анамнез, образ жизни, ЛПНП;
+        # баллы переводятся в риск на 6 месяцев по данным INTERSTROKE
+        return self.rules.framingham_breakdown(user_data)
     
-    def calculate_abcd2_score(self, user_data: Dict) -> Optional[Tuple[int, float, float]]:
+    def calculate_abcd2_score(self, user_data: UserData) -> Optional[Tuple[int, float, float]]:
         """
         Шкала ABCD² для оценки риска инсульта после ТИА
         
@@ -212,29 +238,18 @@ class StrokeRiskCalculator:
         
         # D - Duration (Длительность симптомов)
         symptom_duration = user_data.get('tia_symptom_duration', 0)
-        if symptom_duration >= 60:  # 60+ минут
-            score += 2
-        elif 10 <= symptom_duration < 60:  # 10-59 минут
-            score += 1
+        score += self.rules.abcd2_duration.lookup(symptom_duration)
         
         # D - Diabetes (Диабет)
         if user_data.get('has_diabetes', False):
             score += 1
         
         # Риск инсульта на 2 и 7 дней после ТИА
-        if score <= 3:
-            two_day_risk = 1.0
-            seven_day_risk = 1.2
-        elif score == 4:
-            two_day_risk = 4.1
-            seven_day_risk = 5.9
-        else:  # score 5-7
-            two_day_risk = 8.1
-            seven_day_risk = 11.7
+        two_day_risk, seven_day_risk = self.rules.abcd2_risk.lookup(score)
         
         return score, two_day_risk, seven_day_risk
     
-    def calculate_chads2_vasc_score(self, user_data: Dict) -> Optional[Tuple[int, float]]:
+    def calculate_chads2_vasc_score(self, user_data: UserData) -> Optional[Tuple[int, float]]:
         """
         Шкала CHA₂DS₂-VASc для оценки риска тромбоэмболии
         при фибрилляции предсердий
@@ -257,15 +272,13 @@ class StrokeRiskCalculator:
             score += 1
             criteria.append("Гипертония")
         
-        # Age ≥75 лет
+        # Age 65-74 года / ≥75 лет
         age = user_data.get('age', 0)
-        if age >= 75:
-            score += 2
-            criteria.append("Возраст ≥75 лет")
-        # Age 65-74 года
-        elif 65 <= age < 75:
-            score += 1
-            criteria.append("Возраст 65-74 года")
+        age_bands = self.rules.chads2_vasc_age
+        i = age_bands.index(age)
+        if age_bands.values[i]:
+            score += age_bands.values[i]
+            criteria.append(age_bands.labels[i])
         
         # Diabetes - Диабет
         if user_data.get('has_diabetes', False):
@@ -288,111 +301,75 @@ class StrokeRiskCalculator:
             criteria.append("Женский пол ≥65 лет")
         
         # Годовой риск инсульта (%)
-        risk_map = {
-            0: 0.0,  1: 1.3,  2: 2.2,  3: 3.2,
-            4: 4.0,  5: 6.7,  6: 9.8,  7: 9.6,
-            8: 12.5, 9: 15.2
-        }
-        annual_risk = risk_map.get(min(score, 9), 15.0)
+        risk_map = self.rules.chads2_vasc_risk
+        annual_risk = risk_map[min(score, len(risk_map) - 1)]
         
         return score, annual_risk, criteria
     
     def determine_risk_level(self, risk_percent: float) -> RiskLevel:
         """Определение уровня риска"""
-        if risk_percent < 1.0:
-            return RiskLevel.LOW
-        elif 1.0 <= risk_percent < 3.0:
-            return RiskLevel.MODERATE
-        elif 3.0 <= risk_percent < 10.0:
-            return RiskLevel.HIGH
-        else:
-            return RiskLevel.CRITICAL
+        return self._risk_levels[self.rules.risk_levels.index(risk_percent)]
+    
+    def risk_factor_mask(self, user_data: UserData, bmi: Optional[float] = None) -> int:
+        """Маска факторов (FACTOR_*), от которых зависят рекомендации"""
+        get = user_data.get
+        if bmi is None:
+            bmi = self.calculate_bmi(get('weight_kg', 0), get('height_cm', 0))[0]
+        factors = FACTOR_OVERWEIGHT if bmi > 27 else 0
+        if get('smoking') in SMOKING_FACTOR_VALUES:
+            factors |= FACTOR_SMOKING
+        if get('previous_stroke_tia', False):
+            factors |= FACTOR_STROKE_TIA
+        if get('has_atrial_fibrillation', False):
+            factors |= FACTOR_ATRIAL_FIBRILLATION
+        if get('has_diabetes', False):
+            factors |= FACTOR_DIABETES
+        return factors
     
     def generate_recommendations(self, risk_level: RiskLevel, 
-                               user_data: Dict, 
-                               risk_factors: List[str]) -> List[str]:
-        """Генерация персонализированных рекомендаций"""
-        recommendations = []
-        
-        # Общие рекомендации для всех
-        recommendations.append("⚕️ Регулярно проходите диспансеризацию по полису ОМС")
-        recommendations.append("📝 Ведите дневник артериального давления")
-        
-        if risk_level == RiskLevel.LOW:
-            recommendations.append("✅ Ваш риск низкий. Поддерживайте здоровый образ жизни")
-            recommendations.append("🏃‍♂️ Физическая активность: 150 мин умеренной нагрузки в неделю")
-            recommendations.append("🥗 Питание: сократите соль до <5 г/день, добавьте овощи/фрукты")
-            recommendations.append("📅 Измеряйте АД 1 раз в месяц")
-            
-        elif risk_level == RiskLevel.MODERATE:
-            recommendations.append("⚠️ Ваш риск умеренный. Требуется активная профилактика")
-            recommendations.append("🩺 Измеряйте АД ежедневно (утром и вечером)")
-            recommendations.append("📊 Если АД ≥140/90 ≥3 дня подряд — запишитесь к терапевту")
-            
-            if any("Курение" in factor for factor in risk_factors):
-                recommendations.append("🚭 Начните отказ от курения — риск снижается через 24 часа")
-            
-            bmi = self.calculate_bmi(user_data.get('weight_kg', 0), 
-                                    user_data.get('height_cm', 0))[0]
-            if bmi > 27:
-                recommendations.append("⚖️ Снижение веса на 5-10% уменьшит риск инсульта на 25%")
-                
-        elif risk_level == RiskLevel.HIGH:
-            recommendations.append("🚨 Ваш риск высокий! Требуется срочная врачебная оценка")
-            recommendations.append("🏥 Запишитесь к терапевту в ближайшие дни")
-            recommendations.append("📞 Знайте симптомы инсульта (FAST) и номера 103/112")
-            
-            if user_data.get('previous_stroke_tia', False):
-                recommendations.append("🆘 При повторных симптомах — немедленно звоните 103!")
-            
-        else:  # CRITICAL
-            recommendations.append("‼️ КРИТИЧЕСКИЙ РИСК! Требуется НЕМЕДЛЕННОЕ обращение к врачу")
-            recommendations.append("🆘 Немедленно обратитесь к терапевту или кардиологу")
-            recommendations.append("📱 Всегда имейте при себе телефон для вызова скорой")
-            recommendations.append("👨‍⚕️ Рассмотрите госпитализацию для комплексного обследования")
-        
-        # Специфические рекомендации по факторам риска
-        if "Мерцательная аритмия" in risk_factors:
-            recommendations.append("❤️ При мерцательной аритмии требуется консультация кардиолога")
-        
-        if "Предыдущий инсульт/ТИА" in risk_factors:
-            recommendations.append("🧠 После инсульта/ТИА необходим регулярный контроль невролога")
-        
-        if "Сахарный диабет" in risk_factors:
-            recommendations.append("🩸 Контролируйте уровень глюкозы и посещайте эндокринолога")
-        
-        return recommendations
+                               user_data: UserData, 
+                               risk_factors: Optional[List[str]] = None,
+                               bmi: Optional[float] = None) -> List[str]:
+        """
+        Генерация персонализированных рекомендаций
+
+        Рекомендации берутся из таблицы, рассчитанной при импорте, по уровню
+        риска и маске факторов. risk_factors не используется и оставлен для
+        совместимости; bmi - уже рассчитанный ИМТ (иначе считается заново).
+        """
+        factors = self.risk_factor_mask(user_data, bmi)
+        return list(_RECOMMENDATION_TEXTS[risk_level][factors])
     
-    def check_warning_flags(self, user_data: Dict) -> List[str]:
+    def check_warning_flags(self, user_data: UserData) -> List[str]:
         """Проверка красных флагов для срочного обращения к врачу"""
         flags = []
         
         # Красные флаги из ТЗ
         if user_data.get('dizziness_fainting', 'никогда') == 'часто':
-            flags.append("Частые головокружения или обмороки")
+            flags.append(WARNING_FLAGS[0])
         
         if user_data.get('shortness_of_breath', 'никогда') == 'часто':
-            flags.append("Частая одышка при нагрузке")
+            flags.append(WARNING_FLAGS[1])
         
         if user_data.get('palpitations', 'никогда') == 'часто':
-            flags.append("Частое сердцебиение")
+            flags.append(WARNING_FLAGS[2])
         
         if user_data.get('previous_stroke_tia', False):
-            flags.append("Предыдущий инсульт или ТИА")
+            flags.append(WARNING_FLAGS[3])
         
         if user_data.get('has_atrial_fibrillation', False):
-            flags.append("Мерцательная аритмия")
+            flags.append(WARNING_FLAGS[4])
         
         # Критические значения
         if user_data.get('systolic_bp', 0) >= 180:
-            flags.append("Критически высокое АД (≥180)")
+            flags.append(WARNING_FLAGS[5])
         
         if user_data.get('ldl_cholesterol', 0) >= 6.0:
-            flags.append("Очень высокий холестерин ЛПНП (≥6.0 ммоль/л)")
+            flags.append(WARNING_FLAGS[6])
         
         return flags
     
-    def calculate_overall_risk(self, user_data: Dict) -> RiskResult:
+    def calculate_overall_risk(self, user_data: UserData) -> RiskResult:
         """Основной расчет риска"""
         if not self.validate_user_data(user_data):
             raise ValueError(f"Минимальный возраст для оценки - {self.min_age} лет")
@@ -404,24 +381,22 @@ class StrokeRiskCalculator:
         )
         
         # Расчет 6-месячного риска по модифицированной шкале Framingham
-        framingham_score, six_month_risk, risk_factors = \
-            self.calculate_framingham_6month_risk(user_data)
+        framingham_score, six_month_risk, weighted_factors = \
+            self.calculate_framingham_breakdown(user_data)
         
         # Расчет ABCD² (если был инсульт/ТИА)
-        abcd2_result = self.calculate_abcd2_score(user_data)
-        abcd2_score = abcd2_result[0] if abcd2_result else None
+        abcd2_score, two_day_risk, seven_day_risk = \
+            self.calculate_abcd2_score(user_data) or (None, None, None)
         
         # Расчет CHA₂DS₂-VASc (если есть мерцательная аритмия)
-        chads2_vasc_result = self.calculate_chads2_vasc_score(user_data)
-        chads2_vasc_score = chads2_vasc_result[0] if chads2_vasc_result else None
+        chads2_vasc_score, annual_risk, criteria = \
+            self.calculate_chads2_vasc_score(user_data) or (None, None, [])
         
         # Определение уровня риска
         risk_level = self.determine_risk_level(six_month_risk)
         
         # Генерация рекомендаций
-        recommendations = self.generate_recommendations(
-            risk_level, user_data, risk_factors
-        )
+        recommendations = self.generate_recommendations(risk_level, user_data, bmi=bmi)
         
         # Проверка красных флагов
         warning_flags = self.check_warning_flags(user_data)
@@ -435,10 +410,61 @@ class StrokeRiskCalculator:
             bmi=bmi,
             bmi_category=bmi_category,
             recommendations=recommendations,
-            warning_flags=warning_flags
+            warning_flags=warning_flags,
+            risk_factors=weighted_factors,
+            abcd2_two_day_risk=two_day_risk,
+            abcd2_seven_day_risk=seven_day_risk,
+            chads2_vasc_annual_risk=annual_risk,
+            chads2_vasc_criteria=criteria
         )
     
-    def validate_user_data(self, user_data: Dict) -> bool:
+    def attach_risk_cube(self, path: str):
+        """
+        Режим обслуживания: ответы по предрассчитанному кубу риска
+
+        Куб строится командой `python -m risk_cube` для тех же правил
+        """
+        from risk_cube import RiskCube, rules_fingerprint
+        cube = RiskCube(path)
+        if cube.fingerprint != rules_fingerprint(self.rules):
+            cube.close()
+            raise ValueError(f"Куб {path} построен для другой таблицы правил")
+        self.risk_cube = cube
+    
+    def assess_six_month_risk(self, user_data: UserData) -> Tuple[int, float, RiskLevel]:
+        """
+        Баллы Framingham, риск на 6 месяцев и уровень риска без списка факторов
+        
+        При подключенном кубе ответ - одно чтение из отображенного файла;
+        данные вне области куба считаются обычным образом
+        """
+        if self.risk_cube is not None:
+            cached = self.risk_cube.lookup(user_data)
+            if cached is not None:
+                return cached
+        score, risk_percent, _ = self.calculate_framingham_6month_risk(user_data)
+        return score, risk_percent, self.determine_risk_level(risk_percent)
+    
+    def calculate_batch(self, data) -> 'BatchResult':
+        """
+        Векторизованный расчет риска для когорты пациентов
+
+        Принимает pandas DataFrame, словарь колонок NumPy или список записей
+        (user_data/PatientRecord) и возвращает колоночный BatchResult с теми
+        же значениями, что и calculate_overall_risk
+        """
+        from batch_scoring import calculate_batch, columns_from_records
+        if isinstance(data, (list, tuple)):
+            data = columns_from_records(data)
+        return calculate_batch(data, min_age=self.min_age, rules=self.rules)
+    
+    def validate_user_data(self, user_data: UserData) -> bool:
         """Валидация данных пользователя"""
         age = user_data.get('age', 0)
         return age >= self.min_age
+
+
+if __name__ == "__main__":
+    import sys
+    from cohort_scoring import main
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Мой Риск: генератор синтетических когорт пациентов для нагрузочных тестов
+©️ 2025
+
+Профили генерируются векторизованно (NumPy) с правдоподобными связями
+между полями: АД растет с возрастом и ИМТ, распространенность
+мерцательной аритмии, диабета и перенесенного инсульта/ТИА зависит от
+возраста, симптомы ТИА заполняются только при перенесенном инсульте/ТИА.
+Значения полей совпадают с ответами анкеты в app.py.
+
+Данные генерируются блоками по BLOCK_SIZE строк с генератором, зависящим
+только от (seed, номер блока), поэтому когорта воспроизводима при любом
+размере выходных порций.
+
+Запуск:
+    python -m synthetic_cohort 1000000 cohort.csv --seed 7
+    python -m synthetic_cohort 1000000 cohort.ndjson
+"""
+
+import argparse
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+BLOCK_SIZE = 65_536
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Варианты ответов категориальных полей; коды колонок - индексы в кортежах
+# (порядок совпадает с batch_scoring.CATEGORICAL_FIELDS)
+CHOICES = {
+    'gender': ('мужской', 'женский'),
+    'smoking': ('никогда не курил', 'курил в прошлом', 'курящий'),
+    'activity_level': ('подвижный', 'малоподвижный', 'неподвижный'),
+    'palpitations': ('никогда', 'редко', 'часто'),
+    'shortness_of_breath': ('никогда', 'редко', 'часто'),
+    'dizziness_fainting': ('никогда', 'редко', 'часто'),
+}
+
+# Распространенность по возрасту: узлы линейной интерполяции (возраст, доля)
+AF_BY_AGE = ((15, 50, 60, 70, 80, 100), (0.001, 0.005, 0.02, 0.05, 0.10, 0.15))
+STROKE_TIA_BY_AGE = ((15, 45, 60, 75, 100), (0.002, 0.01, 0.04, 0.08, 0.12))
+VASCULAR_BY_AGE = ((15, 45, 60, 75, 100), (0.005, 0.02, 0.08, 0.15, 0.22))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _categories(rng: np.random.Generator, probabilities: np.ndarray) -> np.ndarray:
+    """Коды категорий по построчным вероятностям (колонки - категории)"""
+    cumulative = np.cumsum(probabilities, axis=1)
+    cumulative /= cumulative[:, -1:]
+    return (rng.random((len(probabilities), 1)) > cumulative).sum(axis=1).astype(np.uint8)
+
+
+def generate_block(rows: int, seed: int = 0, block: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Колонки одного блока когорты
+
+    Числовые поля - float64, логические - bool, категориальные - коды uint8
+    (см. CHOICES). Результат зависит только от (rows, seed, block).
+    """
+    rng = np.random.default_rng([seed, block])
+
+    age = np.clip(np.rint(rng.normal(52, 18, rows)), 15, 100)
+    female = rng.random(rows) < 0.53
+    height = np.clip(np.rint(np.where(female, rng.normal(163, 6.5, rows),
+                                      rng.normal(176, 7, rows))), 100, 250)
+    bmi = np.clip(rng.normal(24 + 0.08 * (age - 40), 4.5), 15, 55)
+    weight = np.clip(np.round(bmi * (height / 100) ** 2, 1), 30, 200)
+
+    systolic = np.clip(np.rint(108 + 0.5 * (age - 20) + 0.7 * (bmi - 25) + 4 * ~female
+                               + rng.normal(0, 14, rows)), 80, 250)
+    diastolic = np.clip(np.rint(20 + 0.45 * systolic + rng.normal(0, 8, rows)), 50, 150)
+    ldl = np.clip(np.round(rng.normal(2.6 + 0.015 * (age - 20), 0.9), 1), 0.0, 10.0)
+
+    on_meds = rng.random(rows) < 0.8 * _sigmoid((systolic - 140) / 10 + (age - 60) / 15)
+    diabetes = rng.random(rows) < _sigmoid(-4.5 + 0.04 * (age - 20) + 0.12 * (bmi - 25))
+    atrial_fibrillation = rng.random(rows) < np.interp(age, *AF_BY_AGE)
+    stroke_tia = rng.random(rows) < np.interp(age, *STROKE_TIA_BY_AGE) * np.where(
+        atrial_fibrillation, 3.0, 1.0)
+    family_history = rng.random(rows) < 0.2
+    vascular = rng.random(rows) < np.interp(age, *VASCULAR_BY_AGE) * np.where(diabetes, 1.8, 1.0)
+
+    # Симптомы ТИА отвечают только перенесшие инсульт/ТИА (как в анкете)
+    limb_weakness = stroke_tia & (rng.random(rows) < 0.55)
+    speech = stroke_tia & (rng.random(rows) < 0.45)
+    duration = np.where(limb_weakness | speech,
+                        rng.choice(np.array([5.0, 30.0, 60.0]), rows, p=[0.35, 0.4, 0.25]),
+                        0.0)
+
+    current_smoker = np.where(female, 0.14, 0.30) * np.where(age > 70, 0.5, 1.0)
+    smoking = _categories(rng, np.column_stack([
+        1 - current_smoker - 0.2, np.full(rows, 0.2), current_smoker
+    ]))
+    sedentary = _sigmoid((age - 60) / 12 + (bmi - 27) / 5)
+    activity = _categories(rng, np.column_stack([
+        1 - sedentary, 0.7 * sedentary, 0.3 * sedentary
+    ]))
+    frequent_palpitations = np.where(atrial_fibrillation, 0.45, 0.05)
+    palpitations = _categories(rng, np.column_stack([
+        0.7 - frequent_palpitations / 2, 0.3 - frequent_palpitations / 2, frequent_palpitations
+    ]))
+    breathless = np.clip(0.05 + (age - 40) / 400 + (bmi - 25) / 100, 0.02, 0.5)
+    shortness = _categories(rng, np.column_stack([1 - 2 * breathless, breathless, breathless]))
+    dizziness = _categories(rng, np.tile([0.8, 0.16, 0.04], (rows, 1)))
+
+    return {
+        'age': age,
+        'gender': female.astype(np.uint8),
+        'height_cm': height,
+        'weight_kg': weight,
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'ldl_cholesterol': ldl,
+        'on_blood_pressure_meds': on_meds,
+        'has_diabetes': diabetes,
+        'has_atrial_fibrillation': atrial_fibrillation,
+        'previous_stroke_tia': stroke_tia,
+        'family_stroke_history': family_history,
+        'vascular_disease': vascular,
+        'smoking': smoking,
+        'activity_level': activity,
+        'palpitations': palpitations,
+        'shortness_of_breath': shortness,
+        'dizziness_fainting': dizziness,
+        'limb_weakness': limb_weakness,
+        'speech_disturbance': speech,
+        'tia_symptom_duration': duration,
+    }
+
+
+def iter_columns(rows: int, seed: int = 0,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Когорта из rows строк порциями по chunk_size в виде колонок (см. generate_block)"""
+    pending: List[Dict[str, np.ndarray]] = []
+    pending_rows = 0
+    for block, start in enumerate(range(0, rows, BLOCK_SIZE)):
+        pending.append(generate_block(min(BLOCK_SIZE, rows - start), seed, block))
+        pending_rows += len(pending[-1]['age'])
+        while pending_rows >= chunk_size or (pending_rows and start + BLOCK_SIZE >= rows):
+            columns = {name: np.concatenate([part[name] for part in pending])
+                       for name in pending[0]}
+            take = min(chunk_size, pending_rows)
+            yield {name: values[:take] for name, values in columns.items()}
+            pending = [{name: values[take:] for name, values in columns.items()}]
+            pending_rows -= take
+
+
+def to_frame(columns: Dict[str, np.ndarray]):
+    """DataFrame с ответами анкеты; категориальные поля - pandas Categorical"""
+    import pandas as pd
+    frame = pd.DataFrame(columns)
+    for name, choices in CHOICES.items():
+        frame[name] = pd.Categorical.from_codes(columns[name], categories=list(choices))
+    for name in ('age', 'height_cm', 'systolic_bp', 'diastolic_bp', 'tia_symptom_duration'):
+        frame[name] = columns[name].astype(np.int64)
+    return frame
+
+
+def iter_frames(rows: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Когорта порциями pandas DataFrame"""
+    for columns in iter_columns(rows, seed, chunk_size):
+        yield to_frame(columns)
+
+
+def generate_profiles(rows: int, seed: int = 0) -> List[Dict]:
+    """Когорта в виде списка user_data для скалярного расчета"""
+    profiles = []
+    for frame in iter_frames(rows, seed):
+        profiles.extend(frame.astype(object).to_dict('records'))
+    return profiles
+
+
+def write_cohort(path: str, rows: int, seed: int = 0,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Запись когорты в NDJSON (.ndjson/.jsonl) или CSV; возвращает число строк"""
+    ndjson = path.endswith(('.ndjson', '.jsonl'))
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for frame in iter_frames(rows, seed, chunk_size):
+            if ndjson:
+                lines = frame.to_json(orient='records', lines=True, force_ascii=False)
+                f.write(lines if lines.endswith('\n') else lines + '\n')
+            else:
+                frame.to_csv(f, index=False, header=written == 0)
+            written += len(frame)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m synthetic_cohort',
+        description='Генерация синтетической когорты пациентов'
+    )
+    parser.add_argument('rows', type=int, help='Число пациентов')
+    parser.add_argument('output', help='Файл .csv или .ndjson')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    written = write_cohort(args.output, args.rows, args.seed, args.chunk_size)
+    print(f"Записано {written} профилей: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+"""
+Общие данные для тестов: случайные профили пациентов
+
+Импортируется как `from helpers import random_profile`: каталог tests
+добавляется в sys.path и pytest, и `python -m unittest discover -s tests`.
+"""
+
+
+def random_profile(rng):
+    """Случайный профиль пациента, покрывающий все ветви шкал"""
+    return {
+        'age': rng.randint(15, 100),
+        'gender': rng.choice(['мужской', 'женский']),
+        'height_cm': rng.choice([0, rng.randint(100, 250)]),
+        'weight_kg': rng.uniform(30, 200),
+        'systolic_bp': rng.randint(80, 250),
+        'diastolic_bp': rng.randint(50, 150),
+        'ldl_cholesterol': round(rng.uniform(0, 10), 1),
+        'on_blood_pressure_meds': rng.random() < 0.3,
+        'has_diabetes': rng.random() < 0.2,
+        'has_atrial_fibrillation': rng.random() < 0.3,
+        'previous_stroke_tia': rng.random() < 0.3,
+        'family_stroke_history': rng.random() < 0.3,
+        'vascular_disease': rng.random() < 0.2,
+        'smoking': rng.choice(['никогда не курил', 'курил в прошлом', 'курящий']),
+        'activity_level': rng.choice(['подвижный', 'малоподвижный', 'неподвижный']),
+        'palpitations': rng.choice(['никогда', 'редко', 'часто']),
+        'shortness_of_breath': rng.choice(['никогда', 'редко', 'часто']),
+        'dizziness_fainting': rng.choice(['никогда', 'редко', 'часто']),
+        'limb_weakness': rng.random() < 0.5,
+        'speech_disturbance': rng.random() < 0.5,
+        'tia_symptom_duration': rng.choice([0, 5, 30, 60]),
+    }
@@ -0,0 +1,99 @@
+"""
+Тесты колоночного архива оценок
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import numpy as np
+
+from assessment_archive import ArchiveReader, ArchiveWriter
+from batch_scoring import RISK_LEVELS
+from stroke_risk_calculator import StrokeRiskCalculator, RiskLevel
+from synthetic_cohort import iter_frames
+
+
+class TestAssessmentArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        self.days = [date(2025, 1, 10), date(2025, 2, 10), date(2025, 4, 10)]
+        self.frames = list(iter_frames(6000, seed=8, chunk_size=2000))
+        with ArchiveWriter(self.root) as writer:
+            for day, frame in zip(self.days, self.frames):
+                writer.write(frame, day)
+        self.reader = ArchiveReader(self.root)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def expected_levels(self, frames, mask_of):
+        calculator = StrokeRiskCalculator()
+        levels = []
+        for frame in frames:
+            for profile in frame[mask_of(frame)].astype(object).to_dict('records'):
+                levels.append(calculator.calculate_overall_risk(profile).risk_level)
+        return levels
+
+    def test_query_matches_scalar_results(self):
+        result = self.reader.query(
+            ['risk_level', 'age'], start=date(2025, 1, 1), end=date(2025, 3, 31),
+            ranges={'age': (55, 64)}, isin={'smoking': ['курящий']}
+        )
+        expected = self.expected_levels(
+            self.frames[:2],
+            lambda f: (f['age'] >= 55) & (f['age'] <= 64) & (f['smoking'] == 'курящий')
+        )
+        self.assertEqual([RISK_LEVELS[code] for code in result['risk_level']], expected)
+        self.assertTrue(((result['age'] >= 55) & (result['age'] <= 64)).all())
+
+    def test_partition_and_part_pruning(self):
+        with mock.patch('assessment_archive.np.load', wraps=np.load) as load:
+            self.reader.query(['age'], start=date(2025, 4, 1))
+        self.assertEqual({os.path.basename(os.path.dirname(os.path.dirname(call.args[0])))
+                          for call in load.call_args_list}, {'date=2025-04-10'})
+        # Колонка запроса и 'valid' для отбора корректных оценок
+        self.assertEqual(len(load.call_args_list), 2)
+
+        with mock.patch('assessment_archive.np.load', wraps=np.load) as load:
+            empty = self.reader.query(['age'], ranges={'age': (150, None)})
+        load.assert_not_called()
+        self.assertEqual(len(empty['age']), 0)
+
+    def test_risk_distribution(self):
+        distribution = self.reader.risk_distribution(isin={'risk_level': [RiskLevel.HIGH, 'CRITICAL']})
+        self.assertEqual(distribution[RiskLevel.LOW], 0)
+        total = sum(self.reader.risk_distribution().values())
+        self.assertEqual(total, 6000)
+
+    def test_invalid_rows_excluded_by_default(self):
+        root = os.path.join(self.root, 'invalid')
+        with ArchiveWriter(root) as writer:
+            writer.write({'age': np.array([12, 40, 70, 14])}, date(2025, 6, 1))
+            writer.write({'age': np.array([10])}, date(2025, 6, 2))
+        reader = ArchiveReader(root)
+        self.assertEqual(list(reader.query(['age'])['age']), [40, 70])
+        self.assertEqual(sum(reader.risk_distribution().values()), 2)
+        self.assertEqual(len(reader.query(['age'], include_invalid=True)['age']), 5)
+        self.assertEqual(list(reader.query(['age'], isin={'valid': [False]})['age']),
+                         [12, 14, 10])
+
+    def test_buffered_single_assessments(self):
+        root = os.path.join(self.root, 'single')
+        with ArchiveWriter(root, flush_rows=2) as writer:
+            writer.add({'age': 60, 'smoking': 'курящий'}, datetime(2025, 5, 1, 9, 30))
+            writer.add({'age': 40}, datetime(2025, 5, 1, 10, 0))
+            writer.add({'age': 70, 'has_atrial_fibrillation': True}, datetime(2025, 5, 2, 8, 0))
+        reader = ArchiveReader(root)
+        self.assertEqual(reader.partitions(), [date(2025, 5, 1), date(2025, 5, 2)])
+        result = reader.query(['age', 'assessed_at'],
+                              ranges={'assessed_at': (datetime(2025, 5, 1, 9, 45), None)})
+        self.assertEqual(result['age'].tolist(), [40.0, 70.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Тесты векторизованного расчета риска
+"""
+
+import random
+import unittest
+
+import numpy as np
+
+from batch_scoring import (
+    assess_records, calculate_batch, decode_warning_flags, decode_recommendations,
+    encode_columns, vectorizable, CATEGORICAL_FIELDS, RISK_LEVELS, NOT_APPLICABLE
+)
+from stroke_risk_calculator import StrokeRiskCalculator, BMI_CATEGORIES
+from helpers import random_profile
+
+
+class TestBatchScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = StrokeRiskCalculator()
+        rng = random.Random(2025)
+        self.profiles = [random_profile(rng) for _ in range(2000)]
+
+    def columns(self):
+        return {
+            name: np.array([profile[name] for profile in self.profiles])
+            for name in self.profiles[0]
+        }
+
+    def test_matches_scalar_path(self):
+        batch = calculate_batch(self.columns())
+        for i, profile in enumerate(self.profiles):
+            result = self.calculator.calculate_overall_risk(profile)
+            self.assertEqual(batch['framingham_score'][i], result.framingham_score)
+            self.assertEqual(batch['six_month_risk'][i], result.six_month_risk)
+            self.assertIs(RISK_LEVELS[batch['risk_level'][i]], result.risk_level)
+            self.assertEqual(batch['bmi'][i], result.bmi)
+            self.assertEqual(BMI_CATEGORIES[batch['bmi_category'][i]], result.bmi_category)
+            self.assertEqual(
+                decode_warning_flags(batch['warning_flags'][i]), result.warning_flags
+            )
+            expected_abcd2 = NOT_APPLICABLE if result.abcd2_score is None else result.abcd2_score
+            self.assertEqual(batch['abcd2_score'][i], expected_abcd2)
+            expected_chads = (NOT_APPLICABLE if result.chads2_vasc_score is None
+                              else result.chads2_vasc_score)
+            self.assertEqual(batch['chads2_vasc_score'][i], expected_chads)
+            self.assertEqual(
+                decode_recommendations(batch['recommendations'][i]), result.recommendations
+            )
+
+    def test_row_renders_scalar_result(self):
+        batch = calculate_batch(self.columns())
+        for i, profile in enumerate(self.profiles[:200]):
+            expected = self.calculator.calculate_overall_risk(profile)
+            row = batch.row(i)
+            for name in ('six_month_risk', 'risk_level', 'framingham_score', 'abcd2_score',
+                         'chads2_vasc_score', 'bmi', 'bmi_category',
+                         'recommendations', 'warning_flags'):
+                self.assertEqual(getattr(row, name), getattr(expected, name), name)
+
+    def test_row_with_user_data_equals_scalar_result(self):
+        batch = calculate_batch(self.columns())
+        for i, profile in enumerate(self.profiles[:300]):
+            self.assertEqual(batch.row(i, profile).to_dict(),
+                             self.calculator.calculate_overall_risk(profile).to_dict())
+
+    def test_assess_records_matches_scalar_path(self):
+        records = self.profiles[:40] + [
+            {'age': None}, {'age': 50, 'systolic_bp': float('nan')},
+            {'age': 50, 'has_diabetes': 'да'}, {'age': '50'}, {'age': 12},
+        ]
+        self.assertTrue(all(vectorizable(record) for record in self.profiles[:40]))
+        self.assertFalse(any(vectorizable(record) for record in records[40:44]))
+        for record, (result, error) in zip(records, assess_records(records, self.calculator)):
+            try:
+                expected = self.calculator.calculate_overall_risk(record)
+            except (TypeError, ValueError) as e:
+                self.assertIsNone(result)
+                self.assertEqual((type(error), str(error)), (type(e), str(e)))
+            else:
+                self.assertIsNone(error)
+                self.assertEqual(result.to_dict(), expected.to_dict())
+
+    def test_compact_storage(self):
+        batch = calculate_batch(self.columns())
+        self.assertEqual(batch.nbytes, len(batch) * 16)
+        frame = batch.to_frame(text=True)
+        self.assertEqual(frame['recommendations'][0], '; '.join(batch.row(0).recommendations))
+
+    def test_missing_columns_use_defaults(self):
+        batch = calculate_batch({'age': np.array([14, 40])})
+        self.assertEqual(list(batch['valid']), [False, True])
+        self.assertEqual(batch['framingham_score'][1], 3)
+        self.assertEqual(batch['bmi'][1], 0.0)
+        self.assertEqual(batch['abcd2_score'][1], NOT_APPLICABLE)
+
+    def test_calculator_entry_point_accepts_dataframe(self):
+        import pandas as pd
+        frame = pd.DataFrame(self.profiles[:10])
+        batch = self.calculator.calculate_batch(frame)
+        self.assertEqual(len(batch['framingham_score']), 10)
+
+    def test_categorical_columns_encoded_by_codes(self):
+        import pandas as pd
+        frame = pd.DataFrame(self.profiles)
+        # Порядок категорий не совпадает с правилами, есть лишняя категория и пропуск
+        smoking = list(frame['smoking'])
+        smoking[:3] = ['курящий', 'бросил', None]
+        frame['smoking'] = pd.Categorical(
+            smoking, categories=['курящий', 'бросил'] + sorted(set(smoking[3:]) - {'курящий'}))
+        for name in CATEGORICAL_FIELDS:
+            if name != 'smoking':
+                frame[name] = frame[name].astype('category')
+
+        encoded = encode_columns(frame)
+        expected = encode_columns({name: np.array(frame[name].astype(object))
+                                   for name in frame})
+        for name in CATEGORICAL_FIELDS:
+            np.testing.assert_array_equal(encoded[name], expected[name], err_msg=name)
+            self.assertEqual(encoded[name].dtype, np.uint8)
+        self.assertEqual(list(encoded['smoking'][:3]), [2, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,36 @@
 Тесты для калькулятора риска инсульта
 """
 
+import random
 import unittest
-from stroke_risk_calculator import StrokeRiskCalculator
+from unittest import mock
+
+from stroke_risk_calculator import (
+    StrokeRiskCalculator, RiskLevel, RECOMMENDATIONS, RECOMMENDATION_CODES, FACTOR_BITS
+)
+from helpers import random_profile
+
+
+def reference_recommendations(calculator, risk_level, user_data, risk_factors):
+    """Прежний алгоритм рекомендаций: поиск подстрок в факторах риска"""
+    codes = [0, 1] + list({
+        RiskLevel.LOW: (2, 3, 4, 5), RiskLevel.MODERATE: (6, 7, 8),
+        RiskLevel.HIGH: (11, 12, 13), RiskLevel.CRITICAL: (15, 16, 17, 18),
+    }[risk_level])
+    if risk_level == RiskLevel.MODERATE:
+        if any("Курение" in factor for factor in risk_factors):
+            codes.append(9)
+        bmi = calculator.calculate_bmi(user_data.get('weight_kg', 0),
+                                       user_data.get('height_cm', 0))[0]
+        if bmi > 27:
+            codes.append(10)
+    elif risk_level == RiskLevel.HIGH and user_data.get('previous_stroke_tia', False):
+        codes.append(14)
+    for factor, code in (("Мерцательная аритмия", 19), ("Предыдущий инсульт/ТИА", 20),
+                         ("Сахарный диабет", 21)):
+        if factor in risk_factors:
+            codes.append(code)
+    return [RECOMMENDATIONS[code] for code in codes]
 
 
 class TestStrokeRiskCalculator(unittest.TestCase):
@@ -18,4 +46,35 @@ class TestStrokeRiskCalculator(unittest.TestCase):
         self.assertEqual(category, "Нормальный вес")
         
         # Ожирение
-        bmi, category = self.calculator.calculat
+        bmi, category = self.calculator.calculate_bmi(100, 170)
+        self.assertAlmostEqual(bmi, 34.6, delta=0.1)
+        self.assertEqual(category, "Ожирение")
+    
+    def test_recommendation_table_matches_factor_scan(self):
+        self.assertEqual({len(table) for table in RECOMMENDATION_CODES.values()},
+                         {1 << FACTOR_BITS})
+        rng = random.Random(23)
+        for _ in range(500):
+            profile = random_profile(rng)
+            _, _, factors = self.calculator.calculate_framingham_6month_risk(profile)
+            for level in RiskLevel:
+                self.assertEqual(
+                    self.calculator.generate_recommendations(level, profile, factors),
+                    reference_recommendations(self.calculator, level, profile, factors)
+                )
+    
+    def test_recommendations_reuse_bmi(self):
+        profile = {'age': 50, 'weight_kg': 95, 'height_cm': 170, 'smoking': 'курящий'}
+        with mock.patch.object(StrokeRiskCalculator, 'calculate_bmi') as calculate_bmi:
+            recommendations = self.calculator.generate_recommendations(
+                RiskLevel.MODERATE, profile, bmi=32.9)
+        calculate_bmi.assert_not_called()
+        self.assertIn(RECOMMENDATIONS[9], recommendations)
+        self.assertIn(RECOMMENDATIONS[10], recommendations)
+        # Результат - новый список, таблица не меняется
+        recommendations.clear()
+        self.assertTrue(self.calculator.generate_recommendations(RiskLevel.LOW, profile))
+
+
+if __name__ == '__main__':
+    unittest.main()
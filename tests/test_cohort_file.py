@@ -0,0 +1,64 @@
+"""
+Тесты компактного файла когорты
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from batch_scoring import RESULT_DTYPES, calculate_batch
+from cohort_file import COHORT_DTYPE, convert, encode_records, open_cohort, score_cohort
+from cohort_file import write_cohort_file
+from synthetic_cohort import iter_frames
+
+
+class TestCohortFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.frames = list(iter_frames(5000, seed=4, chunk_size=2000))
+        self.expected = calculate_batch(pd.concat(self.frames, ignore_index=True))
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def assert_same_result(self, result):
+        self.assertEqual(len(result), len(self.expected))
+        for name in RESULT_DTYPES:
+            np.testing.assert_array_equal(result[name], self.expected[name], err_msg=name)
+
+    def test_memmap_scoring_matches_calculate_batch(self):
+        path = os.path.join(self.temp.name, 'cohort.npy')
+        self.assertEqual(write_cohort_file(path, self.frames), 5000)
+        records = open_cohort(path)
+        self.assertIsInstance(records, np.memmap)
+        self.assertEqual(COHORT_DTYPE.itemsize, 43)
+        self.assert_same_result(score_cohort(path, chunk_size=1500))
+        self.assertEqual(os.listdir(self.temp.name), ['cohort.npy'])
+
+    def test_convert_csv(self):
+        csv_path = os.path.join(self.temp.name, 'cohort.csv')
+        pd.concat(self.frames).to_csv(csv_path, index=False)
+        path = os.path.join(self.temp.name, 'cohort.npy')
+        self.assertEqual(convert(csv_path, path, chunk_size=1200), 5000)
+        self.assert_same_result(score_cohort(path))
+
+    def test_missing_values_use_defaults(self):
+        data = {'age': [50, 70], 'diastolic_bp': [None, 95], 'has_diabetes': [None, True]}
+        records = encode_records(data)
+        self.assertEqual(records['diastolic_bp'].tolist(), [90, 95])
+        self.assertEqual(records['flags'].tolist(), [0, 2])
+        for name in RESULT_DTYPES:
+            np.testing.assert_array_equal(score_cohort(records)[name],
+                                          calculate_batch(data)[name])
+
+    def test_inexact_float32_value_rejected(self):
+        with self.assertRaises(ValueError):
+            encode_records({'age': [45.3]})
+
+
+if __name__ == '__main__':
+    unittest.main()
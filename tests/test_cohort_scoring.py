@@ -0,0 +1,111 @@
+"""
+Тесты потокового расчета когорт
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cohort_scoring import score_file, Checkpoint
+from population_stats import AggregatingCalculator, PopulationStats
+
+
+class TestCohortScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmp.name, 'in.csv')
+        pd.DataFrame({
+            'patient_id': range(25),
+            'age': [20 + 3 * i for i in range(25)],
+            'systolic_bp': [110 + 5 * i for i in range(25)],
+            'smoking': ['курящий', 'никогда не курил', 'курил в прошлом', 'курящий', 'нет'] * 5,
+            'has_atrial_fibrillation': [i % 3 == 0 for i in range(25)],
+        }).to_csv(self.input, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scores_every_row_in_order(self):
+        output = os.path.join(self.tmp.name, 'out.csv')
+        total = score_file(self.input, output, chunk_size=10,
+                           id_column='patient_id', log=io.StringIO())
+        result = pd.read_csv(output)
+        self.assertEqual(total, 25)
+        self.assertEqual(list(result['patient_id']), list(range(25)))
+        self.assertEqual(result['risk_level'][0], 'Умеренный')
+
+    def test_resume_after_interrupted_chunk(self):
+        full = os.path.join(self.tmp.name, 'full.csv')
+        score_file(self.input, full, chunk_size=10, id_column='patient_id', log=io.StringIO())
+
+        # Имитируем сбой: записан один блок и часть второго
+        output = os.path.join(self.tmp.name, 'out.csv')
+        score_file(self.input, output, chunk_size=10, id_column='patient_id', log=io.StringIO())
+        checkpoint = Checkpoint(output)
+        self.assertFalse(os.path.exists(checkpoint.path))
+        first_chunk_bytes = len(pd.read_csv(full).head(10).to_csv(index=False).encode('utf-8'))
+        checkpoint.save({'input': self.input_file(), 'chunk_size': 10, 'chunks_done': 1,
+                         'rows_done': 10, 'bytes': first_chunk_bytes})
+        with open(output, 'a', encoding='utf-8') as f:
+            f.write('999,оборванная строка')
+
+        total = score_file(self.input, output, chunk_size=10, id_column='patient_id',
+                           resume=True, log=io.StringIO())
+        self.assertEqual(total, 25)
+        with open(full, encoding='utf-8') as f, open(output, encoding='utf-8') as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertFalse(os.path.exists(checkpoint.path))
+
+    def test_population_stats_cover_every_row(self):
+        output = os.path.join(self.tmp.name, 'out.csv')
+        stats = PopulationStats()
+        score_file(self.input, output, chunk_size=10, log=io.StringIO(), population_stats=stats)
+        expected = AggregatingCalculator()
+        expected.calculate_batch(pd.read_csv(self.input))
+        self.assertEqual(stats.total, 25)
+        self.assertEqual(stats.risk_levels, expected.stats.risk_levels)
+        self.assertEqual(stats.framingham, expected.stats.framingham)
+        self.assertAlmostEqual(stats.six_month_risk.mean, expected.stats.six_month_risk.mean)
+        for band, mean in expected.stats.mean_sbp_by_age().items():
+            self.assertAlmostEqual(stats.mean_sbp_by_age()[band], mean, msg=band)
+
+    def interrupt(self, output: str, **state):
+        """Контрольная точка прерванного после первого блока запуска"""
+        score_file(self.input, output, chunk_size=10, log=io.StringIO())
+        state = dict({'input': self.input_file(), 'chunk_size': 10, 'chunks_done': 1,
+                      'rows_done': 10, 'bytes': 0}, **state)
+        Checkpoint(output).save(state)
+
+    def input_file(self) -> dict:
+        return {'path': os.path.abspath(self.input), 'size': os.path.getsize(self.input)}
+
+    def test_resume_rejects_other_chunk_size(self):
+        output = os.path.join(self.tmp.name, 'out.csv')
+        self.interrupt(output)
+        with self.assertRaises(ValueError):
+            score_file(self.input, output, chunk_size=7, resume=True, log=io.StringIO())
+
+    def test_resume_rejects_other_input(self):
+        output = os.path.join(self.tmp.name, 'out.csv')
+        self.interrupt(output)
+        # Тот же путь, но файл перезаписан другой когортой
+        with open(self.input, 'a', encoding='utf-8') as f:
+            f.write('25,95,240,курящий,True\n')
+        with self.assertRaises(ValueError):
+            score_file(self.input, output, chunk_size=10, resume=True, log=io.StringIO())
+
+        other = os.path.join(self.tmp.name, 'other.csv')
+        pd.read_csv(self.input).to_csv(other, index=False)
+        self.interrupt(output, input={'path': other, 'size': os.path.getsize(other)})
+        with self.assertRaises(ValueError):
+            score_file(self.input, output, chunk_size=10, resume=True, log=io.StringIO())
+        # Без --resume расчет начинается заново
+        self.assertEqual(score_file(self.input, output, chunk_size=10, log=io.StringIO()), 26)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Тесты зависимостей ядра расчета: импорт только со стандартной библиотекой
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(statement: str) -> set:
+    """Модули, загруженные в чистом процессе после выполнения statement"""
+    completed = subprocess.run(
+        [sys.executable, '-c', f'{statement}\nimport sys\nprint("\\n".join(sys.modules))'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return set(completed.stdout.split())
+
+
+class TestCoreImports(unittest.TestCase):
+    def test_core_does_not_load_accelerators(self):
+        modules = loaded_modules('import stroke_risk_calculator, scoring_rules, result_cache')
+        for heavy in ('numpy', 'pandas', 'pyarrow'):
+            self.assertNotIn(heavy, modules)
+
+    def test_scalar_risk_without_accelerators(self):
+        modules = loaded_modules(
+            'from stroke_risk_calculator import StrokeRiskCalculator\n'
+            'StrokeRiskCalculator().calculate_overall_risk({"age": 60, "systolic_bp": 150})'
+        )
+        self.assertNotIn('numpy', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
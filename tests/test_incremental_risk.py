@@ -0,0 +1,64 @@
+"""
+Тесты инкрементального пересчета риска
+"""
+
+import random
+import unittest
+from unittest import mock
+
+from incremental_risk import IncrementalEvaluator
+from stroke_risk_calculator import StrokeRiskCalculator
+from helpers import random_profile
+
+
+class TestIncrementalEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluator = IncrementalEvaluator()
+        self.calculator = self.evaluator.calculator
+
+    def test_matches_full_recalculation_for_every_field(self):
+        rng = random.Random(18)
+        for _ in range(60):
+            profile = random_profile(rng)
+            other = random_profile(rng)
+            result = self.calculator.calculate_overall_risk(profile)
+            for name in profile:
+                if name == 'age':
+                    other[name] = max(other[name], 15)
+                new_data, updated = self.evaluator.update(profile, result, {name: other[name]})
+                self.assertEqual(updated, self.calculator.calculate_overall_risk(new_data),
+                                 name)
+
+    def test_only_affected_components_recomputed(self):
+        profile = random_profile(random.Random(3))
+        result = self.calculator.calculate_overall_risk(profile)
+        calculator = StrokeRiskCalculator
+        with mock.patch.object(calculator, 'calculate_framingham_breakdown') as framingham, \
+                mock.patch.object(calculator, 'calculate_abcd2_score') as abcd2, \
+                mock.patch.object(calculator, 'check_warning_flags') as flags:
+            self.evaluator.update(profile, result, {'weight_kg': profile['weight_kg'] + 10})
+        framingham.assert_not_called()
+        abcd2.assert_not_called()
+        flags.assert_not_called()
+
+        self.assertEqual(self.evaluator.affected(['limb_weakness']), {'abcd2'})
+        self.assertEqual(self.evaluator.affected(['smoking']),
+                         {'framingham', 'recommendations'})
+        self.assertEqual(self.evaluator.affected(['session_note']), set())
+
+    def test_unchanged_values_skip_recalculation(self):
+        profile = {'age': 50, 'weight_kg': 80, 'height_cm': 175}
+        result = self.calculator.calculate_overall_risk(profile)
+        _, updated = self.evaluator.update(profile, result, {'weight_kg': 80})
+        self.assertIs(updated.recommendations, result.recommendations)
+
+    def test_age_below_minimum_rejected(self):
+        profile = {'age': 50}
+        result = self.calculator.calculate_overall_risk(profile)
+        with self.assertRaises(ValueError):
+            self.evaluator.update(profile, result, {'age': 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
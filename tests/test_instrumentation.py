@@ -0,0 +1,126 @@
+"""
+Тесты метрик этапов расчета риска
+"""
+
+import os
+import tempfile
+import threading
+import timeit
+import unittest
+import urllib.request
+
+from instrumentation import InstrumentedCalculator, RiskMetrics, STAGES, start_metrics_server
+from stroke_risk_calculator import StrokeRiskCalculator
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = RiskMetrics()
+        self.calculator = InstrumentedCalculator(self.metrics)
+        self.user_data = {
+            'age': 72, 'systolic_bp': 165, 'has_atrial_fibrillation': True,
+            'previous_stroke_tia': True, 'limb_weakness': True, 'tia_symptom_duration': 30,
+            'weight_kg': 80, 'height_cm': 170,
+        }
+
+    def test_results_unchanged(self):
+        self.assertEqual(self.calculator.calculate_overall_risk(self.user_data),
+                         StrokeRiskCalculator().calculate_overall_risk(self.user_data))
+
+    def test_every_stage_recorded(self):
+        result = self.calculator.calculate_overall_risk(self.user_data)
+        for stage in STAGES:
+            self.assertGreaterEqual(self.metrics.stages[stage].count, 1, stage)
+        self.assertEqual(self.metrics.stages['overall'].count, 1)
+        self.assertEqual(self.metrics.risk_levels[result.risk_level], 1)
+
+    def test_validation_failures_counted(self):
+        with self.assertRaises(ValueError):
+            self.calculator.calculate_overall_risk({'age': 12})
+        self.assertEqual(self.metrics.validation_failures, 1)
+        self.assertEqual(sum(self.metrics.risk_levels.values()), 0)
+        self.assertEqual(self.metrics.stages['overall'].count, 1)
+
+    def test_stages_are_sampled(self):
+        calculator = InstrumentedCalculator(self.metrics, stage_sample_every=4)
+        for _ in range(10):
+            calculator.calculate_overall_risk(self.user_data)
+        self.assertEqual(self.metrics.stages['overall'].count, 3)
+        self.metrics.flush()
+        self.assertEqual(self.metrics.stages['overall'].count, 10)
+        self.assertEqual(self.metrics.stages['framingham'].count, 3)
+        self.assertEqual(sum(self.metrics.risk_levels.values()), 10)
+        with self.assertRaises(ValueError):
+            calculator.calculate_overall_risk({'age': 12})
+        self.assertEqual(self.metrics.validation_failures, 1)
+
+        InstrumentedCalculator(self.metrics, stage_sample_every=0).calculate_overall_risk(
+            self.user_data)
+        self.assertEqual(self.metrics.stages['framingham'].count, 3)
+
+    def test_overall_buffers_flush_across_threads(self):
+        metrics = RiskMetrics(flush_every=8)
+        calculator = InstrumentedCalculator(metrics, stage_sample_every=0)
+
+        def work():
+            for _ in range(20):
+                calculator.calculate_overall_risk(self.user_data)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # По 16 замеров каждого потока перенесены пачками, остаток - при выгрузке
+        self.assertEqual(metrics.stages['overall'].count, 64)
+        self.assertIn('stroke_risk_stage_duration_seconds_count{stage="overall"} 80', metrics.to_prometheus())
+
+    def test_unsampled_overhead_is_bounded(self):
+        calculators = {
+            'plain': StrokeRiskCalculator(),
+            'instrumented': InstrumentedCalculator(RiskMetrics(), stage_sample_every=0),
+        }
+        best = dict.fromkeys(calculators, float('inf'))
+        # Лучшее из чередующихся повторов, чтобы шум машины влиял на обе стороны
+        for _ in range(7):
+            for name, calculator in calculators.items():
+                seconds = timeit.timeit(
+                    lambda: calculator.calculate_overall_risk(self.user_data), number=300)
+                best[name] = min(best[name], seconds)
+        # Без замера этапов - два вызова perf_counter и запись в буфер
+        self.assertLess(best['instrumented'], best['plain'] * 1.8)
+
+    def test_prometheus_exposition(self):
+        self.calculator.stage_sample_every = 1
+        for _ in range(3):
+            self.calculator.calculate_overall_risk(self.user_data)
+        text = self.metrics.to_prometheus()
+        self.assertIn('# TYPE stroke_risk_stage_duration_seconds histogram', text)
+        self.assertIn('stroke_risk_stage_duration_seconds_bucket{stage="overall",le="+Inf"} 3',
+                      text)
+        self.assertIn('stroke_risk_stage_duration_seconds_count{stage="framingham"} 3', text)
+        self.assertIn('stroke_risk_validation_failures_total 0', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'riskometr.prom')
+            self.metrics.write_prometheus(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), text)
+            self.assertEqual(os.listdir(directory), ['riskometr.prom'])
+
+    def test_metrics_endpoint(self):
+        self.calculator.calculate_overall_risk(self.user_data)
+        server = start_metrics_server(self.metrics, port=0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+                body = response.read().decode('utf-8')
+            self.assertIn('stroke_risk_assessments_total{risk_level=', body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Тесты адаптивного микропакетного расчета
+"""
+
+import asyncio
+import random
+import unittest
+
+from micro_batcher import MicroBatcher
+from population_stats import PopulationStats
+from stroke_risk_calculator import StrokeRiskCalculator
+from helpers import random_profile
+
+
+SCORED_FIELDS = ('six_month_risk', 'risk_level', 'framingham_score', 'abcd2_score',
+                 'chads2_vasc_score', 'bmi', 'bmi_category', 'recommendations',
+                 'warning_flags')
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.calculator = StrokeRiskCalculator()
+        self.batcher = MicroBatcher(self.calculator, max_batch=64, max_wait=0.005)
+        rng = random.Random(11)
+        self.profiles = [dict(random_profile(rng), age=rng.randint(15, 100)) for _ in range(200)]
+
+    async def asyncTearDown(self):
+        await self.batcher.close()
+
+    async def test_single_request_is_scored_immediately(self):
+        result = await self.batcher.assess(self.profiles[0])
+        self.assertEqual(result, self.calculator.calculate_overall_risk(self.profiles[0]))
+        self.assertEqual(self.batcher.window, 0.0)
+        self.assertEqual(self.batcher.stats().vectorized, 0)
+
+    async def test_concurrent_requests_are_coalesced(self):
+        results = await asyncio.gather(*(self.batcher.assess(p) for p in self.profiles))
+        for profile, result in zip(self.profiles, results):
+            expected = self.calculator.calculate_overall_risk(profile)
+            for name in SCORED_FIELDS:
+                self.assertEqual(getattr(result, name), getattr(expected, name), name)
+        stats = self.batcher.stats()
+        self.assertEqual(stats.requests, len(self.profiles))
+        self.assertGreater(stats.vectorized, 0)
+        self.assertLessEqual(stats.batches, len(self.profiles) // 64 + 1)
+
+    async def test_same_result_below_and_above_vector_threshold(self):
+        profiles = self.profiles[:40] + [{'age': 70, 'smoking': 'курящий', 'systolic_bp': 150}]
+        odd = [{'age': None}, {'age': 50, 'systolic_bp': None}, {'age': 'сорок'}]
+        for size in (self.batcher.min_vector_batch - 1 - len(odd), 40):
+            group = profiles[-size:] + odd
+            vectorized = self.batcher.stats().vectorized
+            outcomes = await asyncio.gather(*(self.batcher.assess(p) for p in group),
+                                            return_exceptions=True)
+            for profile, outcome in zip(group, outcomes):
+                try:
+                    expected = self.calculator.calculate_overall_risk(profile)
+                except (TypeError, ValueError) as e:
+                    self.assertEqual((type(outcome), str(outcome)), (type(e), str(e)))
+                else:
+                    self.assertEqual(outcome.to_dict(), expected.to_dict())
+            self.assertEqual(self.batcher.stats().vectorized > vectorized, size == 40)
+
+    async def test_population_stats_count_every_success(self):
+        stats = PopulationStats()
+        batcher = MicroBatcher(self.calculator, max_batch=64, max_wait=0.005,
+                               population_stats=stats)
+        profiles = self.profiles + [{'age': 10}]
+        try:
+            await asyncio.gather(*(batcher.assess(p) for p in profiles), return_exceptions=True)
+            await batcher.assess(self.profiles[0])
+            self.assertGreater(batcher.stats().vectorized, 0)
+        finally:
+            await batcher.close()
+        self.assertEqual(stats.total, len(self.profiles) + 1)
+
+    async def test_unexpected_error_fails_batch_and_keeps_running(self):
+        def broken(records):
+            raise RuntimeError("сбой расчета")
+
+        self.batcher._assess_many = broken
+        outcomes = await asyncio.gather(*(self.batcher.assess(p) for p in self.profiles[:20]),
+                                        return_exceptions=True)
+        self.assertTrue(all(isinstance(outcome, RuntimeError) for outcome in outcomes))
+        del self.batcher._assess_many
+        result = await self.batcher.assess(self.profiles[0])
+        self.assertEqual(result, self.calculator.calculate_overall_risk(self.profiles[0]))
+
+    async def test_invalid_request_fails_alone(self):
+        profiles = self.profiles[:20] + [{'age': 10}]
+        outcomes = await asyncio.gather(*(self.batcher.assess(p) for p in profiles),
+                                        return_exceptions=True)
+        self.assertIsInstance(outcomes[-1], ValueError)
+        self.assertFalse(any(isinstance(outcome, Exception) for outcome in outcomes[:-1]))
+
+    async def test_window_adapts_to_load(self):
+        await asyncio.gather(*(self.batcher.assess(p) for p in self.profiles))
+        self.assertGreater(self.batcher.window, 0.0)
+        for profile in self.profiles[:10]:
+            await self.batcher.assess(profile)
+        self.assertEqual(self.batcher.window, 0.0)
+
+    async def test_close_drains_queue(self):
+        pending = [asyncio.ensure_future(self.batcher.assess(p)) for p in self.profiles[:30]]
+        await asyncio.sleep(0)
+        await self.batcher.close()
+        self.assertTrue(all(task.done() and task.exception() is None for task in pending))
+        with self.assertRaises(RuntimeError):
+            await self.batcher.assess(self.profiles[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
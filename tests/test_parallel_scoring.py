@@ -0,0 +1,58 @@
+"""
+Тесты параллельного расчета когорт
+"""
+
+import copy
+import random
+import unittest
+
+import numpy as np
+
+from batch_scoring import calculate_batch, CATEGORICAL_FIELDS
+from parallel_scoring import ParallelScorer
+from population_stats import AggregatingCalculator, PopulationStats
+from scoring_rules import RULE_TABLE, ScoringRules
+from helpers import random_profile
+
+
+class TestParallelScoring(unittest.TestCase):
+
+    def test_matches_batch_path_in_input_order(self):
+        rng = random.Random(7)
+        profiles = [random_profile(rng) for _ in range(1000)]
+        columns = {name: np.array([p[name] for p in profiles]) for name in profiles[0]}
+
+        expected = calculate_batch(columns)
+        stats = PopulationStats()
+        with ParallelScorer(workers=2, chunk_size=128, population_stats=stats) as scorer:
+            result = scorer.score(columns)
+        aggregating = AggregatingCalculator()
+        aggregating.calculate_batch(columns)
+        self.assertEqual(stats.to_dict(), aggregating.stats.to_dict())
+
+        actual = result.columns()
+        for name, values in expected.columns().items():
+            np.testing.assert_array_equal(actual[name], values, err_msg=name)
+            self.assertEqual(actual[name].dtype, values.dtype)
+
+    def test_frame_encoded_in_workers_with_pool_rules(self):
+        import pandas as pd
+        rng = random.Random(8)
+        frame = pd.DataFrame([random_profile(rng) for _ in range(1000)])
+        for name in CATEGORICAL_FIELDS:
+            frame[name] = frame[name].astype('category')
+        frame.loc[::7, 'systolic_bp'] = np.nan
+        frame.loc[::11, 'ldl_cholesterol'] = None
+        table = copy.deepcopy(RULE_TABLE)
+        table['framingham'][1]['edges'] = [115, 130, 140, 160, 180]
+        rules = ScoringRules(table)
+
+        expected = calculate_batch(frame, rules=rules)
+        with ParallelScorer(workers=2, chunk_size=128, rules=rules) as scorer:
+            actual = scorer.score(frame).columns()
+        for name, values in expected.columns().items():
+            np.testing.assert_array_equal(actual[name], values, err_msg=name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Тесты истории оценок пациента
+"""
+
+import random
+import tempfile
+import unittest
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from patient_history import PatientHistory
+from response_store import ResponseStore
+from stroke_risk_calculator import StrokeRiskCalculator, WARNING_FLAGS
+
+
+class TestPatientHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = StrokeRiskCalculator()
+        self.start = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+    def add(self, history, patient_id, days, **user_data):
+        user_data = {'age': 62, **user_data}
+        result = self.calculator.calculate_overall_risk(user_data)
+        return history.add(patient_id, result, user_data, self.start + timedelta(days=days))
+
+    def test_trend_updates_on_insert(self):
+        history = PatientHistory()
+        first = self.add(history, 'p1', 0, systolic_bp=125)
+        self.assertIsNone(first.risk_delta)
+        self.assertIsNone(first.sbp_slope)
+
+        self.add(history, 'p1', 30, systolic_bp=140)
+        trend = self.add(history, 'p1', 60, systolic_bp=185, has_atrial_fibrillation=True)
+        expected = self.calculator.calculate_overall_risk(
+            {'age': 62, 'systolic_bp': 185, 'has_atrial_fibrillation': True})
+        previous = self.calculator.calculate_overall_risk({'age': 62, 'systolic_bp': 140})
+        self.assertEqual(trend.assessments, 3)
+        self.assertEqual(trend.risk_delta,
+                         round(expected.six_month_risk - previous.six_month_risk, 1))
+        self.assertEqual(set(trend.new_warning_flags), {WARNING_FLAGS[4], WARNING_FLAGS[5]})
+
+        years = np.array([0, 30, 60]) / 365.25
+        slope = np.polyfit(years, [125, 140, 185], 1)[0]
+        self.assertAlmostEqual(trend.sbp_slope, slope, places=6)
+        self.assertIsNone(history.trend('unknown'))
+
+    def test_ordered_queries_with_out_of_order_inserts(self):
+        history = PatientHistory()
+        days = list(range(0, 100, 5))
+        random.Random(24).shuffle(days)
+        for day in days:
+            self.add(history, 'p1', day, systolic_bp=100 + day)
+            self.add(history, 'p2', day, systolic_bp=120)
+
+        last = history.last('p1', 3)
+        self.assertEqual([e.systolic_bp for e in last], [185, 190, 195])
+        window = history.between('p1', self.start + timedelta(days=10),
+                                 self.start + timedelta(days=20))
+        self.assertEqual([e.systolic_bp for e in window], [110, 115, 120])
+        trajectory = history.risk_trajectory('p1', since=self.start + timedelta(days=90))
+        self.assertEqual([t for t, _ in trajectory],
+                         [self.start + timedelta(days=d) for d in (90, 95)])
+        self.assertEqual(history.trend('p2').sbp_slope, 0.0)
+        self.assertEqual(len(history), 40)
+
+    def test_times_normalized_to_utc(self):
+        history = PatientHistory()
+        moscow = timezone(timedelta(hours=3))
+        local = datetime(2025, 1, 1, 12, 0)
+        self.add(history, 'p1', 0)                                          # 09:00 UTC
+        history.add('p1', self.calculator.calculate_overall_risk({'age': 62}), {'age': 62},
+                    datetime(2025, 1, 1, 11, 0, tzinfo=moscow))             # 08:00 UTC
+        history.add('p1', self.calculator.calculate_overall_risk({'age': 62}), {'age': 62},
+                    local)
+        history.add('p1', self.calculator.calculate_overall_risk({'age': 62}), {'age': 62})
+        times = [entry.assessed_at for entry in history.last('p1', 4)]
+        self.assertTrue(all(t.tzinfo == timezone.utc for t in times))
+        self.assertEqual(times, sorted(times))
+        self.assertIn(self.start - timedelta(hours=1), times)
+        self.assertIn(local.astimezone(timezone.utc), times)
+        self.assertLess(datetime.now(timezone.utc) - times[-1], timedelta(minutes=1))
+
+    def test_concurrent_adds_and_reads(self):
+        history = PatientHistory()
+        result = self.calculator.calculate_overall_risk({'age': 62})
+
+        def write(worker):
+            for i in range(200):
+                history.add(f'p{worker}-{i % 20}', result, {'age': 62},
+                            self.start + timedelta(hours=i))
+
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            len(history)
+            history.patients()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(history), 800)
+        self.assertEqual(len(history.patients()), 80)
+
+    def test_history_restored_from_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with ResponseStore(directory) as store:
+                history = PatientHistory(store)
+                for day, sbp in ((0, 130), (7, 150), (14, 170)):
+                    self.add(history, 'p1', day, systolic_bp=sbp)
+                before = history.trend('p1')
+            with ResponseStore(directory) as store:
+                restored = PatientHistory(store)
+                self.assertEqual(restored.trend('p1'), before)
+                self.assertEqual(restored.last('p1', 1)[0].assessed_at,
+                                 self.start + timedelta(days=14))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Тесты типизированной записи пациента
+"""
+
+import pickle
+import random
+import unittest
+
+from patient_record import Frequency, PatientRecord, Smoking
+from result_cache import RiskResultCache
+from stroke_risk_calculator import StrokeRiskCalculator, USER_DATA_FIELDS
+from helpers import random_profile
+
+
+class TestPatientRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = StrokeRiskCalculator()
+
+    def test_calculator_accepts_record(self):
+        rng = random.Random(22)
+        for _ in range(300):
+            profile = random_profile(rng)
+            profile['age'] = max(profile['age'], 15)
+            record = PatientRecord.from_dict(profile)
+            self.assertEqual(self.calculator.calculate_overall_risk(record),
+                             self.calculator.calculate_overall_risk(profile))
+            self.assertEqual(self.calculator.check_warning_flags(record),
+                             self.calculator.check_warning_flags(profile))
+
+    def test_normalization(self):
+        record = PatientRecord.from_dict({
+            'age': 50, 'smoking': 'никогда не курил', 'has_diabetes': 'есть',
+            'on_blood_pressure_meds': 'нет', 'palpitations': None, 'systolic_bp': None,
+            'session_note': 'не поле анкеты',
+        })
+        self.assertIs(record.smoking, Smoking.NEVER)
+        self.assertEqual(record.smoking, 'никогда')
+        self.assertEqual(record.smoking.code, 0)
+        self.assertIs(record.palpitations, Frequency.NEVER)
+        self.assertEqual(Frequency.OFTEN.code, 2)
+        self.assertTrue(record.has_diabetes)
+        self.assertFalse(record.on_blood_pressure_meds)
+        self.assertEqual((record.systolic_bp, record.diastolic_bp), (0, 90))
+        self.assertIsNone(record.gender)
+        self.assertEqual(f'{Smoking.CURRENT}', 'курящий')
+
+    def test_invalid_values_rejected(self):
+        with self.assertRaises(ValueError):
+            PatientRecord(smoking='иногда')
+        with self.assertRaises(ValueError):
+            PatientRecord(age='сорок')
+        with self.assertRaises(TypeError):
+            PatientRecord(weight=70)
+
+    def test_mapping_protocol_and_footprint(self):
+        profile = random_profile(random.Random(5))
+        record = PatientRecord.from_dict(profile)
+        self.assertEqual(set({**record}), set(USER_DATA_FIELDS))
+        self.assertEqual(record['age'], profile['age'])
+        self.assertEqual(record.replace(age=80).age, 80)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(dict(record.items()), record.to_dict())
+        # get - встроенный dict.get: расчет по записи не дороже, чем по словарю
+        self.assertIsInstance(record.get, type({}.get))
+        self.assertEqual(record.get('age'), profile['age'])
+        self.assertIsNone(record.get('session_note'))
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_batch_and_cache_accept_records(self):
+        rng = random.Random(7)
+        profiles = [random_profile(rng) for _ in range(50)]
+        records = [PatientRecord.from_dict(p) for p in profiles]
+        batch = self.calculator.calculate_batch(records)
+        expected = self.calculator.calculate_batch(profiles)
+        self.assertEqual(batch['risk_level'].tolist(), expected['risk_level'].tolist())
+
+        cache = RiskResultCache()
+        cache.calculate_overall_risk(records[0].replace(age=60))
+        cache.calculate_overall_risk(records[0].replace(age=60))
+        self.assertEqual(cache.stats().hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Тесты потоковых агрегатов по оценкам
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import threading
+import unittest
+
+from batch_scoring import calculate_batch, columns_from_records
+from population_stats import AggregatingCalculator, PopulationStats
+from synthetic_cohort import iter_frames
+from helpers import random_profile
+
+
+class TestPopulationStats(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(20)
+        self.profiles = [random_profile(rng) for _ in range(600)]
+
+    def assert_same(self, first: PopulationStats, second: PopulationStats):
+        self.assertEqual(first.total, second.total)
+        self.assertEqual(first.risk_levels, second.risk_levels)
+        self.assertEqual(first.framingham, second.framingham)
+        self.assertEqual(first.warning_flags, second.warning_flags)
+        for a, b in zip([first.six_month_risk] + first.sbp_by_age,
+                        [second.six_month_risk] + second.sbp_by_age):
+            self.assertEqual(a.count, b.count)
+            self.assertAlmostEqual(a.mean, b.mean, places=9)
+            self.assertAlmostEqual(a.m2, b.m2, delta=1e-9 * max(1.0, abs(b.m2)))
+
+    def scalar_stats(self, profiles) -> PopulationStats:
+        calculator = AggregatingCalculator()
+        for profile in profiles:
+            try:
+                calculator.calculate_overall_risk(profile)
+            except ValueError:
+                pass
+        return calculator.stats
+
+    def test_scalar_aggregates(self):
+        stats = self.scalar_stats(self.profiles)
+        valid = [p for p in self.profiles if p['age'] >= 15]
+        self.assertEqual(stats.total, len(valid))
+        self.assertEqual(sum(stats.risk_levels), len(valid))
+        old = [p['systolic_bp'] for p in valid if p['age'] >= 75]
+        self.assertAlmostEqual(stats.sbp_by_age[4].mean, statistics.mean(old))
+        self.assertAlmostEqual(stats.sbp_by_age[4].variance, statistics.variance(old))
+        self.assertAlmostEqual(sum(stats.risk_level_mix().values()), 1.0)
+
+    def test_batch_path_matches_scalar_path(self):
+        frames = list(iter_frames(3000, seed=2, chunk_size=1000))
+        batch = AggregatingCalculator()
+        for frame in frames:
+            batch.calculate_batch(frame)
+        profiles = [p for frame in frames for p in frame.astype(object).to_dict('records')]
+        self.assert_same(batch.stats, self.scalar_stats(profiles))
+
+    def test_batch_of_records(self):
+        calculator = AggregatingCalculator()
+        calculator.calculate_batch([{'age': 50, 'systolic_bp': 140},
+                                    {'age': 70, 'systolic_bp': 170}])
+        mean_sbp = calculator.stats.mean_sbp_by_age()
+        self.assertEqual((mean_sbp['45-59'], mean_sbp['60-74']), (140, 170))
+        self.assertIsNone(mean_sbp['15-29'])
+
+        records = AggregatingCalculator()
+        records.calculate_batch(self.profiles)
+        self.assert_same(records.stats, self.scalar_stats(self.profiles))
+
+    def test_missing_values_counted_alike(self):
+        records = [{'age': 50, 'systolic_bp': float('nan')}, {'age': 50, 'systolic_bp': 140},
+                   {'age': 70, 'systolic_bp': None}, {'age': 80}]
+        columns = columns_from_records(records)
+        batch = calculate_batch(columns)
+        by_batch, by_result = PopulationStats(), PopulationStats()
+        by_batch.add_batch(columns, batch)
+        for i, record in enumerate(records):
+            by_result.add_result(record, batch.row(i))
+        self.assert_same(by_result, by_batch)
+        self.assertEqual(by_result.mean_sbp_by_age()['45-59'], 70)
+
+    def test_partials_merge_and_snapshot(self):
+        whole = self.scalar_stats(self.profiles)
+        merged = PopulationStats()
+        for start in range(0, len(self.profiles), 150):
+            merged.merge(self.scalar_stats(self.profiles[start:start + 150]))
+        self.assert_same(merged, whole)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'population.json')
+            merged.save(path)
+            self.assert_same(PopulationStats.load(path), whole)
+            self.assertLess(os.path.getsize(path), 4096)
+
+    def test_merge_reads_other_under_its_lock(self):
+        part = self.scalar_stats(self.profiles[:100])
+        merged = PopulationStats()
+        with part._lock:
+            worker = threading.Thread(target=merged.merge, args=(part,))
+            worker.start()
+            worker.join(0.1)
+            self.assertTrue(worker.is_alive())
+        worker.join()
+        self.assert_same(merged, part)
+
+        # Встречные merge и слияние с собой не взаимоблокируются
+        doubled = self.scalar_stats(self.profiles[:100])
+        doubled.merge(doubled)
+        self.assertEqual(doubled.total, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Тесты пакетной валидации анкет
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from questionnaire import Questionnaire
+from synthetic_cohort import iter_frames
+
+
+class TestBatchValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.questionnaire = Questionnaire()
+        self.frame = pd.DataFrame({
+            'age': [45, 12, None, 'сорок', 130],
+            'gender': ['женский', 'мужской', 'другой', None, 'мужской'],
+            'height_cm': [165, 170, 180, 175, 160],
+            'weight_kg': [60, 70, None, 80, 75],
+            'systolic_bp': [120, 130, 140, 150, 160],
+            'has_diabetes': [False, True, False, False, True],
+            'smoking': ['курящий'] * 5,
+            'on_blood_pressure_meds': ['да', True, 'нет', 'иногда', False],
+            'has_atrial_fibrillation': [False] * 5,
+            'previous_stroke_tia': [False] * 5,
+        })
+
+    def test_error_matrix_and_codes(self):
+        result = self.questionnaire.validate_frame(self.frame)
+        self.assertEqual(result.errors.shape, (5, len(result.codes)))
+        self.assertEqual(result.valid.tolist(), [True, False, False, False, False])
+        self.assertEqual(result.row_codes(1), ['age.min'])
+        self.assertEqual(sorted(result.row_codes(2)),
+                         ['age.required', 'gender.option', 'weight_kg.required'])
+        self.assertEqual(sorted(result.row_codes(3)),
+                         ['age.type', 'gender.required', 'on_blood_pressure_meds.option'])
+        self.assertEqual(result.row_codes(4), ['age.max'])
+        self.assertIn("Обязательное поле 'weight_kg' не заполнено", result.row_errors(2))
+        self.assertEqual(result.error_counts()['age.required'], 1)
+
+    def test_required_errors_match_scalar_validation(self):
+        result = self.questionnaire.validate_frame(self.frame)
+        required = [j for j, rule in enumerate(result.rules) if rule.kind == 'required'
+                    and rule.field in self.questionnaire.required_fields]
+        for i, responses in enumerate(self.frame.astype(object).to_dict('records')):
+            if isinstance(responses['age'], str):
+                continue  # validate_responses не принимает нечисловой возраст
+            responses = {k: v for k, v in responses.items() if not pd.isna(v)}
+            scalar = [e for e in self.questionnaire.validate_responses(responses)
+                      if e.startswith('Обязательное')]
+            self.assertEqual(sorted(scalar),
+                             sorted(result.rules[j].message for j in required
+                                    if result.errors[i, j]))
+
+    def test_missing_column_fails_required_rule(self):
+        result = self.questionnaire.validate_frame({'age': [50, 60]})
+        self.assertTrue(result.errors[:, result.codes.index('smoking.required')].all())
+
+    def test_synthetic_cohort_frame(self):
+        # Время на 1 000 000 строк - benchmarks/bench_validation.py
+        frame = next(iter_frames(500, seed=1, chunk_size=500))
+        self.assertTrue(np.all(self.questionnaire.validate_frame(frame).valid))
+
+        frame = frame.astype({'age': float, 'gender': object, 'smoking': object})
+        frame.loc[[5, 17], 'age'] = [10, np.nan]
+        frame.loc[40, 'gender'] = 'другой'
+        frame.loc[42, 'smoking'] = None
+        result = self.questionnaire.validate_frame(frame)
+        invalid = {int(i): result.row_codes(i) for i in np.flatnonzero(~result.valid)}
+        self.assertEqual(invalid, {5: ['age.min'], 17: ['age.required'],
+                                   40: ['gender.option'], 42: ['smoking.required']})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Тесты хранилища анкет в сегментах JSONL
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import questionnaire as questionnaire_module
+from questionnaire import Questionnaire
+from response_store import ResponseStore
+
+
+class TestResponseStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = self.temp.name
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def records(self, count):
+        return [{'responses': {'age': 20 + i % 70, 'smoking': 'курящий'}, 'n': i}
+                for i in range(count)]
+
+    def test_append_and_get_across_segments(self):
+        records = self.records(500)
+        with ResponseStore(self.directory, max_segment_bytes=4096) as store:
+            ids = [store.append(record) for record in records]
+            self.assertEqual(ids, list(range(500)))
+            self.assertGreater(len(store.segments()), 5)
+            for record_id in (0, 1, 137, 498, 499):
+                self.assertEqual(store.get(record_id), records[record_id])
+            with self.assertRaises(KeyError):
+                store.get(500)
+
+    def test_reopen_continues_ids(self):
+        records = self.records(50)
+        with ResponseStore(self.directory, max_segment_bytes=2048) as store:
+            for record in records[:30]:
+                store.append(record)
+        with ResponseStore(self.directory, max_segment_bytes=2048) as store:
+            self.assertEqual(len(store), 30)
+            self.assertEqual(store.append(records[30]), 30)
+            self.assertEqual(store.get(12), records[12])
+            self.assertEqual([record['n'] for _, record in store.scan(25)],
+                             [25, 26, 27, 28, 29, 30])
+
+    def test_recovers_torn_write(self):
+        with ResponseStore(self.directory) as store:
+            for record in self.records(10):
+                store.append(record)
+            segment = store.segments()[-1]
+        with open(segment, 'ab') as f:
+            f.write(b'{"responses": {"age"')
+        with ResponseStore(self.directory) as store:
+            self.assertEqual(len(store), 10)
+            self.assertEqual(store.append({'n': 'after'}), 10)
+            self.assertEqual(store.get(10), {'n': 'after'})
+            self.assertEqual(store.get(9)['n'], 9)
+
+    def test_time_based_rotation(self):
+        with ResponseStore(self.directory, max_segment_age=0) as store:
+            for record in self.records(3):
+                store.append(record)
+            self.assertEqual(len(store.segments()), 3)
+            self.assertEqual(store.get(2)['n'], 2)
+
+    def test_segment_age_survives_reopen(self):
+        with ResponseStore(self.directory) as store:
+            store.append({'n': 0})
+            segment = store.segments()[-1]
+        created = segment[:-len('.jsonl')] + '.created'
+        with open(created, 'w', encoding='ascii') as f:
+            f.write(repr(time.time() - 3600))
+        with ResponseStore(self.directory, max_segment_age=1800) as store:
+            store.append({'n': 1})
+            self.assertEqual(len(store.segments()), 2)
+        with ResponseStore(self.directory, max_segment_age=1800) as store:
+            store.append({'n': 2})
+            self.assertEqual(len(store.segments()), 2)
+
+    def test_idle_records_synced_by_interval(self):
+        synced = []
+
+        def fsync(fd):
+            # Файл и то, держит ли fsync блокировку дозаписи
+            synced.append((os.fstat(fd).st_ino, store._lock.locked()))
+            real_fsync(fd)
+
+        real_fsync = os.fsync
+        with mock.patch('os.fsync', side_effect=fsync):
+            with ResponseStore(self.directory, sync_every=1000, sync_interval=0.05) as store:
+                for record in self.records(3):
+                    store.append(record)
+                files = [(os.fstat(store._data.fileno()).st_ino, False),
+                         (os.fstat(store._index.fileno()).st_ino, False)]
+                synced_on_append = len(synced)
+                # Новых записей нет: сбрасывает фоновый поток вне блокировки
+                deadline = time.monotonic() + 5
+                while store._synced < 3 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(synced[synced_on_append:], files)
+
+    def test_questionnaire_saves_to_store(self):
+        questionnaire = Questionnaire()
+        with ResponseStore(self.directory) as store:
+            record_id = questionnaire.save_responses({'age': 45}, store=store)
+            saved = store.get(record_id)
+        self.assertEqual(saved['responses'], {'age': 45})
+        self.assertIn('timestamp', saved)
+
+    def test_questionnaire_defaults_to_store(self):
+        questionnaire = Questionnaire()
+        with mock.patch.dict(os.environ, {'RISKOMETR_DATA_DIR': self.directory}), \
+                mock.patch.object(questionnaire_module, '_default_store', None):
+            ids = [questionnaire.save_responses({'age': 45}) for _ in range(5)]
+            store = questionnaire_module._default_store
+            store.close()
+        self.assertEqual(len(set(ids)), 5)
+        self.assertEqual(store.directory, os.path.join(self.directory, 'responses'))
+        self.assertEqual(os.listdir(self.directory), ['responses'])
+
+    def test_questionnaire_exports_file(self):
+        path = os.path.join(self.directory, 'анкета.json')
+        self.assertEqual(Questionnaire().save_responses({'age': 45}, filename=path), path)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['responses'], {'age': 45})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Тесты кэша результатов расчета
+"""
+
+import threading
+import unittest
+
+from result_cache import RiskResultCache, cache_key
+
+
+class TestRiskResultCache(unittest.TestCase):
+
+    def test_key_ignores_order_and_unknown_fields(self):
+        self.assertEqual(
+            cache_key({'age': 50, 'smoking': 'курящий'}),
+            cache_key({'smoking': 'курящий', 'age': 50, 'session_note': 'x'})
+        )
+        self.assertNotEqual(cache_key({'age': 50}), cache_key({'age': 51}))
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = RiskResultCache(max_size=2)
+        cache.calculate_overall_risk({'age': 40})
+        cache.calculate_overall_risk({'age': 50})
+        cache.calculate_overall_risk({'age': 40})
+        cache.calculate_overall_risk({'age': 60})  # вытесняет age=50
+        cache.calculate_overall_risk({'age': 40})
+        cache.calculate_overall_risk({'age': 50})
+
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.evictions), (2, 4, 2))
+        self.assertEqual(stats.size, 2)
+
+    def test_returned_results_are_independent_copies(self):
+        cache = RiskResultCache()
+        first = cache.calculate_overall_risk({'age': 40})
+        first.recommendations.append('изменено')
+        second = cache.calculate_overall_risk({'age': 40})
+        self.assertNotIn('изменено', second.recommendations)
+        self.assertEqual(first.framingham_score, second.framingham_score)
+
+    def test_validation_errors_are_not_cached(self):
+        cache = RiskResultCache()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.calculate_overall_risk({'age': 10})
+        self.assertEqual(cache.stats().size, 0)
+
+    def test_concurrent_sessions(self):
+        cache = RiskResultCache(max_size=8)
+
+        def worker():
+            for age in range(20, 60):
+                cache.calculate_overall_risk({'age': age})
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats.hits + stats.misses, 8 * 40)
+        self.assertLessEqual(stats.size, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Тесты куба риска
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from risk_cube import build_risk_cube, RiskCube
+from scoring_rules import RULE_TABLE, ScoringRules
+from stroke_risk_calculator import StrokeRiskCalculator
+from helpers import random_profile
+
+
+class TestRiskCube(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'risk.cube')
+        build_risk_cube(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_lookup_matches_scalar_path(self):
+        calculator = StrokeRiskCalculator()
+        cube = RiskCube(self.path)
+        rng = random.Random(11)
+        try:
+            for _ in range(3000):
+                profile = random_profile(rng)
+                score, risk, _ = calculator.calculate_framingham_6month_risk(profile)
+                self.assertEqual(cube.lookup(profile),
+                                 (score, risk, calculator.determine_risk_level(risk)))
+        finally:
+            cube.close()
+
+    def test_values_outside_domain_fall_back(self):
+        calculator = StrokeRiskCalculator()
+        calculator.attach_risk_cube(self.path)
+        profile = {'age': 50, 'systolic_bp': 120, 'ldl_cholesterol': 4.85}
+        self.assertIsNone(calculator.risk_cube.lookup(profile))
+        self.assertEqual(calculator.assess_six_month_risk(profile)[0], 7)
+        self.assertEqual(calculator.assess_six_month_risk({'age': 101, 'systolic_bp': 300})[0], 21)
+        calculator.risk_cube.close()
+
+    def test_non_finite_values_fall_back(self):
+        calculator = StrokeRiskCalculator()
+        calculator.attach_risk_cube(self.path)
+        try:
+            for value in (float('nan'), float('inf'), float('-inf')):
+                self.assertIsNone(calculator.risk_cube.lookup({'age': value}))
+            self.assertEqual(
+                calculator.assess_six_month_risk({'age': float('nan'), 'systolic_bp': 120}),
+                StrokeRiskCalculator().assess_six_month_risk(
+                    {'age': float('nan'), 'systolic_bp': 120}),
+            )
+            self.assertEqual(
+                calculator.assess_six_month_risk({'age': 50, 'ldl_cholesterol': float('inf')})[0],
+                StrokeRiskCalculator().assess_six_month_risk(
+                    {'age': 50, 'ldl_cholesterol': float('inf')})[0],
+            )
+        finally:
+            calculator.risk_cube.close()
+
+    def test_rejects_cube_for_other_rules(self):
+        table = dict(RULE_TABLE, chads2_vasc_risk=[0.0] * 10)
+        calculator = StrokeRiskCalculator(ScoringRules(table))
+        with self.assertRaises(ValueError):
+            calculator.attach_risk_cube(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
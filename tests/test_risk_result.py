@@ -0,0 +1,49 @@
+"""
+Тесты полного результата расчета риска
+"""
+
+import unittest
+
+from stroke_risk_calculator import StrokeRiskCalculator
+
+
+class TestRiskResultBreakdown(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = StrokeRiskCalculator()
+        self.user_data = {
+            'age': 70, 'gender': 'женский', 'systolic_bp': 150,
+            'has_atrial_fibrillation': True, 'previous_stroke_tia': True,
+            'limb_weakness': True, 'tia_symptom_duration': 30,
+            'ldl_cholesterol': 5.0, 'smoking': 'курящий',
+        }
+
+    def test_carries_weighted_framingham_factors(self):
+        result = self.calculator.calculate_overall_risk(self.user_data)
+        _, _, labels = self.calculator.calculate_framingham_6month_risk(self.user_data)
+        self.assertEqual([factor for factor, _ in result.risk_factors], labels)
+        self.assertIn(("Курение в настоящее время", 5), result.risk_factors)
+        self.assertEqual(sum(points for _, points in result.risk_factors),
+                         result.framingham_score)
+
+    def test_carries_abcd2_and_chads2_vasc_details(self):
+        result = self.calculator.calculate_overall_risk(self.user_data)
+        score, two_day, seven_day = self.calculator.calculate_abcd2_score(self.user_data)
+        self.assertEqual(result.abcd2_score, score)
+        self.assertEqual((result.abcd2_two_day_risk, result.abcd2_seven_day_risk),
+                         (two_day, seven_day))
+
+        score, annual, criteria = self.calculator.calculate_chads2_vasc_score(self.user_data)
+        self.assertEqual(result.chads2_vasc_score, score)
+        self.assertEqual(result.chads2_vasc_annual_risk, annual)
+        self.assertEqual(result.chads2_vasc_criteria, criteria)
+
+    def test_not_applicable_scales_stay_empty(self):
+        result = self.calculator.calculate_overall_risk({'age': 30})
+        self.assertIsNone(result.abcd2_two_day_risk)
+        self.assertIsNone(result.chads2_vasc_annual_risk)
+        self.assertEqual(result.chads2_vasc_criteria, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
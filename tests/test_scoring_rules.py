@@ -0,0 +1,119 @@
+"""
+Тесты таблицы правил балльных шкал
+"""
+
+import copy
+import os
+import pickle
+import random
+import tempfile
+import unittest
+from bisect import bisect_right
+
+import numpy as np
+
+from batch_scoring import calculate_batch
+from scoring_rules import RULE_TABLE, ScoringRules, BandRule, FlagRule
+from stroke_risk_calculator import StrokeRiskCalculator, RiskLevel
+
+
+def interpret_framingham(rules: ScoringRules, user_data: dict):
+    """Эталон: прямой проход по правилам таблицы"""
+    score, risk_factors = 0, []
+    for rule in rules.framingham:
+        if isinstance(rule, FlagRule):
+            if user_data.get(rule.field, False):
+                score += rule.points
+                risk_factors.append((rule.label, rule.points))
+        elif isinstance(rule, BandRule):
+            value = user_data.get(rule.field, rule.default)
+            i = bisect_right(rule.bands.edges, value)
+            score += rule.bands.values[i]
+            label = rule.bands.labels[i]
+            if label:
+                risk_factors.append((label.format(value=value), rule.bands.values[i]))
+        elif user_data.get(rule.field, rule.default) in rule.choices:
+            points, label = rule.choices[user_data.get(rule.field, rule.default)]
+            score += points
+            risk_factors.append((label, points))
+    return score, risk_factors
+
+
+class TestScoringRules(unittest.TestCase):
+
+    def test_band_boundaries_are_left_inclusive(self):
+        calculator = StrokeRiskCalculator()
+        for age, points in [(34, 0), (35, 3), (44, 3), (45, 5), (74, 10), (75, 12)]:
+            score, _, _ = calculator.calculate_framingham_6month_risk({'age': age})
+            self.assertEqual(score, points, age)
+        self.assertIs(calculator.determine_risk_level(1.0), RiskLevel.MODERATE)
+        self.assertIs(calculator.determine_risk_level(10.0), RiskLevel.CRITICAL)
+
+    def test_ldl_label_includes_value(self):
+        calculator = StrokeRiskCalculator()
+        _, _, factors = calculator.calculate_framingham_6month_risk(
+            {'age': 20, 'ldl_cholesterol': 5.2}
+        )
+        self.assertEqual(factors, ["Высокий холестерин ЛПНП (5.2 ммоль/л)"])
+
+    def test_tuned_table_applies_to_scalar_and_batch(self):
+        table = copy.deepcopy(RULE_TABLE)
+        table['framingham'][1]['edges'] = [115, 130, 140, 160, 180]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            ScoringRules(table).to_json(path)
+            rules = ScoringRules.from_json(path)
+
+        calculator = StrokeRiskCalculator(rules)
+        result = calculator.calculate_overall_risk({'age': 20, 'systolic_bp': 117})
+        self.assertEqual(result.framingham_score, 1)
+        batch = calculator.calculate_batch({'age': np.array([20]), 'systolic_bp': np.array([117])})
+        self.assertEqual(batch['framingham_score'][0], 1)
+        self.assertEqual(calculate_batch({'age': np.array([20]),
+                                          'systolic_bp': np.array([117])})['framingham_score'][0], 0)
+
+    def test_scalar_scale_matches_table(self):
+        table = copy.deepcopy(RULE_TABLE)
+        table['framingham'][0]['edges'] = [30, 45, 45, 65, 80]
+        table['framingham'][-1]['labels'][1] = "ЛПНП {value}"
+        for rules in (ScoringRules(), ScoringRules(table)):
+            rng = random.Random(4)
+            for _ in range(2000):
+                user_data = {
+                    'age': rng.choice([rng.randint(0, 100), 45, 65, 80.0]),
+                    'systolic_bp': rng.randint(90, 200),
+                    'ldl_cholesterol': rng.choice([rng.uniform(0, 8), 3, 4.9]),
+                    'smoking': rng.choice(['никогда', 'курящий', 'курил в прошлом', 'да']),
+                    'activity_level': rng.choice(['подвижный', 'неподвижный']),
+                    'has_diabetes': rng.random() < 0.5,
+                }
+                if rng.random() < 0.2:
+                    del user_data['systolic_bp']
+                score, risk_factors = interpret_framingham(rules, user_data)
+                risk = round(rules.framingham_risk.lookup(score), 1)
+                self.assertEqual(rules.framingham_breakdown(user_data), (score, risk, risk_factors))
+                self.assertEqual(rules.framingham_factors(user_data),
+                                 (score, risk, [label for label, _ in risk_factors]))
+
+    def test_rules_survive_pickling(self):
+        table = copy.deepcopy(RULE_TABLE)
+        table['framingham'][1]['edges'] = [115, 130, 140, 160, 180]
+        rules = pickle.loads(pickle.dumps(ScoringRules(table)))
+        self.assertEqual(rules.framingham_breakdown({'systolic_bp': 117})[0], 1)
+
+    def test_rejects_non_finite_edges(self):
+        for edge in (float('inf'), float('nan'), '75'):
+            table = copy.deepcopy(RULE_TABLE)
+            table['framingham'][0]['edges'] = [35, 45, 55, 65, edge]
+            with self.assertRaises(ValueError):
+                ScoringRules(table)
+
+    def test_rejects_unsorted_edges(self):
+        table = copy.deepcopy(RULE_TABLE)
+        table['framingham_risk']['edges'] = [11, 6, 16, 21, 26, 31]
+        with self.assertRaises(ValueError):
+            ScoringRules(table)
+
+
+if __name__ == '__main__':
+    unittest.main()
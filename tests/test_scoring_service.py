@@ -0,0 +1,183 @@
+"""
+Тесты HTTP-сервиса расчета риска
+"""
+
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import unittest
+
+from population_stats import PopulationStats
+from scoring_service import ScoringService, LatencyStats, MAX_BODY_SIZE, MAX_HEADER_SIZE
+from stroke_risk_calculator import StrokeRiskCalculator
+
+
+class TestScoringService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ScoringService(max_concurrency=2, batch_chunk_size=3,
+                                     population_stats=PopulationStats())
+        cls.loop = asyncio.new_event_loop()
+        cls.server = cls.loop.run_until_complete(cls.service.start('127.0.0.1', 0))
+        cls.port = cls.server.sockets[0].getsockname()[1]
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        async def shutdown():
+            cls.server.close()
+            await cls.server.wait_closed()
+            handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+        cls.service.close()
+
+    def setUp(self):
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        self.calculator = StrokeRiskCalculator()
+        self.profiles = [
+            {'age': 70, 'systolic_bp': 165, 'has_atrial_fibrillation': True, 'gender': 'женский'},
+            {'age': 30, 'weight_kg': 70, 'height_cm': 175},
+            {'age': 55, 'smoking': 'курящий', 'ldl_cholesterol': 5.2, 'has_diabetes': True},
+            {'age': 10},
+        ]
+
+    def tearDown(self):
+        self.connection.close()
+
+    def request(self, method, path, body=None, headers=None):
+        self.connection.request(method, path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_assess_matches_calculator(self):
+        response, body = self.request('POST', '/assess', json.dumps(self.profiles[0]))
+        self.assertEqual(response.status, 200)
+        expected = self.calculator.calculate_overall_risk(self.profiles[0]).to_dict()
+        self.assertEqual(json.loads(body), json.loads(json.dumps(expected)))
+
+    def test_keep_alive_reuses_connection(self):
+        self.request('GET', '/health')
+        sock = self.connection.sock
+        response, _ = self.request('POST', '/assess', json.dumps(self.profiles[1]))
+        self.assertEqual(response.status, 200)
+        self.assertIs(self.connection.sock, sock)
+
+    def test_invalid_requests(self):
+        response, body = self.request('POST', '/assess', json.dumps(self.profiles[3]))
+        self.assertEqual(response.status, 400)
+        self.assertIn('error', json.loads(body))
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        response, _ = self.request('POST', '/assess', b'{not json')
+        self.assertEqual(response.status, 400)
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        response, _ = self.request('GET', '/assess')
+        self.assertEqual(response.status, 405)
+
+    def test_batch_array(self):
+        response, body = self.request('POST', '/assess/batch', json.dumps(self.profiles))
+        self.assertEqual(response.status, 200)
+        results = json.loads(body)
+        self.assertEqual(len(results), 4)
+        for profile, result in zip(self.profiles[:3], results):
+            expected = self.calculator.calculate_overall_risk(profile)
+            self.assertEqual(result['six_month_risk'], expected.six_month_risk)
+            self.assertEqual(result['risk_level'], expected.risk_level.value)
+            self.assertEqual(result['recommendations'], expected.recommendations)
+        self.assertIn('error', results[3])
+
+    def test_batch_matches_single_responses(self):
+        records = self.profiles + [
+            {'age': 70, 'smoking': 'курящий', 'systolic_bp': 150},
+            {'age': 62, 'previous_stroke_tia': True, 'limb_weakness': True,
+             'tia_symptom_duration': 45, 'ldl_cholesterol': 5},
+            {'age': None, 'systolic_bp': 150},
+            {'age': 50, 'systolic_bp': None},
+            {'age': 'сорок'},
+        ]
+        response, body = self.request('POST', '/assess/batch', json.dumps(records))
+        batch = json.loads(body)
+        for record, result in zip(records, batch):
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            response, body = self.request('POST', '/assess', json.dumps(record))
+            self.assertEqual(result, json.loads(body), record)
+        self.assertEqual(len(batch[4]['risk_factors']), 3)
+        self.assertIsNotNone(batch[5]['abcd2_two_day_risk'])
+        self.assertIn('error', batch[7])
+
+    def test_batch_ndjson_stream(self):
+        lines = [json.dumps(profile) for profile in self.profiles] + ['{oops'] + \
+                [json.dumps(profile) for profile in self.profiles[:2]]
+        response, body = self.request(
+            'POST', '/assess/batch', '\n'.join(lines).encode('utf-8'),
+            {'Content-Type': 'application/x-ndjson'}
+        )
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        results = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertEqual(len(results), 7)
+        self.assertIn('error', results[4])
+        self.assertEqual(results[5]['framingham_score'], results[0]['framingham_score'])
+
+    def raw_request(self, payload: bytes) -> bytes:
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(payload)
+            response = b''
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    return response
+                response += data
+
+    def test_malformed_chunked_bodies(self):
+        head = (b'POST /assess HTTP/1.1\r\nHost: test\r\nConnection: close\r\n'
+                b'Transfer-Encoding: chunked\r\n\r\n')
+        # Строка размера блока длиннее лимита потока
+        response = self.raw_request(head + b'1' * (MAX_HEADER_SIZE + 10) + b'\r\n')
+        self.assertTrue(response.startswith(b'HTTP/1.1 400 '), response[:40])
+        # Размер блока больше MAX_BODY_SIZE отклоняется до чтения самого блока
+        response = self.raw_request(head + b'%x\r\n{"age"' % (MAX_BODY_SIZE + 1))
+        self.assertTrue(response.startswith(b'HTTP/1.1 413 '), response[:40])
+        response = self.raw_request(
+            head + b'%x\r\n%s\r\n%x\r\n' % (MAX_BODY_SIZE - 1, b' ' * (MAX_BODY_SIZE - 1), 2))
+        self.assertTrue(response.startswith(b'HTTP/1.1 413 '), response[:40])
+        body = json.dumps(self.profiles[1]).encode('utf-8')
+        response = self.raw_request(head + b'%x\r\n%s\r\n0\r\n\r\n' % (len(body), body))
+        self.assertTrue(response.startswith(b'HTTP/1.1 200 '), response[:40])
+
+    def test_stats_report_latency(self):
+        self.request('GET', '/health')
+        total = self.service.population_stats.total
+        self.request('POST', '/assess', json.dumps(self.profiles[0]))
+        self.request('POST', '/assess/batch', json.dumps(self.profiles))
+        response, body = self.request('GET', '/stats')
+        stats = json.loads(body)
+        # Ответ с ошибкой (возраст 10) в агрегаты не попадает
+        self.assertEqual(stats['population']['total'], total + 4)
+        self.assertIn('GET /health', stats['latency'])
+        self.assertGreaterEqual(stats['latency']['GET /health']['p99_ms'], 0)
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LatencyStats(window=100)
+        for ms in range(1, 201):
+            stats.record('POST /assess', ms / 1000)
+        report = stats.snapshot()['POST /assess']
+        self.assertEqual(report['count'], 200)
+        self.assertEqual(report['p50_ms'], 151.0)
+        self.assertEqual(report['max_ms'], 200.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
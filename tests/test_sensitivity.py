@@ -0,0 +1,63 @@
+"""
+Тесты сетки "что если" по модифицируемым факторам
+"""
+
+import itertools
+import random
+import unittest
+
+from sensitivity import MODIFIABLE_FIELDS, default_ranges, sensitivity_grid
+from stroke_risk_calculator import StrokeRiskCalculator
+from helpers import random_profile
+
+
+class TestSensitivityGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = StrokeRiskCalculator()
+
+    def test_cells_match_scalar_calculation(self):
+        rng = random.Random(19)
+        ranges = {
+            'systolic_bp': [110, 140, 185],
+            'smoking': ['никогда не курил', 'курящий'],
+            'weight_kg': [60, 95.5],
+            'ldl_cholesterol': [2.5, 4.9, 6.0],
+            'activity_level': ['подвижный', 'неподвижный'],
+            'on_blood_pressure_meds': [False, True],
+        }
+        for _ in range(5):
+            profile = random_profile(rng)
+            profile['age'] = max(profile['age'], 15)
+            grid = sensitivity_grid(profile, ranges)
+            self.assertEqual(grid['six_month_risk'].shape, (3, 2, 2, 3, 2, 2))
+            for values in itertools.product(*ranges.values()):
+                cell = dict(zip(ranges, values))
+                expected = self.calculator.calculate_overall_risk({**profile, **cell})
+                result = grid.cell(**cell)
+                self.assertEqual(result.six_month_risk, expected.six_month_risk)
+                self.assertEqual(result.risk_level, expected.risk_level)
+                self.assertEqual(result.recommendations, expected.recommendations)
+                self.assertEqual(result.warning_flags, expected.warning_flags)
+
+    def test_default_full_grid(self):
+        # Время полной сетки - benchmarks/bench_sensitivity.py
+        profile = {'age': 67, 'weight_kg': 88, 'height_cm': 172, 'has_diabetes': True}
+        ranges = default_ranges(profile)
+        self.assertEqual(tuple(ranges), MODIFIABLE_FIELDS)
+        grid = sensitivity_grid(profile, ranges)
+        self.assertEqual(len(grid), 11 * 3 * 11 * 12 * 3 * 2)
+        self.assertEqual(grid['six_month_risk'].shape, tuple(len(v) for v in ranges.values()))
+        cell = {field: values[-1] for field, values in ranges.items()}
+        expected = self.calculator.calculate_overall_risk({**profile, **cell})
+        self.assertEqual(grid.cell(**cell).six_month_risk, expected.six_month_risk)
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            sensitivity_grid({'age': 50}, {'age': [40, 50]})
+        with self.assertRaises(ValueError):
+            sensitivity_grid({'age': 10}, {'systolic_bp': [120]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Тесты хранилища сессий приложения
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from session_store import (
+    MemorySessionStore, SessionStore, SQLiteSessionStore, open_session_store
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SessionStoreCases:
+    """Общие проверки для всех реализаций SessionStore"""
+
+    def make_store(self, **options):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = self.make_store(ttl=60, clock=self.clock)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_put_get_delete(self):
+        state = {'user_data': {'age': 61, 'smoking': 'курящий', 'has_diabetes': True},
+                 'calculated': True}
+        self.assertIsNone(self.store.get('s1'))
+        self.store.put('s1', state)
+        self.assertEqual(self.store.get('s1'), state)
+        self.store.get('s1')['user_data']['age'] = 20
+        self.assertEqual(self.store.get('s1')['user_data']['age'], 61)
+        self.store.delete('s1')
+        self.assertIsNone(self.store.get('s1'))
+
+    def test_ttl_expiry_and_eviction(self):
+        self.store.put('old', {'calculated': True})
+        self.clock.now += 30
+        self.store.put('new', {'calculated': False})
+        self.clock.now += 40
+        self.assertIsNone(self.store.get('old'))
+        self.assertEqual(self.store.get('new'), {'calculated': False})
+        self.assertEqual(self.store.evict_expired(), 1)
+        self.assertEqual(len(self.store), 1)
+        # Запись продлевает срок жизни
+        self.store.put('new', {'calculated': True})
+        self.clock.now += 50
+        self.assertEqual(self.store.get('new'), {'calculated': True})
+
+
+class TestMemorySessionStore(SessionStoreCases, unittest.TestCase):
+
+    def make_store(self, **options):
+        return MemorySessionStore(**options)
+
+
+class TestSQLiteSessionStore(SessionStoreCases, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'sessions', 'sessions.sqlite3')
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def make_store(self, **options):
+        return SQLiteSessionStore(self.path, **options)
+
+    def test_wal_mode_and_survives_reopen(self):
+        self.store.put('s1', {'user_data': {'age': 70}, 'calculated': True})
+        self.store.close()
+        with sqlite3.connect(self.path) as connection:
+            mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+        # Вторая "реплика" с тем же файлом видит сессию
+        with SQLiteSessionStore(self.path, ttl=60, clock=self.clock) as replica:
+            self.assertEqual(replica.get('s1'), {'user_data': {'age': 70}, 'calculated': True})
+
+    def test_eviction_runs_on_put(self):
+        store = SQLiteSessionStore(self.path, ttl=10, evict_interval=100, clock=self.clock)
+        store.put('a', {})
+        self.clock.now += 101
+        store.put('b', {})
+        with sqlite3.connect(self.path) as connection:
+            rows = connection.execute('SELECT session_id FROM sessions').fetchall()
+        self.assertEqual(rows, [('b',)])
+        store.close()
+
+    def test_concurrent_writers(self):
+        def write(worker):
+            for i in range(50):
+                self.store.put(f'{worker}-{i}', {'i': i})
+
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store), 400)
+        self.assertEqual(self.store.get('7-49'), {'i': 49})
+
+
+class TestOpenSessionStore(unittest.TestCase):
+
+    def test_spec(self):
+        self.assertIsInstance(open_session_store(), MemorySessionStore)
+        self.assertIsInstance(open_session_store('memory'), MemorySessionStore)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            with open_session_store(f'sqlite:///{path}', ttl=5) as store:
+                self.assertIsInstance(store, SQLiteSessionStore)
+                self.assertEqual((store.path, store.ttl), (path, 5))
+
+    def test_backends_must_implement_interface(self):
+        with self.assertRaises(TypeError):
+            SessionStore()
+
+        class Partial(SessionStore):
+            def get(self, session_id):
+                return None
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+
+if __name__ == '__main__':
+    unittest.main()
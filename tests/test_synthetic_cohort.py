@@ -0,0 +1,69 @@
+"""
+Тесты генератора синтетических когорт
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from batch_scoring import calculate_batch, score_encoded, CATEGORICAL_FIELDS
+from stroke_risk_calculator import StrokeRiskCalculator, USER_DATA_FIELDS
+from synthetic_cohort import (
+    CHOICES, generate_block, generate_profiles, iter_columns, iter_frames, write_cohort
+)
+
+
+class TestSyntheticCohort(unittest.TestCase):
+
+    def test_deterministic_for_any_chunk_size(self):
+        first = [chunk['systolic_bp'] for chunk in iter_columns(150_000, seed=3, chunk_size=40_000)]
+        second = [chunk['systolic_bp'] for chunk in iter_columns(150_000, seed=3, chunk_size=99_999)]
+        self.assertEqual([len(chunk) for chunk in first], [40_000, 40_000, 40_000, 30_000])
+        np.testing.assert_array_equal(np.concatenate(first), np.concatenate(second))
+        other = next(iter_columns(1000, seed=4))['systolic_bp']
+        self.assertFalse(np.array_equal(other, first[0][:1000]))
+
+    def test_fields_and_correlations(self):
+        columns = generate_block(50_000, seed=1)
+        self.assertEqual(set(columns), set(USER_DATA_FIELDS))
+        age = columns['age']
+        self.assertGreaterEqual(age.min(), 15)
+        self.assertLessEqual(age.max(), 100)
+        self.assertGreater(np.corrcoef(age, columns['systolic_bp'])[0, 1], 0.3)
+        af = columns['has_atrial_fibrillation']
+        self.assertGreater(af[age >= 70].mean(), 5 * af[age < 50].mean())
+        # Симптомы ТИА только у перенесших инсульт/ТИА
+        symptoms = columns['limb_weakness'] | columns['speech_disturbance']
+        self.assertFalse((symptoms & ~columns['previous_stroke_tia']).any())
+        self.assertTrue((columns['tia_symptom_duration'][~symptoms] == 0).all())
+
+    def test_codes_match_batch_encoding(self):
+        columns = generate_block(5000, seed=2)
+        for name, choices in CHOICES.items():
+            self.assertEqual(choices[1:], CATEGORICAL_FIELDS[name][1:])
+        frame = next(iter_frames(5000, seed=2))
+        expected = calculate_batch(frame).columns()
+        for name, values in score_encoded(columns).items():
+            np.testing.assert_array_equal(values, expected[name])
+
+    def test_profiles_score_with_calculator(self):
+        calculator = StrokeRiskCalculator()
+        for profile in generate_profiles(200, seed=5):
+            calculator.calculate_overall_risk(profile)
+
+    def test_write_ndjson(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cohort.ndjson')
+            self.assertEqual(write_cohort(path, 2500, seed=6, chunk_size=1000), 2500)
+            with open(path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2500)
+        self.assertIn(records[0]['smoking'], CHOICES['smoking'])
+        self.assertIsInstance(records[0]['has_diabetes'], bool)
+
+
+if __name__ == '__main__':
+    unittest.main()